@@ -1,9 +1,54 @@
-from .emulator import Chip8
-
-# Entry Point
-def main():
-    chip8 = Chip8()
-    chip8.run()
-
-if __name__ == '__main__':
-    main()
\ No newline at end of file
+import argparse
+from .cpu import QUIRK_PROFILES
+
+# Entry Point
+def main():
+    parser = argparse.ArgumentParser(prog='yachipy', description='Yet Another Chip8 Emulator')
+    parser.add_argument('rom', nargs='?', help='rom to run (required with --headless)')
+    parser.add_argument('--headless', action='store_true', help='run without a window at full host speed')
+    parser.add_argument('--cycles', type=int, default=100000, help='number of cycles to run in headless mode')
+    parser.add_argument('--clockspeed', type=int, default=500, help='emulated cpu clockspeed (Hz) used for timers')
+    parser.add_argument('--jit', action='store_true', help='compile basic blocks into python functions in headless mode')
+    parser.add_argument('--quirks', choices=QUIRK_PROFILES, default='modern', help='interpreter behaviour to emulate in headless mode')
+    parser.add_argument('--dump', action='store_true', help='print the final screen in headless mode')
+    parser.add_argument('--load-state', metavar='FILE', help='restore a save state before running in headless mode')
+    parser.add_argument('--save-state', metavar='FILE', help='write a save state after running in headless mode')
+    parser.add_argument('--wav', metavar='FILE', help='write the buzzer audio to a WAV file in headless mode')
+    args = parser.parse_args()
+
+    if args.headless:
+        from .headless import Chip8Headless
+        if args.rom is None:
+            parser.error('--headless requires a rom')
+        chip8 = Chip8Headless(cpu_clockspeed=args.clockspeed, jit=args.jit, quirks=args.quirks)
+        if not chip8.load_rom(args.rom):
+            raise SystemExit(1)
+        if args.load_state:
+            from .savestate import load_state
+            with open(args.load_state, 'rb') as state:
+                load_state(chip8.cpu, state.read())
+        if args.wav:
+            from .audio import Chip8Audio, Chip8WavSink
+            audio = Chip8Audio(Chip8WavSink(args.wav), realtime=False)
+            audio.start()
+            chip8.cpu.buzzer = audio.frame
+        elapsed = chip8.run(args.cycles)
+        if args.wav:
+            audio.stop()
+            audio.join()
+            print(f'[Audio]: {audio.sink.samples} samples saved to {args.wav}, {audio.ring.overruns} frames dropped')
+        if args.save_state:
+            from .savestate import save_state
+            with open(args.save_state, 'wb') as state:
+                state.write(save_state(chip8.cpu))
+        if args.dump:
+            print(chip8.dump_screen())
+        print(f'{chip8.cycles} cycles in {elapsed:.3f}s ({chip8.cycles/max(elapsed, 1e-9):,.0f} instructions/sec)')
+        return
+
+    from .emulator import Chip8
+    chip8 = Chip8()
+    chip8.run()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import time
+import wave
+import threading
+from array import array
+from .config import TIMER_FREQUENCY, AUDIO_SAMPLE_RATE, BUZZER_FREQUENCY, AUDIO_VOLUME
+
+# Frames of audio the ring holds when played live. The player only takes the newest one, so the
+# buzzer starts and stops within one frame, the slack only absorbs the jitter of the emulation.
+REALTIME_RING_FRAMES = 4
+# Frames the ring holds when written to a file, which drains it as fast as it can instead
+OFFLINE_RING_FRAMES = 1024
+
+
+class Chip8AudioRing:
+    # Single producer, single consumer ring of references to precomputed chunks. Each side only
+    # writes its own counter and publishes it after the slot, so neither takes a lock or waits:
+    # a full ring drops the new chunk, an empty one returns None.
+    def __init__(self, capacity:int) -> None:
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        # Chunks pushed and popped since the start, written only by the producer and the consumer
+        self.written = 0
+        self.read = 0
+        # Chunks dropped because the ring was full
+        self.overruns = 0
+
+    def __len__(self) -> int:
+        return self.written - self.read
+
+    def push(self, chunk:bytes) -> bool:
+        written = self.written
+        if written - self.read >= self.capacity:
+            self.overruns += 1
+            return False
+        self.slots[written % self.capacity] = chunk
+        self.written = written + 1
+        return True
+
+    def pop(self) -> bytes|None:
+        read = self.read
+        if read == self.written:
+            return None
+        chunk = self.slots[read % self.capacity]
+        self.read = read + 1
+        return chunk
+
+    def latest(self) -> bytes|None:
+        # Newest chunk, the older ones are skipped
+        written = self.written
+        if written == self.read:
+            return None
+        chunk = self.slots[(written - 1) % self.capacity]
+        self.read = written
+        return chunk
+
+
+class Chip8NullSink:
+    # Discards the samples, for machines without an audio device. Counts them for tests.
+    blocking = False
+
+    def __init__(self) -> None:
+        self.samples = 0
+
+    def write(self, samples:bytes) -> None:
+        self.samples += len(samples) // 2
+
+    def close(self) -> None:
+        pass
+
+
+class Chip8WavSink:
+    # Writes 16 bit mono PCM to a WAV file.
+    blocking = False
+
+    def __init__(self, path:str, sample_rate:int = AUDIO_SAMPLE_RATE) -> None:
+        self.output = wave.open(path, 'wb')
+        self.output.setnchannels(1)
+        self.output.setsampwidth(2)
+        self.output.setframerate(sample_rate)
+        self.samples = 0
+
+    def write(self, samples:bytes) -> None:
+        self.output.writeframesraw(samples)
+        self.samples += len(samples) // 2
+
+    def close(self) -> None:
+        # Fixes up the header with the final length
+        self.output.close()
+
+
+class Chip8DeviceSink:
+    # Plays on the default output device through sounddevice, which is not installed by
+    # requirements.txt. Writes block until the device takes the samples, pacing the player.
+    blocking = True
+
+    def __init__(self, sample_rate:int = AUDIO_SAMPLE_RATE) -> None:
+        import sounddevice
+        self.stream = sounddevice.RawOutputStream(samplerate=sample_rate, channels=1, dtype='int16',
+                                                  blocksize=sample_rate // TIMER_FREQUENCY, latency='low')
+        self.stream.start()
+
+    def write(self, samples:bytes) -> None:
+        self.stream.write(samples)
+
+    def close(self) -> None:
+        self.stream.stop()
+        self.stream.close()
+
+
+class Chip8Audio(threading.Thread):
+    # Buzzer of the sound timer. The emulation calls frame() once per 60Hz timer tick (it is
+    # set as cpu.buzzer), which only pushes the precomputed tone or silence chunk of the frame
+    # into the ring. This thread plays them into the sink: live (realtime) it plays the newest
+    # chunk once per frame, otherwise every chunk in order, for WAV dumps of headless runs.
+    def __init__(self, sink, realtime:bool = True, sample_rate:int = AUDIO_SAMPLE_RATE,
+                 frequency:int = BUZZER_FREQUENCY, volume:float = AUDIO_VOLUME) -> None:
+        super().__init__(name='chip8-audio', daemon=True)
+        self.sink = sink
+        self.realtime = realtime
+        self.ring = Chip8AudioRing(REALTIME_RING_FRAMES if realtime else OFFLINE_RING_FRAMES)
+        self.running = True
+
+        # One frame of samples each. The tone starts every frame at the same phase, so chunks
+        # follow each other without a click as long as a frame holds whole periods.
+        samples = sample_rate // TIMER_FREQUENCY
+        period = sample_rate / frequency
+        amplitude = int(32767 * volume)
+        self.tone = array('h', (amplitude if (sample % period) < period / 2 else -amplitude for sample in range(samples))).tobytes()
+        self.silence = bytes(2 * samples)
+
+    def frame(self, sound:bool) -> None:
+        # Called on the emulation thread. Live it never waits, a frame the player has no room for
+        # is dropped. A file must get every frame, so a headless run faster than the writer waits for it.
+        chunk = self.tone if sound else self.silence
+        if self.realtime:
+            self.ring.push(chunk)
+            return
+        ring = self.ring
+        while len(ring) >= ring.capacity:
+            time.sleep(0)
+        ring.push(chunk)
+
+    def stop(self) -> None:
+        # Played out once the chunks left in the ring are, for an offline sink
+        self.running = False
+
+    def run(self) -> None:
+        frame_time = 1 / TIMER_FREQUENCY
+        ring = self.ring
+        sink = self.sink
+        deadline = time.perf_counter()
+        # The last chunk is repeated for one frame the emulation is late with, silence after that
+        held = None
+        while self.running or (not self.realtime and ring):
+            if not self.realtime:
+                chunk = ring.pop()
+                if chunk is None:
+                    time.sleep(frame_time / 4)
+                else:
+                    sink.write(chunk)
+                continue
+
+            chunk = ring.latest()
+            if chunk is None:
+                chunk, held = held or self.silence, None
+            else:
+                held = chunk
+            sink.write(chunk)
+            if not sink.blocking:
+                deadline += frame_time
+                now = time.perf_counter()
+                if deadline < now:
+                    # Fell behind, e.g. the host stalled: continue from now instead of catching up
+                    deadline = now
+                time.sleep(deadline - now)
+        sink.close()
@@ -0,0 +1,272 @@
+import numpy as np
+from .config import SCREEN_WIDTH, SCREEN_HEIGHT, MEM_SIZE, PROG_COUNTER, FONT, TIMER_FREQUENCY
+
+
+class BatchChip8:
+    # Runs N independent machines in lockstep. Every step fetches one opcode per machine,
+    # groups the machines by operation and applies each operation as a masked NumPy update,
+    # reproducing the semantics of the Chip8CPU handlers.
+    def __init__(self, n:int, seed:int|None = None) -> None:
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        # MEMORY
+        self.memory = np.zeros((n, MEM_SIZE), dtype=np.uint8)
+        # REGISTERS
+        self.v = np.zeros((n, 16), dtype=np.uint8)
+        self.i = np.zeros(n, dtype=np.int32)
+        self.sp = np.full(n, 0x52, dtype=np.int32)
+        self.pc = np.full(n, PROG_COUNTER, dtype=np.int32)
+        # TIMER
+        self.st = np.zeros(n, dtype=np.uint8)
+        self.dt = np.zeros(n, dtype=np.uint8)
+        # DISPLAY
+        self.display = np.zeros((n, SCREEN_HEIGHT, SCREEN_WIDTH), dtype=bool)
+        # KEYPAD, and the key each machine waits to be released in FX0A (-1 if none)
+        self.keys = np.zeros((n, 16), dtype=bool)
+        self.awaited_key = np.full(n, -1, dtype=np.int8)
+        # Machines stopped by fetching or returning from outside memory, where Chip8CPU raises
+        # IndexError. Only these machines stop, the rest of the batch keeps running.
+        self.crashed = np.zeros(n, dtype=bool)
+
+        self.operation_lookup = {
+            0x0: self._0___,
+            0x1: self._1NNN,
+            0x2: self._2NNN,
+            0x3: self._3XNN,
+            0x4: self._4XNN,
+            0x5: self._5XY0,
+            0x6: self._6XNN,
+            0x7: self._7XNN,
+            0x8: self._8___,
+            0x9: self._9XY0,
+            0xA: self._ANNN,
+            0xB: self._BNNN,
+            0xC: self._CXNN,
+            0xD: self._DXYN,
+            0xE: self._E___,
+            0xF: self._F___,
+        }
+
+        self.memory[:, :len(FONT)] = FONT
+
+    def load_rom(self, file:str|bytes, machines=slice(None), mem_origin:int = PROG_COUNTER) -> None:
+        if isinstance(file, str):
+            with open(file, 'rb') as rom:
+                file = rom.read()
+        self.memory[machines, mem_origin : mem_origin + len(file)] = np.frombuffer(file, dtype=np.uint8)
+
+    def run(self, cycles:int, cpu_clockspeed:int = 500) -> None:
+        # Runs the given number of steps, ticking the timers at 60Hz of emulated time.
+        cycles_per_timer = max(1, cpu_clockspeed // TIMER_FREQUENCY)
+        for cycle in range(cycles):
+            self.step()
+            if (cycle + 1) % cycles_per_timer == 0:
+                self.tick_timers()
+
+    def tick_timers(self) -> None:
+        self.st -= self.st > 0
+        self.dt -= self.dt > 0
+
+    def step(self) -> None:
+        self.crashed |= self.pc > MEM_SIZE - 2
+        rows = np.flatnonzero(~self.crashed)
+        pc = self.pc[rows]
+        opcode = (self.memory[rows, pc].astype(np.int32) << 8) | self.memory[rows, pc + 1]
+        self.pc[rows] = pc + 2
+        operation = opcode >> 12
+        for group in np.unique(operation):
+            sel = operation == group
+            self.operation_lookup[group](rows[sel], opcode[sel])
+
+    # Every handler receives the indices m of the machines executing it and their opcodes.
+
+    def _0___(self, m, opcode) -> None:
+        clear = m[opcode == 0x00E0]
+        self.display[clear] = False
+        ret = m[opcode == 0x00EE]
+        overflowed = self.sp[ret] > MEM_SIZE
+        if overflowed.any():
+            # The return address would be read past the end of memory
+            self.crashed[ret[overflowed]] = True
+            ret = ret[~overflowed]
+        if ret.size:
+            # Return from Subroutine
+            self.sp[ret] -= 1
+            self.pc[ret] = self.memory[ret, self.sp[ret]].astype(np.int32) << 8
+            self.sp[ret] -= 1
+            self.pc[ret] += self.memory[ret, self.sp[ret]]
+
+    def _1NNN(self, m, opcode) -> None:
+        self.pc[m] = opcode & 0x0FFF
+
+    def _2NNN(self, m, opcode) -> None:
+        sp = self.sp[m]
+        # Like Chip8Memory.write, the bytes of an overflowed stack past the end of memory are dropped
+        for offset, byte in enumerate((self.pc[m] & 0x00FF, (self.pc[m] & 0xFF00) >> 8)):
+            ok = sp + offset < MEM_SIZE
+            self.memory[m[ok], sp[ok] + offset] = byte[ok]
+        self.sp[m] = sp + 2
+        self.pc[m] = opcode & 0x0FFF
+
+    def _skip(self, m, condition) -> None:
+        self.pc[m[condition]] += 2
+
+    def _3XNN(self, m, opcode) -> None:
+        self._skip(m, self.v[m, (opcode & 0x0F00) >> 8] == (opcode & 0x00FF))
+
+    def _4XNN(self, m, opcode) -> None:
+        self._skip(m, self.v[m, (opcode & 0x0F00) >> 8] != (opcode & 0x00FF))
+
+    def _5XY0(self, m, opcode) -> None:
+        self._skip(m, self.v[m, (opcode & 0x0F00) >> 8] == self.v[m, (opcode & 0x00F0) >> 4])
+
+    def _9XY0(self, m, opcode) -> None:
+        self._skip(m, self.v[m, (opcode & 0x0F00) >> 8] != self.v[m, (opcode & 0x00F0) >> 4])
+
+    def _6XNN(self, m, opcode) -> None:
+        self.v[m, (opcode & 0x0F00) >> 8] = opcode & 0x00FF
+
+    def _7XNN(self, m, opcode) -> None:
+        x = (opcode & 0x0F00) >> 8
+        self.v[m, x] = (self.v[m, x] + (opcode & 0x00FF)) & 0xFF
+
+    def _8___(self, m, opcode) -> None:
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
+        vx = self.v[m, x].astype(np.int32)
+        vy = self.v[m, y].astype(np.int32)
+        operation = opcode & 0x000F
+        result = vx.copy()
+        # VF per machine, -1 where the operation leaves VF unchanged
+        flag = np.full(m.size, -1, dtype=np.int32)
+
+        sel = operation == 0x0
+        result[sel] = vy[sel]
+        sel = operation == 0x1
+        result[sel] = vx[sel] | vy[sel]
+        sel = operation == 0x2
+        result[sel] = vx[sel] & vy[sel]
+        sel = operation == 0x3
+        result[sel] = vx[sel] ^ vy[sel]
+        sel = operation == 0x4
+        result[sel] = vx[sel] + vy[sel]
+        flag[sel] = result[sel] > 0xFF
+        sel = operation == 0x5
+        result[sel] = vx[sel] - vy[sel]
+        flag[sel] = vx[sel] >= vy[sel]
+        sel = operation == 0x6
+        result[sel] = vx[sel] >> 1
+        flag[sel] = vx[sel] & 0x1
+        sel = operation == 0x7
+        result[sel] = vy[sel] - vx[sel]
+        flag[sel] = vy[sel] >= vx[sel]
+        sel = operation == 0xE
+        result[sel] = vx[sel] << 1
+        flag[sel] = (vx[sel] & 0x80) >> 7
+
+        # VF is written after VX, so it wins when X is F
+        self.v[m, x] = result & 0xFF
+        sel = flag >= 0
+        self.v[m[sel], 0xF] = flag[sel]
+
+    def _ANNN(self, m, opcode) -> None:
+        self.i[m] = opcode & 0x0FFF
+
+    def _BNNN(self, m, opcode) -> None:
+        self.pc[m] = self.v[m, 0].astype(np.int32) + (opcode & 0x0FFF)
+
+    def _CXNN(self, m, opcode) -> None:
+        rnd = self.rng.integers(0, 0x100, size=m.size)
+        self.v[m, (opcode & 0x0F00) >> 8] = rnd & opcode & 0x00FF
+
+    def _DXYN(self, m, opcode) -> None:
+        # Draws every sprite row in one masked XOR across machines, clipping at the edges.
+        x_origin = self.v[m, (opcode & 0x0F00) >> 8] % SCREEN_WIDTH
+        y_origin = self.v[m, (opcode & 0x00F0) >> 4] % SCREEN_HEIGHT
+        n = opcode & 0x000F
+        collision = np.zeros(m.size, dtype=bool)
+        x_coord = x_origin[:, None].astype(np.int32) + np.arange(8)
+        for y_offset in range(int(n.max(initial=0))):
+            y_coord = y_origin.astype(np.int32) + y_offset
+            address = self.i[m] + y_offset
+            active = (y_offset < n) & (y_coord < SCREEN_HEIGHT) & (address < MEM_SIZE)
+            sprite_row = self.memory[m, np.minimum(address, MEM_SIZE - 1)]
+            pixels = np.unpackbits(sprite_row[:, None], axis=1).astype(bool)
+            pixels &= (x_coord < SCREEN_WIDTH) & active[:, None]
+            machine, column = np.nonzero(pixels)
+            if not machine.size:
+                continue
+            target = (m[machine], y_coord[machine], x_coord[machine, column])
+            screen_pixel = self.display[target]
+            collision[machine[screen_pixel]] = True
+            self.display[target] = ~screen_pixel
+        self.v[m, 0xF] = collision
+
+    def _E___(self, m, opcode) -> None:
+        pressed = self.keys[m, self.v[m, (opcode & 0x0F00) >> 8] & 0xF]
+        operation = opcode & 0x00FF
+        self._skip(m, ((operation == 0x9E) & pressed) | ((operation == 0xA1) & ~pressed))
+
+    def _F___(self, m, opcode) -> None:
+        x = (opcode & 0x0F00) >> 8
+        operation = opcode & 0x00FF
+
+        sel = operation == 0x07
+        self.v[m[sel], x[sel]] = self.dt[m[sel]]
+        sel = operation == 0x15
+        self.dt[m[sel]] = self.v[m[sel], x[sel]]
+        sel = operation == 0x18
+        self.st[m[sel]] = self.v[m[sel], x[sel]]
+        sel = operation == 0x1E
+        self.i[m[sel]] += self.v[m[sel], x[sel]]
+        sel = operation == 0x29
+        self.i[m[sel]] = 5 * self.v[m[sel], x[sel]].astype(np.int32)
+
+        sel = operation == 0x0A
+        if sel.any():
+            self._FX0A(m[sel], x[sel])
+
+        sel = operation == 0x33
+        if sel.any():
+            mm, vx = m[sel], self.v[m[sel], x[sel]]
+            for offset, digit in enumerate((vx // 100, vx // 10 % 10, vx % 10)):
+                address = self.i[mm] + offset
+                ok = address < MEM_SIZE
+                self.memory[mm[ok], address[ok]] = digit[ok]
+
+        # Stores / fills V0 to VX (including VX) at I. I itself is left unmodified.
+        sel = operation == 0x55
+        if sel.any():
+            mm, xx = m[sel], x[sel]
+            for reg in range(int(xx.max()) + 1):
+                address = self.i[mm] + reg
+                ok = (reg <= xx) & (address < MEM_SIZE)
+                self.memory[mm[ok], address[ok]] = self.v[mm[ok], reg]
+        sel = operation == 0x65
+        if sel.any():
+            mm, xx = m[sel], x[sel]
+            for reg in range(int(xx.max()) + 1):
+                address = self.i[mm] + reg
+                ok = (reg <= xx) & (address < MEM_SIZE)
+                self.v[mm[ok], reg] = self.memory[mm[ok], address[ok]]
+
+    def _FX0A(self, m, x) -> None:
+        # Same state machine as Chip8CPU._FX0A: remember the first key pressed, then wait for its release.
+        awaited = self.awaited_key[m]
+        waiting = awaited < 0
+        if waiting.any():
+            mw = m[waiting]
+            pressed = self.keys[mw]
+            self.awaited_key[mw] = np.where(pressed.any(axis=1), pressed.argmax(axis=1), -1)
+        held = ~waiting
+        held[held] = self.keys[m[held], awaited[held]]
+        self.pc[m[waiting | held]] -= 2
+        released = ~waiting & ~held
+        mr = m[released]
+        self.v[mr, x[released]] = awaited[released]
+        self.awaited_key[mr] = -1
+
+    def screen_rows(self, machine:int) -> list:
+        # Row bitmaps of one machine in the same layout as Chip8Framebuffer.rows
+        packed = np.packbits(self.display[machine], axis=1)
+        return [int.from_bytes(row.tobytes(), 'big') for row in packed]
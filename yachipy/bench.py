@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import platform
+import tracemalloc
+from .headless import Chip8Headless
+from .profiler import Chip8Profiler
+
+ROM_DIRS = [os.path.join(os.path.dirname(__file__), 'roms', name) for name in ('game_roms', 'test_roms')]
+# Share a metric may get worse by before compare() reports a regression
+REGRESSION_THRESHOLD = 0.10
+
+
+def list_roms(rom_dirs:list = ROM_DIRS) -> list:
+    return sorted(
+        os.path.join(rom_dir, name) for rom_dir in rom_dirs for name in os.listdir(rom_dir)
+        if os.path.isfile(os.path.join(rom_dir, name)) and not name.endswith('.txt')
+    )
+
+
+def rom_name(rom:str) -> str:
+    # Directory and file name, e.g. 'game_roms/BRIX'
+    return '/'.join(os.path.normpath(rom).split(os.sep)[-2:])
+
+
+def bench_rom(rom:str, cycles:int, clockspeed:int = 500, jit:bool = False, repeat:int = 3, seed:int = 0) -> dict:
+    # Throughput is the best of repeat runs, in instructions actually executed: the cycles of idle
+    # loops fast-forwarded or spent halted in FX0A are reported apart. Opcode class times and
+    # allocations come from separate runs, so their instrumentation does not weigh on the throughput.
+    chip8 = Chip8Headless(cpu_clockspeed=clockspeed, jit=jit, seed=seed)
+    best = None
+    for _ in range(repeat):
+        chip8.load_rom(rom)
+        elapsed = chip8.run(cycles)
+        best = elapsed if best is None else min(best, elapsed)
+    halted = chip8.cpu.halted
+    # The same every run, the emulation is deterministic
+    skipped = chip8.cpu.idle_skipped + chip8.halted_cycles
+
+    chip8 = Chip8Headless(cpu_clockspeed=clockspeed, seed=seed)
+    profiler = Chip8Profiler(chip8.cpu)
+    profiler.attach()
+    chip8.load_rom(rom)
+    chip8.run(cycles)
+    profiler.detach()
+    # Opcode class, the high nibble of the opcode, is the first character of the handler name
+    classes = {}
+    for name, (count, time_ns) in sorted(profiler.stats.items()):
+        if count:
+            stats = classes.setdefault(name[1], {'count': 0, 'time_ns': 0})
+            stats['count'] += count
+            stats['time_ns'] += time_ns
+    draws, draw_time = profiler.stats['_DXYN']
+
+    chip8 = Chip8Headless(cpu_clockspeed=clockspeed, jit=jit, seed=seed)
+    chip8.load_rom(rom)
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+    chip8.run(cycles)
+    end_size, peak_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'cycles': cycles,
+        'wall_time': best,
+        'ips': (cycles - skipped) / max(best, 1e-9),
+        'executed': cycles - skipped,
+        # Fast-forwarded idle loop iterations and cycles halted in FX0A, not part of ips
+        'skipped': skipped,
+        # Waiting for a key in FX0A at the end
+        'halted': halted,
+        'classes': classes,
+        'dxyn_ns': draw_time / draws if draws else None,
+        'alloc_peak_bytes': peak_size - start_size,
+        'alloc_net_bytes': end_size - start_size,
+    }
+
+
+def run_bench(roms:list, cycles:int, clockspeed:int = 500, jit:bool = False, repeat:int = 3) -> dict:
+    results = {
+        'cycles': cycles,
+        'clockspeed': clockspeed,
+        'jit': jit,
+        'python': platform.python_version(),
+        'roms': {},
+    }
+    for rom in roms:
+        results['roms'][rom_name(rom)] = bench_rom(rom, cycles, clockspeed, jit, repeat)
+    return results
+
+
+def compare(baseline:dict, results:dict, threshold:float = REGRESSION_THRESHOLD) -> list:
+    # Returns (rom, metric, baseline value, new value) for every metric worse by more than threshold.
+    regressions = []
+    for name, result in results['roms'].items():
+        before = baseline['roms'].get(name)
+        if before is None:
+            continue
+        if result['ips'] < before['ips'] * (1 - threshold):
+            regressions.append((name, 'ips', before['ips'], result['ips']))
+        if result['dxyn_ns'] and before['dxyn_ns'] and result['dxyn_ns'] > before['dxyn_ns'] * (1 + threshold):
+            regressions.append((name, 'dxyn_ns', before['dxyn_ns'], result['dxyn_ns']))
+        if result['alloc_peak_bytes'] > max(before['alloc_peak_bytes'], 1024) * (1 + threshold):
+            regressions.append((name, 'alloc_peak_bytes', before['alloc_peak_bytes'], result['alloc_peak_bytes']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='yachipy.bench', description='Benchmark the interpreter on the bundled roms')
+    parser.add_argument('roms', nargs='*', help='roms to run (default: every rom in roms/game_roms and roms/test_roms)')
+    parser.add_argument('--cycles', type=int, default=100000, help='cycles to run every rom for')
+    parser.add_argument('--clockspeed', type=int, default=500, help='emulated cpu clockspeed (Hz) used for timers')
+    parser.add_argument('--jit', action='store_true', help='measure the throughput of the basic-block JIT')
+    parser.add_argument('--repeat', type=int, default=3, help='throughput runs per rom, the best one is kept')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results of an earlier run to check for regressions')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    results = run_bench(args.roms or list_roms(), args.cycles, args.clockspeed, args.jit, args.repeat)
+
+    print(f"{'rom':<34} {'ips':>12} {'DXYN ns':>9} {'peak KiB':>9}  hottest classes (share of handler time)")
+    for name, result in results['roms'].items():
+        handler_time = sum(stats['time_ns'] for stats in result['classes'].values()) or 1
+        hottest = sorted(result['classes'].items(), key=lambda item: -item[1]['time_ns'])[:3]
+        shares = ' '.join(f"{opcode_class}:{stats['time_ns'] / handler_time:.0%}" for opcode_class, stats in hottest)
+        dxyn = f"{result['dxyn_ns']:.0f}" if result['dxyn_ns'] else '-'
+        notes = ''
+        if result['skipped']:
+            notes += f" (skipped {result['skipped'] / result['cycles']:.0%})"
+        if result['halted']:
+            notes += ' (halted)'
+        print(f"{name:<34} {result['ips']:>12,.0f} {dxyn:>9} {result['alloc_peak_bytes'] / 1024:>9.1f}  {shares}{notes}")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(baseline, results, args.threshold)
+        for name, metric, before, after in regressions:
+            print(f'REGRESSION {name} {metric}: {before:,.0f} -> {after:,.0f}')
+        print(f'{len(regressions)} regressions over {args.threshold:.0%} against {args.compare}')
+        if regressions:
+            raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
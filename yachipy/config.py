@@ -1,72 +1,70 @@
-import dearpygui.dearpygui as dpg
-
-ACCENT_COLOR = [29,151,236]
-NEUTRAL_COLOR = [51,51,55]
-DULL_COLOR = [150,150,150]
-
-SCREEN_WIDTH = 64
-SCREEN_HEIGHT = 32
-DISP_BUFFER_SIZE = SCREEN_WIDTH * SCREEN_HEIGHT
-SCALE = 15
-
-MEM_SIZE = 4096
-PROG_COUNTER = 0x200
-
-ROM_FOLDER = 'yachipy/roms/game_roms'
-
-FONT = [
-    0xF0, 0x90, 0x90, 0x90, 0xF0,   # 0 -> start_index =  0
-    0x20, 0x60, 0x20, 0x20, 0x70,   # 1 -> start_index =  5
-    0xF0, 0x10, 0xF0, 0x80, 0xF0,   # 2 -> start_index = 10
-    0xF0, 0x10, 0xF0, 0x10, 0xF0,   # 3 -> start_index = 15
-    0x90, 0x90, 0xF0, 0x10, 0x10,   # 4 -> start_index = 20
-    0xF0, 0x80, 0xF0, 0x10, 0xF0,   # 5 -> start_index = 25
-    0xF0, 0x80, 0xF0, 0x90, 0xF0,   # 6 -> start_index = 30
-    0xF0, 0x10, 0x20, 0x40, 0x40,   # 7 -> start_index = 35
-    0xF0, 0x90, 0xF0, 0x90, 0xF0,   # 8 -> start_index = 40
-    0xF0, 0x90, 0xF0, 0x10, 0xF0,   # 9 -> start_index = 45
-    0xF0, 0x90, 0xF0, 0x90, 0x90,   # A -> start_index = 50
-    0xE0, 0x90, 0xE0, 0x90, 0xE0,   # B -> start_index = 55
-    0xF0, 0x80, 0x80, 0x80, 0xF0,   # C -> start_index = 60
-    0xE0, 0x90, 0x90, 0x90, 0xE0,   # D -> start_index = 65
-    0xF0, 0x80, 0xF0, 0x80, 0xF0,   # E -> start_index = 70
-    0xF0, 0x80, 0xF0, 0x80, 0x80    # F -> start_index = 75
-]
-
-KEY_MAP = {
-    0x0: dpg.mvKey_X,
-    0x1: dpg.mvKey_1,
-    0x2: dpg.mvKey_2,
-    0x3: dpg.mvKey_3,
-    0x4: dpg.mvKey_Q,
-    0x5: dpg.mvKey_W,
-    0x6: dpg.mvKey_E,
-    0x7: dpg.mvKey_A,
-    0x8: dpg.mvKey_S,
-    0x9: dpg.mvKey_D,
-    0xA: dpg.mvKey_Z,
-    0xB: dpg.mvKey_C,
-    0xC: dpg.mvKey_4,
-    0xD: dpg.mvKey_R,
-    0xE: dpg.mvKey_F,
-    0xF: dpg.mvKey_V,
-}
-
-KEY_MAP_R = {
-    dpg.mvKey_X: 0x0, 
-    dpg.mvKey_1: 0x1, 
-    dpg.mvKey_2: 0x2, 
-    dpg.mvKey_3: 0x3, 
-    dpg.mvKey_Q: 0x4, 
-    dpg.mvKey_W: 0x5, 
-    dpg.mvKey_E: 0x6, 
-    dpg.mvKey_A: 0x7, 
-    dpg.mvKey_S: 0x8, 
-    dpg.mvKey_D: 0x9, 
-    dpg.mvKey_Z: 0xA, 
-    dpg.mvKey_C: 0xB, 
-    dpg.mvKey_4: 0xC, 
-    dpg.mvKey_R: 0xD, 
-    dpg.mvKey_F: 0xE, 
-    dpg.mvKey_V: 0xF, 
-}
\ No newline at end of file
+ACCENT_COLOR = [29,151,236]
+NEUTRAL_COLOR = [51,51,55]
+DULL_COLOR = [150,150,150]
+
+SCREEN_WIDTH = 64
+SCREEN_HEIGHT = 32
+DISP_BUFFER_SIZE = SCREEN_WIDTH * SCREEN_HEIGHT
+# SUPER-CHIP high resolution mode
+HIRES_WIDTH = 128
+HIRES_HEIGHT = 64
+SCALE = 15
+
+MEM_SIZE = 4096
+# XO-CHIP addresses 64 KiB and draws on two bitplanes
+XO_MEM_SIZE = 0x10000
+XO_PLANES = 2
+PROG_COUNTER = 0x200
+
+TIMER_FREQUENCY = 60
+
+# Buzzer sounded while the sound timer is set. At these rates a 60Hz frame holds 800 samples,
+# exactly 8 periods of the square wave, so every frame can play the same precomputed chunk.
+AUDIO_SAMPLE_RATE = 48000
+BUZZER_FREQUENCY = 480
+# Amplitude as a share of the 16 bit range
+AUDIO_VOLUME = 0.2
+
+ROM_FOLDER = 'yachipy/roms/game_roms'
+# ROM analyses of the disassembler, keyed by ROM hash. ~ is expanded.
+CACHE_FOLDER = '~/.cache/yachipy'
+
+FONT = [
+    0xF0, 0x90, 0x90, 0x90, 0xF0,   # 0 -> start_index =  0
+    0x20, 0x60, 0x20, 0x20, 0x70,   # 1 -> start_index =  5
+    0xF0, 0x10, 0xF0, 0x80, 0xF0,   # 2 -> start_index = 10
+    0xF0, 0x10, 0xF0, 0x10, 0xF0,   # 3 -> start_index = 15
+    0x90, 0x90, 0xF0, 0x10, 0x10,   # 4 -> start_index = 20
+    0xF0, 0x80, 0xF0, 0x10, 0xF0,   # 5 -> start_index = 25
+    0xF0, 0x80, 0xF0, 0x90, 0xF0,   # 6 -> start_index = 30
+    0xF0, 0x10, 0x20, 0x40, 0x40,   # 7 -> start_index = 35
+    0xF0, 0x90, 0xF0, 0x90, 0xF0,   # 8 -> start_index = 40
+    0xF0, 0x90, 0xF0, 0x10, 0xF0,   # 9 -> start_index = 45
+    0xF0, 0x90, 0xF0, 0x90, 0x90,   # A -> start_index = 50
+    0xE0, 0x90, 0xE0, 0x90, 0xE0,   # B -> start_index = 55
+    0xF0, 0x80, 0x80, 0x80, 0xF0,   # C -> start_index = 60
+    0xE0, 0x90, 0x90, 0x90, 0xE0,   # D -> start_index = 65
+    0xF0, 0x80, 0xF0, 0x80, 0xF0,   # E -> start_index = 70
+    0xF0, 0x80, 0xF0, 0x80, 0x80    # F -> start_index = 75
+]
+
+# SUPER-CHIP 8x10 digits (XO-CHIP adds A-F), loaded at BIG_FONT_ADDRESS by the profiles that have FX30
+BIG_FONT_ADDRESS = 0x80
+BIG_FONT = [
+    0x3C, 0x7E, 0xE7, 0xC3, 0xC3, 0xC3, 0xC3, 0xE7, 0x7E, 0x3C,   # 0
+    0x18, 0x38, 0x58, 0x18, 0x18, 0x18, 0x18, 0x18, 0x18, 0x3C,   # 1
+    0x3E, 0x7F, 0xC3, 0x06, 0x0C, 0x18, 0x30, 0x60, 0xFF, 0xFF,   # 2
+    0x3C, 0x7E, 0xC3, 0x03, 0x0E, 0x0E, 0x03, 0xC3, 0x7E, 0x3C,   # 3
+    0x06, 0x0E, 0x1E, 0x36, 0x66, 0xC6, 0xFF, 0xFF, 0x06, 0x06,   # 4
+    0xFF, 0xFF, 0xC0, 0xC0, 0xFC, 0xFE, 0x03, 0xC3, 0x7E, 0x3C,   # 5
+    0x3E, 0x7C, 0xC0, 0xC0, 0xFC, 0xFE, 0xC3, 0xC3, 0x7E, 0x3C,   # 6
+    0xFF, 0xFF, 0x03, 0x06, 0x0C, 0x18, 0x30, 0x60, 0x60, 0x60,   # 7
+    0x3C, 0x7E, 0xC3, 0xC3, 0x7E, 0x7E, 0xC3, 0xC3, 0x7E, 0x3C,   # 8
+    0x3C, 0x7E, 0xC3, 0xC3, 0x7F, 0x3F, 0x03, 0x03, 0x3E, 0x7C,   # 9
+    0x7E, 0xFF, 0xC3, 0xC3, 0xC3, 0xFF, 0xFF, 0xC3, 0xC3, 0xC3,   # A
+    0xFC, 0xFC, 0xC3, 0xC3, 0xFC, 0xFC, 0xC3, 0xC3, 0xFC, 0xFC,   # B
+    0x3C, 0xFF, 0xC3, 0xC0, 0xC0, 0xC0, 0xC0, 0xC3, 0xFF, 0x3C,   # C
+    0xFC, 0xFE, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xC3, 0xFE, 0xFC,   # D
+    0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF,   # E
+    0xFF, 0xFF, 0xC0, 0xC0, 0xFF, 0xFF, 0xC0, 0xC0, 0xC0, 0xC0    # F
+]
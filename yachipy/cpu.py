@@ -1,454 +1,841 @@
-import dearpygui.dearpygui as dpg
-from random import randint
-from .config import SCREEN_WIDTH, SCREEN_HEIGHT, MEM_SIZE, PROG_COUNTER, FONT, KEY_MAP
-
-class Chip8CPU:
-    def __init__(self, screen) -> None:
-        # MEMORY
-        self.memory = bytearray(MEM_SIZE)
-        # REGISTERS
-        self.v = [0] * 16
-        self.i = 0
-        self.sp = 0x52
-        self.pc = PROG_COUNTER
-        # TIMER
-        self.st = 0
-        self.dt = 0
-        
-        # DEBUG VARIABLES
-        self.update_indices = {
-            'registers': set([]),
-            'memory': set([]),
-        }
-
-        self.operation_lookup = {
-            0x0000: self._0___,
-            0x1000: self._1NNN,
-            0x2000: self._2NNN,
-            0x3000: self._3XNN,
-            0x4000: self._4XNN,
-            0x5000: self._5XY0,
-            0x6000: self._6XNN,
-            0x7000: self._7XNN,
-            0x8000: self._8___,
-            0x9000: self._9XY0,
-            0xA000: self._ANNN,
-            0xB000: self._BNNN,
-            0xC000: self._CXNN,
-            0xD000: self._DXYN,
-            0xE000: self._E___,
-            0xF000: self._F___,
-        }
-        
-        self.opcode = None
-        self.screen = screen
-
-        self.load_into_memory(FONT, 0)
-        
-
-    def __str__(self) -> str:
-        pass
-    
-    def reset(self):
-        # MEMORY
-        self.memory = bytearray(4096)
-        # REGISTERS
-        self.v = [0] * 16
-        self.i = 0
-        self.sp = 0x52
-        self.pc = PROG_COUNTER
-        # TIMER
-        self.st = 0
-        self.dt = 0
-        self.opcode = None
-        self.load_into_memory(FONT, 0)
-        # DEBUG VARIABLES
-        self.update_indices = {
-            'registers': set([]),
-            'memory': set([]),
-        }
-
-
-
-    def load_into_memory(self, file: list|str, mem_origin: int = PROG_COUNTER) -> bool:
-        try:
-            if isinstance(file, str):
-                with open(file, 'rb') as rom:
-                    rom_content = rom.read()
-            elif isinstance(file, list):
-                rom_content = bytes(file)
-            self.memory[mem_origin : mem_origin + len(rom_content)] = rom_content
-            self.update_indices['memory'].update([i for i in range(mem_origin, mem_origin+len(rom_content))])
-            return True
-
-        except FileNotFoundError as error:
-            print(f'[Exception]: {error}')
-            return False
-    
-    def tick(self, opcode:int=None) -> int:
-        if opcode:
-            self.opcode = opcode
-        else:
-            self.opcode = self.memory[self.pc] << 8 | self.memory[self.pc + 1]
-            self.pc += 2
-        
-        operation = self.opcode & 0xF000
-        try:
-            self.operation_lookup[operation]()
-        except KeyError as error:
-            print(f'[ERROR] - Invalid Opcode')
-        return self.opcode
-
-    def tick_timers(self) -> None:
-        if self.st > 0:
-            self.st -= 1
-        if self.dt > 0:
-            self.dt -= 1
-    
-    def _0___(self) -> None:
-        # Further decoding required
-        if self.opcode == 0x00E0:
-            self._00E0()
-        elif self.opcode == 0x00EE:
-            self._00EE()
-    
-    def _00E0(self) -> None:
-        # Clear the screen.
-        self.screen.clear_screen()
-    
-    def _00EE(self) -> None:
-        # Return from Subroutine
-        self.sp -= 1
-        self.pc = self.memory[self.sp] << 8
-        self.sp -= 1
-        self.pc += self.memory[self.sp]
-    
-    def _1NNN(self) -> None:
-        # Jump to address NNN
-        nnn = self.opcode & 0x0FFF
-        self.pc = nnn
-    
-    def _2NNN(self) -> None:
-        # Call subroutine at NNN
-        nnn = self.opcode & 0x0FFF
-        self.memory[self.sp] = self.pc & 0x00FF
-        self.sp += 1
-        self.memory[self.sp] = (self.pc & 0xFF00) >> 8
-        self.sp += 1
-        self.pc = nnn
-    
-    def _3XNN(self) -> None:
-        # Skips the next instruction if VX equals NN.
-        x = (self.opcode & 0x0F00) >> 8 
-        nn = self.opcode & 0x00FF
-        if self.v[x] == nn:
-            self.pc += 2
-    
-    def _4XNN(self) -> None:
-        # Skips the next instruction if VX does not equal NN.
-        x = (self.opcode & 0x0F00) >> 8 
-        nn = self.opcode & 0x00FF
-        if self.v[x] != nn:
-            self.pc += 2
-    
-    def _5XY0(self) -> None:
-        # Skips the next instruction if VX equals VY.
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        if self.v[x] == self.v[y]:
-            self.pc += 2 
-        
-
-    def _6XNN(self) -> None:
-        # Sets VX to NN
-        x = (self.opcode & 0x0F00) >> 8
-        nn = self.opcode & 0x00FF
-        self.v[x] = nn
-        self.update_indices['registers'].update([x])
-
-    
-    def _7XNN(self) -> None:
-        # Adds NN to VX. (Carry flag is not changed)
-        x = (self.opcode & 0x0F00) >> 8
-        nn = self.opcode & 0x00FF
-        self.v[x] = (self.v[x] + nn) & 0xFF
-        self.update_indices['registers'].update([x])
-
-    def _8___(self) -> None:
-        # Further decoding required
-        operation = self.opcode & 0x000F
-        if operation == 0x0000:
-            self._8XY0()
-        elif operation == 0x0001:
-            self._8XY1()
-        elif operation == 0x0002:
-            self._8XY2()
-        elif operation == 0x0003:
-            self._8XY3()
-        elif operation == 0x0004:
-            self._8XY4()
-        elif operation == 0x0005:
-            self._8XY5()
-        elif operation == 0x0006:
-            self._8XY6()
-        elif operation == 0x0007:
-            self._8XY7()
-        elif operation == 0x000E:
-            self._8XYE()
-    
-    def _8XY0(self) -> None:
-        # Sets VX to the value of VY.
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        self.v[x] = self.v[y]
-        self.update_indices['registers'].update([x])
-
-
-    def _8XY1(self) -> None:
-        # Sets VX to VX or VY. (Bitwise OR operation);
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        self.v[x] |= self.v[y]
-        self.update_indices['registers'].update([x])
-
-
-    def _8XY2(self) -> None:
-        # Sets VX to VX and VY. (Bitwise AND operation);
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        self.v[x] &= self.v[y]
-        self.update_indices['registers'].update([x])
-
-
-    def _8XY3(self) -> None:
-        # Sets VX to VX xor VY.
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        self.v[x] ^= self.v[y]
-        self.update_indices['registers'].update([x])
-
-
-
-    def _8XY4(self) -> None:
-        # Adds VY to VX. VF is set to 1 when there's a carry, and to 0 when there is not.
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        result = self.v[x] + self.v[y]
-        carry = 0
-        if result > 0xFF:
-            result &= 0xFF
-            carry = 1
-        self.v[x] = result
-        self.v[0xF] = carry
-        self.update_indices['registers'].update([x, 0xF])
-
-
-    def _8XY5(self) -> None:
-        # VY is subtracted from VX. VF is set to 0 when there's a borrow, and 1 when there is not.
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        result = self.v[x] - self.v[y]
-        borrow = 1
-        if self.v[x] < self.v[y]:
-            result &= 0xFF
-            borrow = 0
-        self.v[x] = result
-        self.v[0xF] = borrow
-        self.update_indices['registers'].update([x, 0xF])
-
-
-
-    def _8XY6(self) -> None:
-        # Stores the least significant bit of VX in VF and then shifts VX to the right by 1.
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        dropped_bit = self.v[x] & 0x1
-        self.v[x] >>= 1
-        self.v[0xF] = dropped_bit
-        self.update_indices['registers'].update([x, 0xF])
-
-
-    def _8XY7(self) -> None:
-        # Sets VX to VY minus VX. VF is set to 0 when there's a borrow, and 1 when there is not.
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        result = self.v[y] - self.v[x]
-        borrow = 1
-        if self.v[y] < self.v[x]:
-            result &= 0xFF
-            borrow = 0
-        self.v[x] = result
-        self.v[0xF] = borrow
-        self.update_indices['registers'].update([x, 0xF])
-
-
-    def _8XYE(self) -> None:
-        # Stores the most significant bit of VX in VF and then shifts VX to the left by 1.
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        dropped_bit = (self.v[x] & 0x80) >> 7
-        self.v[x] = (self.v[x] << 1) & 0xFF
-        self.v[0xF] = dropped_bit
-        self.update_indices['registers'].update([x, 0xF])
-
-    
-    def _9XY0(self) -> None:
-        # Skips the next instruction if VX does not equal VY. (Usually the next instruction is a jump to skip a code block)
-        x = (self.opcode & 0x0F00) >> 8 
-        y = (self.opcode & 0x00F0) >> 4
-        if self.v[x] != self.v[y]:
-            self.pc += 2
-
-    def _ANNN(self) -> None:
-        # Sets I to the address NNN.
-        nnn = self.opcode & 0x0FFF
-        self.i = nnn
-    
-    def _BNNN(self) -> None:
-        # Jumps to the address NNN plus V0.
-        nnn = self.opcode & 0x0FFF
-        self.pc = self.v[0] + nnn
-    
-    def _CXNN(self) -> None:
-        # Sets VX to the result of a bitwise and operation on a random number (Typically: 0 to 255) and NN.
-        x = (self.opcode & 0x0F00) >> 8
-        nn = self.opcode & 0x00FF
-        rnd = randint(0, 0xFF)
-        self.v[x] = rnd & nn
-        self.update_indices['registers'].update([x])
-
-    
-    def _DXYN(self) -> None:
-        # Draws a sprite at coordinate (VX, VY) that has a width of 8 pixels and a height of N pixels.
-        # Each row of 8 pixels is read as bit-coded starting from memory location I;
-        # I value does not change after the execution of this instruction. As described above,
-        # VF is set to 1 if any screen pixels are flipped from set to unset when the sprite is drawn, and to 0 if that does not happen
-        x = (self.opcode & 0x0F00) >> 8
-        y = (self.opcode & 0x00F0) >> 4
-        n = self.opcode & 0x000F
-        x_origin = self.v[x] % SCREEN_WIDTH
-        y_origin = self.v[y] % SCREEN_HEIGHT
-        self.v[0xF] = 0
-        self.update_indices['registers'].update([0xF])
-        for y_offset in range(n):
-            sprite_pixel_row = bin(self.memory[self.i + y_offset])[2:].zfill(8)
-            y_coord = y_origin + y_offset
-            if y_coord >= SCREEN_HEIGHT: break
-
-            for x_offset in range(8):
-                x_coord = x_origin + x_offset
-                if x_coord >= SCREEN_WIDTH: break
-                
-                idx = SCREEN_WIDTH * y_coord + x_coord
-                sprite_pixel = int(sprite_pixel_row[x_offset])
-                screen_pixel = self.screen.is_pixel_on(idx)
-
-                if sprite_pixel and screen_pixel:
-                    self.v[0xF] = 1
-                    self.screen.turn_pixel_off(idx)
-                elif sprite_pixel and not screen_pixel:
-                    self.screen.turn_pixel_on(idx)
-        
-    def _E___(self) -> None:
-        # Further decoding required
-        operation = self.opcode & 0x000F
-        if operation == 0x000E:
-            self._EX9E()
-        elif operation == 0x0001:
-            self._EXA1()
-    
-    def _EX9E(self) -> None:
-        # Skips the next instruction if the key stored in VX is pressed. (Usually the next instruction is a jump to skip a code block);
-        x = (self.opcode & 0x0F00) >> 8
-        if dpg.is_key_down(KEY_MAP[self.v[x]]):
-            self.pc += 2
-        
-        
-
-    def _EXA1(self) -> None:
-        # Skips the next instruction if the key stored in VX is not pressed. (Usually the next instruction is a jump to skip a code block)
-        x = (self.opcode & 0x0F00) >> 8
-        if not dpg.is_key_down(KEY_MAP[self.v[x]]):
-            self.pc += 2
-    
-    def _F___(self) -> None:
-        operation = self.opcode & 0x00FF
-        if operation == 0x0007:
-            self._FX07()
-        elif operation == 0x000A:
-            self._FX0A()
-        elif operation == 0x0015:
-            self._FX15()
-        elif operation == 0x0018:
-            self._FX18()
-        elif operation == 0x001E:
-            self._FX1E()
-        elif operation == 0x0029:
-            self._FX29()
-        elif operation == 0x0033:
-            self._FX33()
-        elif operation == 0x0055:
-            self._FX55()
-        elif operation == 0x0065:
-            self._FX65()
-    
-    def _FX07(self) -> None:
-        # Sets VX to the value of the delay timer.
-        x = (self.opcode & 0x0F00) >> 8
-        self.v[x] = self.dt
-        self.update_indices['registers'].update([x])
-
-    
-    def _FX0A(self) -> None:
-        # A key press is awaited, and then stored in VX. (Blocking Operation. All instruction halted until next key event)
-        x = (self.opcode & 0x0F00) >> 8
-        for key in KEY_MAP:
-            if dpg.is_key_down(KEY_MAP[key]):
-                self.v[x] = key
-                self.update_indices['registers'].update([x])
-                while dpg.is_key_down(KEY_MAP[key]):
-                    dpg.render_dearpygui_frame()
-                return
-        self.pc -= 2
-
-
-    def _FX15(self) -> None:
-        # Sets the delay timer to VX.
-        x = (self.opcode & 0x0F00) >> 8
-        self.dt = self.v[x]
-
-    def _FX18(self) -> None:
-        # Sets the sound timer to VX.
-        x = (self.opcode & 0x0F00) >> 8
-        self.st = self.v[x]
-
-    def _FX1E(self) -> None:
-        # Adds VX to I. VF is not affected.
-        x = (self.opcode & 0x0F00) >> 8
-        self.i += self.v[x]
-    
-    def _FX29(self) -> None:
-        # Sets I to the location of the sprite for the character in VX. Characters 0-F (in hexadecimal) are represented by a 4x5 font.
-        x = (self.opcode & 0x0F00) >> 8
-        self.i = 5 * self.v[x]
-
-    def _FX33(self) -> None:
-        # Stores the binary-coded decimal representation of VX, with the most significant of three digits at the address in I,
-        # the middle digit at I plus 1, and the least significant digit at I plus 2. (In other words, take the decimal representation of VX,
-        # place the hundreds digit in memory at location in I, the tens digit at location I+1, and the ones digit at location I+2.);
-        x = (self.opcode & 0x0F00) >> 8
-        bcd = f'{self.v[x]:03d}'
-        self.memory[self.i] = int(bcd[0])
-        self.memory[self.i + 1] = int(bcd[1])
-        self.memory[self.i + 2] = int(bcd[2])
-
-
-    def _FX55(self) -> None:
-        # Stores V0 to VX (including VX) in memory starting at address I. The offset from I is increased by 1 for each value written, but I itself is left unmodified.
-        x = (self.opcode & 0x0F00) >> 8
-        self.memory[self.i : self.i + x + 1] = bytes(self.v[:x+1])
-    
-    def _FX65(self) -> None:
-        # Fills V0 to VX (including VX) with values from memory starting at address I. The offset from I is increased by 1 for each value written, but I itself is left unmodified.
-        x = (self.opcode & 0x0F00) >> 8
-        self.v[:x+1] = self.memory[self.i : self.i + x + 1]
\ No newline at end of file
+from random import Random
+from .config import SCREEN_WIDTH, SCREEN_HEIGHT, MEM_SIZE, XO_MEM_SIZE, XO_PLANES, PROG_COUNTER, FONT, BIG_FONT, BIG_FONT_ADDRESS
+from .framebuffer import Chip8Framebuffer
+from .keypad import Chip8Keypad
+from .memory import Chip8Memory
+
+# Bits of the opcode that identify the operation, by its first nibble
+DECODE_MASKS = {
+    0x0: 0xFFFF,
+    0x5: 0xF00F,
+    0x8: 0xF00F,
+    0xE: 0xF0FF,
+    0xF: 0xF0FF,
+}
+
+# Pre-extracts the operands of each instruction format
+OPERAND_DECODERS = {
+    '': lambda opcode: (),
+    'n': lambda opcode: (opcode & 0x000F,),
+    'nnn': lambda opcode: (opcode & 0x0FFF,),
+    'x': lambda opcode: ((opcode & 0x0F00) >> 8,),
+    'xy': lambda opcode: ((opcode & 0x0F00) >> 8, (opcode & 0x00F0) >> 4),
+    'xnn': lambda opcode: ((opcode & 0x0F00) >> 8, opcode & 0x00FF),
+    'xyn': lambda opcode: ((opcode & 0x0F00) >> 8, (opcode & 0x00F0) >> 4, opcode & 0x000F),
+}
+
+# Instructions SUPER-CHIP adds: masked opcode -> (handler name, operand format)
+SCHIP_INSTRUCTIONS = {
+    **{0x00C0 | n: ('_00CN', 'n') for n in range(16)},
+    0x00FB: ('_00FB', ''),
+    0x00FC: ('_00FC', ''),
+    0x00FD: ('_00FD', ''),
+    0x00FE: ('_00FE', ''),
+    0x00FF: ('_00FF', ''),
+    0xD000: ('_DXYN_SCHIP', 'xyn'),
+    0xF030: ('_FX30', 'x'),
+    0xF075: ('_FX75', 'x'),
+    0xF085: ('_FX85', 'x'),
+}
+
+# Instructions XO-CHIP adds or changes on top of SUPER-CHIP. The skips step over the 4 byte F000 NNNN.
+XO_INSTRUCTIONS = {
+    **{0x00D0 | n: ('_00DN', 'n') for n in range(16)},
+    0x3000: ('_3XNN_XO', 'xnn'),
+    0x4000: ('_4XNN_XO', 'xnn'),
+    0x5000: ('_5XY0_XO', 'xy'),
+    0x5002: ('_5XY2', 'xy'),
+    0x5003: ('_5XY3', 'xy'),
+    0x9000: ('_9XY0_XO', 'xy'),
+    0xD000: ('_DXYN_XO', 'xyn'),
+    0xE09E: ('_EX9E_XO', 'x'),
+    0xE0A1: ('_EXA1_XO', 'x'),
+    0xF000: ('_F000', ''),
+    0xF001: ('_FN01', 'x'),
+}
+
+# Handlers each quirk profile binds in place of, or in addition to, the default ones:
+# masked opcode -> (handler name, operand format). The profile is chosen at reset, so no
+# handler tests quirk flags per instruction.
+#   modern   the default handlers: shifts ignore VY, FX55/FX65 leave I, BNNN adds V0,
+#            sprites clip at the edges and the logic ops leave VF
+#   vip      COSMAC VIP: logic ops reset VF, shifts read VY, FX55/FX65 advance I past VX
+#   chip48   CHIP-48: FX55/FX65 advance I by X, BXNN adds VX
+#   schip    SUPER-CHIP 1.1: BXNN adds VX, high resolution, scrolling and 16x16 sprites
+#   xochip   XO-CHIP: SUPER-CHIP instructions on 64K of memory and two bitplanes, shifts
+#            read VY, FX55/FX65 advance I past VX and sprites wrap around the edges
+QUIRK_PROFILES = {
+    'modern': {},
+    'vip': {
+        0x8001: ('_8XY1_VF', 'xy'),
+        0x8002: ('_8XY2_VF', 'xy'),
+        0x8003: ('_8XY3_VF', 'xy'),
+        0x8006: ('_8XY6_VY', 'xy'),
+        0x800E: ('_8XYE_VY', 'xy'),
+        0xF055: ('_FX55_I', 'x'),
+        0xF065: ('_FX65_I', 'x'),
+    },
+    'chip48': {
+        0xB000: ('_BXNN', 'nnn'),
+        0xF055: ('_FX55_IX', 'x'),
+        0xF065: ('_FX65_IX', 'x'),
+    },
+    'schip': {
+        0xB000: ('_BXNN', 'nnn'),
+        **SCHIP_INSTRUCTIONS,
+    },
+    'xochip': {
+        0x8006: ('_8XY6_VY', 'xy'),
+        0x800E: ('_8XYE_VY', 'xy'),
+        0xF055: ('_FX55_I', 'x'),
+        0xF065: ('_FX65_I', 'x'),
+        **SCHIP_INSTRUCTIONS,
+        **XO_INSTRUCTIONS,
+    },
+}
+
+# Memory size and framebuffer bitplanes of the machine, for the profiles that differ from CHIP-8
+PROFILE_MACHINES = {
+    'xochip': (XO_MEM_SIZE, XO_PLANES),
+}
+
+# Handlers that only read the registers, the timers, the keypad or the program and only set V, I and pc,
+# leaving out the arithmetic that cannot come back to the values it started with. Timers and keys only
+# change between frames, so a loop of them that leaves V and I as they were repeats exactly until the
+# next frame: an idle loop, jumping to itself or polling DT or a key.
+IDLE_LOOP_HANDLERS = {
+    '_NOP', '_1NNN', '_BNNN', '_BXNN', '_3XNN', '_4XNN', '_5XY0', '_9XY0', '_EX9E', '_EXA1', '_6XNN', '_8XY0',
+    '_8XY1', '_8XY2', '_8XY3', '_8XY1_VF', '_8XY2_VF', '_8XY3_VF', '_ANNN', '_FX07', '_FX29', '_FX30', '_00FD',
+    '_3XNN_XO', '_4XNN_XO', '_5XY0_XO', '_9XY0_XO', '_EX9E_XO', '_EXA1_XO',
+}
+# Idle loop handlers that read the delay timer, a loop with them can end at any timer tick while DT > 0
+TIMER_READERS = {'_FX07'}
+# Longest loop, in instructions, recognized as an idle loop
+IDLE_LOOP_LENGTH = 8
+# Most idle loop checks passed over after fruitless ones, the more in a row the more are passed over
+IDLE_BACKOFF_LIMIT = 64
+
+class Chip8Break(Exception):
+    # Raised by a debugger trap before its instruction runs, with pc back on the instruction.
+    # run() adds the number of instructions completed before it.
+    def __init__(self, address:int, reason:str) -> None:
+        super().__init__(f'{reason} at {address:03X}')
+        self.address = address
+        self.reason = reason
+        self.executed = None
+
+
+class Chip8CPU:
+    # Release variant by default: compact state and no debug bookkeeping in the handlers.
+    # set_debug() binds the debug handlers, which also record the registers they change.
+    __slots__ = (
+        'memory', 'v', 'i', 'sp', 'pc', 'st', 'dt', 'halted', 'key_register', 'awaited_key', 'seed', 'rng', 'rpl',
+        'decoded', 'idle_backoff', 'idle_countdown', 'idle_skipped', 'invalidate_listeners', 'update_indices', 'operation_lookup', 'bound_lookup', 'default_lookup', 'quirks', 'planes',
+        'debug', 'opcode', 'screen', 'keypad', 'buzzer',
+    )
+
+    def __init__(self, framebuffer:Chip8Framebuffer=None, keypad:Chip8Keypad=None, seed:int=None, quirks:str='modern') -> None:
+        # MEMORY, handlers write to it through memory.write() so observers see every write
+        self.memory = Chip8Memory(MEM_SIZE)
+        # REGISTERS
+        self.v = bytearray(16)
+        self.i = 0
+        self.sp = 0x52
+        self.pc = PROG_COUNTER
+        # TIMER
+        self.st = 0
+        self.dt = 0
+        # KEY WAIT (FX0A): halted until awaited_key is pressed and released, then stored in V[key_register]
+        self.halted = False
+        self.key_register = None
+        self.awaited_key = None
+        # RANDOM NUMBER GENERATOR (CXNN), private to the instance so runs can be reproduced
+        self.seed = seed
+        self.rng = Random(seed)
+        # SUPER-CHIP RPL user flags (FX75/FX85)
+        self.rpl = [0] * 16
+        # PREDECODED INSTRUCTIONS, keyed by address: (opcode, handler, operands)
+        self.decoded = [None] * MEM_SIZE
+        # Idle loop checks to pass over after the last failed one, and the number left
+        self.idle_backoff = 0
+        self.idle_countdown = 0
+        # Instructions of idle loops fast-forwarded instead of executed since the last reset
+        self.idle_skipped = 0
+        # Called with (start, end) whenever memory[start:end] may have changed
+        self.invalidate_listeners = []
+        self.memory.observers.append(self.invalidate)
+
+        # DEBUG VARIABLES, only filled while the debug handlers are bound
+        self.debug = False
+        self.update_indices = {
+            'registers': set([]),
+        }
+
+        # Masked opcode -> (handler, operand format)
+        self.operation_lookup = {
+            0x00E0: (self._00E0, ''),
+            0x00EE: (self._00EE, ''),
+            0x1000: (self._1NNN, 'nnn'),
+            0x2000: (self._2NNN, 'nnn'),
+            0x3000: (self._3XNN, 'xnn'),
+            0x4000: (self._4XNN, 'xnn'),
+            0x5000: (self._5XY0, 'xy'),
+            0x6000: (self._6XNN, 'xnn'),
+            0x7000: (self._7XNN, 'xnn'),
+            0x8000: (self._8XY0, 'xy'),
+            0x8001: (self._8XY1, 'xy'),
+            0x8002: (self._8XY2, 'xy'),
+            0x8003: (self._8XY3, 'xy'),
+            0x8004: (self._8XY4, 'xy'),
+            0x8005: (self._8XY5, 'xy'),
+            0x8006: (self._8XY6, 'xy'),
+            0x8007: (self._8XY7, 'xy'),
+            0x800E: (self._8XYE, 'xy'),
+            0x9000: (self._9XY0, 'xy'),
+            0xA000: (self._ANNN, 'nnn'),
+            0xB000: (self._BNNN, 'nnn'),
+            0xC000: (self._CXNN, 'xnn'),
+            0xD000: (self._DXYN, 'xyn'),
+            0xE09E: (self._EX9E, 'x'),
+            0xE0A1: (self._EXA1, 'x'),
+            0xF007: (self._FX07, 'x'),
+            0xF00A: (self._FX0A, 'x'),
+            0xF015: (self._FX15, 'x'),
+            0xF018: (self._FX18, 'x'),
+            0xF01E: (self._FX1E, 'x'),
+            0xF029: (self._FX29, 'x'),
+            0xF033: (self._FX33, 'x'),
+            0xF055: (self._FX55, 'x'),
+            0xF065: (self._FX65, 'x'),
+        }
+        self.opcode = None
+        self.screen = framebuffer if framebuffer is not None else Chip8Framebuffer()
+        self.keypad = keypad if keypad is not None else Chip8Keypad()
+        # Called with whether the sound timer is set once per timer tick, like Chip8Audio.frame
+        self.buzzer = None
+
+        # Dispatch table without quirk variants, operation_lookup is rebuilt from it by bind_quirks()
+        self.default_lookup = dict(self.operation_lookup)
+        self.quirks = quirks
+        self.bind_quirks()
+        self.load_fonts()
+
+
+    def __str__(self) -> str:
+        pass
+
+    def reset(self, quirks:str=None):
+        if quirks is not None and quirks != self.quirks:
+            self.quirks = quirks
+            self.bind_quirks()
+        # MEMORY
+        self.memory.write(0, bytes(len(self.memory)))
+        # REGISTERS
+        self.v = bytearray(16)
+        self.i = 0
+        self.sp = 0x52
+        self.pc = PROG_COUNTER
+        # RPL user flags of the previous ROM would leak into the next one and into recorded movies
+        self.rpl = [0] * 16
+        # TIMER
+        self.st = 0
+        self.dt = 0
+        self.halted = False
+        self.key_register = None
+        self.awaited_key = None
+        self.idle_skipped = 0
+        self.rng = Random(self.seed)
+        self.opcode = None
+        self.load_fonts()
+        self.screen.reset(self.planes)
+        # DEBUG VARIABLES, cleared in place since the debug handlers hold on to the set
+        self.update_indices['registers'].clear()
+
+
+
+    def load_into_memory(self, file: list|str, mem_origin: int = PROG_COUNTER) -> bool:
+        try:
+            if isinstance(file, str):
+                with open(file, 'rb') as rom:
+                    rom_content = rom.read()
+            elif isinstance(file, list):
+                rom_content = bytes(file)
+            self.memory.write(mem_origin, rom_content)
+            return True
+
+        except FileNotFoundError as error:
+            print(f'[Exception]: {error}')
+            return False
+
+    def load_fonts(self) -> None:
+        self.load_into_memory(FONT, 0)
+        # Only the profiles with FX30 have the big font
+        if 0xF030 in self.operation_lookup:
+            self.load_into_memory(BIG_FONT, BIG_FONT_ADDRESS)
+
+    def bind_quirks(self) -> None:
+        if self.quirks not in QUIRK_PROFILES:
+            raise ValueError(f'unknown quirk profile {self.quirks!r}, expected one of {", ".join(QUIRK_PROFILES)}')
+        memory_size, self.planes = PROFILE_MACHINES.get(self.quirks, (MEM_SIZE, 1))
+        if memory_size != len(self.memory):
+            self.decoded = [None] * memory_size
+            # Clears memory, which notifies the observers of the whole new address space
+            self.memory.resize(memory_size)
+        self.bind_handlers()
+        self.screen.reset(self.planes)
+
+    def bind_handlers(self) -> None:
+        lookup = dict(self.default_lookup)
+        for operation, (name, operand_format) in QUIRK_PROFILES[self.quirks].items():
+            lookup[operation] = (getattr(self, name), operand_format)
+        if self.debug:
+            lookup = {operation: (self.track_registers(handler), operand_format) for operation, (handler, operand_format) in lookup.items()}
+        self.operation_lookup = lookup
+        # The profiler and the debugger replace operation_lookup while attached, see skip_idle_loop()
+        self.bound_lookup = lookup
+        # Predecoded instructions still point at the previous handlers
+        self.invalidate(0, len(self.decoded))
+
+    def set_debug(self, enabled:bool) -> None:
+        # Swaps the release handlers for the debug ones or back, without resetting the machine.
+        if enabled != self.debug:
+            self.debug = enabled
+            self.bind_handlers()
+
+    def track_registers(self, handler):
+        # Debug variant of a handler, recording the registers it changed in update_indices.
+        written = self.update_indices['registers']
+
+        def tracked(*operands):
+            before = bytes(self.v)
+            handler(*operands)
+            if self.v != before:
+                written.update(reg for reg in range(16) if self.v[reg] != before[reg])
+
+        tracked.__name__ = handler.__name__
+        return tracked
+
+    def invalidate(self, start:int, end:int) -> None:
+        # Drops the predecoded instructions overlapping memory[start:end]. The instruction
+        # starting one byte before start reads memory[start] as its low byte.
+        start = max(start - 1, 0)
+        end = min(end, len(self.decoded))
+        if start < end:
+            self.decoded[start:end] = [None] * (end - start)
+            for listener in self.invalidate_listeners:
+                listener(start, end)
+
+    def decode(self, opcode:int) -> tuple:
+        # Returns the handler of the opcode along with its pre-extracted operands.
+        operation = opcode & DECODE_MASKS.get(opcode >> 12, 0xF000)
+        handler, operand_format = self.operation_lookup.get(operation, (self._NOP, ''))
+        return handler, OPERAND_DECODERS[operand_format](opcode)
+
+    def tick(self, opcode:int=None) -> int:
+        if opcode:
+            self.opcode = opcode
+            handler, operands = self.decode(opcode)
+        else:
+            pc = self.pc
+            instruction = self.decoded[pc]
+            if instruction is None:
+                fetched = self.memory[pc] << 8 | self.memory[pc + 1]
+                instruction = self.decoded[pc] = (fetched, *self.decode(fetched))
+            self.opcode, handler, operands = instruction
+            self.pc = pc + 2
+
+        handler(*operands)
+        return self.opcode
+
+    def fetch(self, address:int) -> tuple:
+        # Predecoded (opcode, handler, operands) of the instruction at address, decoded on first use.
+        instruction = self.decoded[address]
+        if instruction is None:
+            fetched = self.memory[address] << 8 | self.memory[address + 1]
+            instruction = self.decoded[address] = (fetched, *self.decode(fetched))
+        return instruction
+
+    def run(self, cycles:int, idle_cycles:int = 0) -> int:
+        # Executes up to the given number of instructions and stops early when halted in FX0A.
+        # An idle loop at pc is fast-forwarded first, up to idle_cycles when it does not wait for DT
+        # (see skip_idle_loop), so more instructions may be skipped. Returns the instructions executed or skipped.
+        if self.halted:
+            return 0
+        executed = 0
+        tick = self.tick
+        try:
+            executed = self.skip_idle_loop(cycles, max(cycles, idle_cycles))
+            for executed in range(executed + 1, cycles + 1):
+                tick()
+                if self.halted:
+                    break
+        except Chip8Break as hit:
+            if hit.executed is None:
+                hit.executed = executed - 1
+            raise
+        return executed
+
+    def skip_idle_loop(self, budget:int, idle_budget:int = 0) -> int:
+        # Executes the loop at pc as long as it is made of IDLE_LOOP_HANDLERS. Once an iteration
+        # comes back to pc with the same V and I, the loop does the same until the next timer tick
+        # or key event, and the iterations that fit before are skipped. budget must not reach past
+        # the next timer tick, idle_budget past the next key event: a loop that does not read DT,
+        # or reads it as 0, is skipped up to idle_budget. Returns the instructions executed or skipped.
+        # Nothing is skipped while the profiler or the debugger wrap the handlers: skipped
+        # iterations would not be counted, nor trap again after a break inside the loop.
+        if self.operation_lookup is not self.bound_lookup:
+            return 0
+        if self.idle_countdown:
+            self.idle_countdown -= 1
+            return 0
+        start = self.pc
+        name = self.fetch(start)[1].__name__
+        if name not in IDLE_LOOP_HANDLERS:
+            return 0
+        tick = self.tick
+        names = set()
+        v = bytes(self.v)
+        i = self.i
+        executed = iteration = 0
+        while executed < min(budget, 2 * IDLE_LOOP_LENGTH):
+            names.add(name)
+            try:
+                tick()
+            except Chip8Break as hit:
+                hit.executed = executed
+                raise
+            executed += 1
+            if self.pc == start:
+                if self.v == v and self.i == i:
+                    if not self.dt or TIMER_READERS.isdisjoint(names):
+                        budget = max(budget, idle_budget)
+                    length = executed - iteration
+                    skipped = (budget - executed) // length * length
+                    if skipped:
+                        self.idle_backoff = 0
+                        self.idle_skipped += skipped
+                        return executed + skipped
+                    break
+                # The first iteration may still see the values left by the code before the loop
+                v = bytes(self.v)
+                i = self.i
+                iteration = executed
+            name = self.fetch(self.pc)[1].__name__
+            if name not in IDLE_LOOP_HANDLERS:
+                break
+        # Nothing to skip, check less often for a while
+        self.idle_backoff = self.idle_countdown = min(self.idle_backoff * 2 + 1, IDLE_BACKOFF_LIMIT)
+        return executed
+
+    def process_key_events(self) -> None:
+        # Consumes the keypad events while halted in FX0A, waking up on the release of the awaited key.
+        events = self.keypad.events
+        while events and self.halted:
+            key, pressed = events.popleft()
+            if pressed and self.awaited_key is None:
+                self.awaited_key = key
+            elif not pressed and key == self.awaited_key:
+                self.v[self.key_register] = key
+                self.pc += 2
+                self.halted = False
+                self.key_register = None
+                self.awaited_key = None
+
+    def tick_timers(self) -> None:
+        if self.buzzer is not None:
+            # The frame that just ran sounds if ST was set during it
+            self.buzzer(self.st > 0)
+        if self.st > 0:
+            self.st -= 1
+        if self.dt > 0:
+            self.dt -= 1
+
+    def _NOP(self) -> None:
+        # Unknown instruction or 0NNN (calls machine code routine), ignored.
+        pass
+
+    def _00E0(self) -> None:
+        # Clear the screen.
+        self.screen.clear_screen()
+
+    def _00EE(self) -> None:
+        # Return from Subroutine
+        self.sp -= 1
+        self.pc = self.memory[self.sp] << 8
+        self.sp -= 1
+        self.pc += self.memory[self.sp]
+
+    def _1NNN(self, nnn) -> None:
+        # Jump to address NNN
+        self.pc = nnn
+
+    def _2NNN(self, nnn) -> None:
+        # Call subroutine at NNN
+        self.memory.write(self.sp, (self.pc & 0x00FF, (self.pc & 0xFF00) >> 8))
+        self.sp += 2
+        self.pc = nnn
+
+    def _3XNN(self, x, nn) -> None:
+        # Skips the next instruction if VX equals NN.
+        if self.v[x] == nn:
+            self.pc += 2
+
+    def _4XNN(self, x, nn) -> None:
+        # Skips the next instruction if VX does not equal NN.
+        if self.v[x] != nn:
+            self.pc += 2
+
+    def _5XY0(self, x, y) -> None:
+        # Skips the next instruction if VX equals VY.
+        if self.v[x] == self.v[y]:
+            self.pc += 2
+
+
+    def _6XNN(self, x, nn) -> None:
+        # Sets VX to NN
+        self.v[x] = nn
+
+
+    def _7XNN(self, x, nn) -> None:
+        # Adds NN to VX. (Carry flag is not changed)
+        self.v[x] = (self.v[x] + nn) & 0xFF
+
+    def _8XY0(self, x, y) -> None:
+        # Sets VX to the value of VY.
+        self.v[x] = self.v[y]
+
+
+    def _8XY1(self, x, y) -> None:
+        # Sets VX to VX or VY. (Bitwise OR operation);
+        self.v[x] |= self.v[y]
+
+
+    def _8XY2(self, x, y) -> None:
+        # Sets VX to VX and VY. (Bitwise AND operation);
+        self.v[x] &= self.v[y]
+
+
+    def _8XY3(self, x, y) -> None:
+        # Sets VX to VX xor VY.
+        self.v[x] ^= self.v[y]
+
+
+
+    def _8XY4(self, x, y) -> None:
+        # Adds VY to VX. VF is set to 1 when there's a carry, and to 0 when there is not.
+        result = self.v[x] + self.v[y]
+        carry = 0
+        if result > 0xFF:
+            result &= 0xFF
+            carry = 1
+        self.v[x] = result
+        self.v[0xF] = carry
+
+
+    def _8XY5(self, x, y) -> None:
+        # VY is subtracted from VX. VF is set to 0 when there's a borrow, and 1 when there is not.
+        result = self.v[x] - self.v[y]
+        borrow = 1
+        if self.v[x] < self.v[y]:
+            result &= 0xFF
+            borrow = 0
+        self.v[x] = result
+        self.v[0xF] = borrow
+
+
+
+    def _8XY6(self, x, y) -> None:
+        # Stores the least significant bit of VX in VF and then shifts VX to the right by 1.
+        dropped_bit = self.v[x] & 0x1
+        self.v[x] >>= 1
+        self.v[0xF] = dropped_bit
+
+
+    def _8XY7(self, x, y) -> None:
+        # Sets VX to VY minus VX. VF is set to 0 when there's a borrow, and 1 when there is not.
+        result = self.v[y] - self.v[x]
+        borrow = 1
+        if self.v[y] < self.v[x]:
+            result &= 0xFF
+            borrow = 0
+        self.v[x] = result
+        self.v[0xF] = borrow
+
+
+    def _8XYE(self, x, y) -> None:
+        # Stores the most significant bit of VX in VF and then shifts VX to the left by 1.
+        dropped_bit = (self.v[x] & 0x80) >> 7
+        self.v[x] = (self.v[x] << 1) & 0xFF
+        self.v[0xF] = dropped_bit
+
+
+    def _9XY0(self, x, y) -> None:
+        # Skips the next instruction if VX does not equal VY. (Usually the next instruction is a jump to skip a code block)
+        if self.v[x] != self.v[y]:
+            self.pc += 2
+
+    def _ANNN(self, nnn) -> None:
+        # Sets I to the address NNN.
+        self.i = nnn
+
+    def _BNNN(self, nnn) -> None:
+        # Jumps to the address NNN plus V0.
+        self.pc = self.v[0] + nnn
+
+    def _CXNN(self, x, nn) -> None:
+        # Sets VX to the result of a bitwise and operation on a random number (Typically: 0 to 255) and NN.
+        rnd = self.rng.randint(0, 0xFF)
+        self.v[x] = rnd & nn
+
+
+    def _DXYN(self, x, y, n) -> None:
+        # Draws a sprite at coordinate (VX, VY) that has a width of 8 pixels and a height of N pixels.
+        # Each row of 8 pixels is read as bit-coded starting from memory location I;
+        # I value does not change after the execution of this instruction. As described above,
+        # VF is set to 1 if any screen pixels are flipped from set to unset when the sprite is drawn, and to 0 if that does not happen
+        x_origin = self.v[x] % SCREEN_WIDTH
+        y_origin = self.v[y] % SCREEN_HEIGHT
+        self.v[0xF] = self.screen.draw_sprite(x_origin, y_origin, self.memory[self.i : self.i + n])
+
+    def _EX9E(self, x) -> None:
+        # Skips the next instruction if the key stored in VX is pressed. (Usually the next instruction is a jump to skip a code block);
+        if (self.keypad.state >> (self.v[x] & 0xF)) & 1:
+            self.pc += 2
+
+
+
+    def _EXA1(self, x) -> None:
+        # Skips the next instruction if the key stored in VX is not pressed. (Usually the next instruction is a jump to skip a code block)
+        if not (self.keypad.state >> (self.v[x] & 0xF)) & 1:
+            self.pc += 2
+
+    def _FX07(self, x) -> None:
+        # Sets VX to the value of the delay timer.
+        self.v[x] = self.dt
+
+
+    def _FX0A(self, x) -> None:
+        # A key press is awaited, and then stored in VX. (Blocking Operation. All instruction halted until next key event)
+        # The cpu halts with pc on this instruction. The scheduler stops ticking it and feeds it
+        # key events instead, and the release of the pressed key completes the instruction.
+        self.pc -= 2
+        if not self.halted:
+            self.halted = True
+            self.key_register = x
+            # A key already held down counts as pressed
+            self.awaited_key = self.keypad.get_key_down()
+            self.keypad.events.clear()
+        self.process_key_events()
+
+
+    def _FX15(self, x) -> None:
+        # Sets the delay timer to VX.
+        self.dt = self.v[x]
+
+    def _FX18(self, x) -> None:
+        # Sets the sound timer to VX.
+        self.st = self.v[x]
+
+    def _FX1E(self, x) -> None:
+        # Adds VX to I. VF is not affected.
+        self.i += self.v[x]
+
+    def _FX29(self, x) -> None:
+        # Sets I to the location of the sprite for the character in VX. Characters 0-F (in hexadecimal) are represented by a 4x5 font.
+        self.i = 5 * self.v[x]
+
+    def _FX33(self, x) -> None:
+        # Stores the binary-coded decimal representation of VX, with the most significant of three digits at the address in I,
+        # the middle digit at I plus 1, and the least significant digit at I plus 2. (In other words, take the decimal representation of VX,
+        # place the hundreds digit in memory at location in I, the tens digit at location I+1, and the ones digit at location I+2.);
+        vx = self.v[x]
+        self.memory.write(self.i, (vx // 100, vx // 10 % 10, vx % 10))
+
+
+    def _FX55(self, x) -> None:
+        # Stores V0 to VX (including VX) in memory starting at address I. The offset from I is increased by 1 for each value written, but I itself is left unmodified.
+        self.memory.write(self.i, self.v[:x+1])
+
+    def _FX65(self, x) -> None:
+        # Fills V0 to VX (including VX) with values from memory starting at address I. The offset from I is increased by 1 for each value written, but I itself is left unmodified.
+        self.v[:x+1] = self.memory[self.i : self.i + x + 1]
+
+    # QUIRK VARIANTS, bound by the quirk profiles in place of the handlers above
+
+    def _8XY1_VF(self, x, y) -> None:
+        # VX |= VY, then VF is reset.
+        self.v[x] |= self.v[y]
+        self.v[0xF] = 0
+
+    def _8XY2_VF(self, x, y) -> None:
+        # VX &= VY, then VF is reset.
+        self.v[x] &= self.v[y]
+        self.v[0xF] = 0
+
+    def _8XY3_VF(self, x, y) -> None:
+        # VX ^= VY, then VF is reset.
+        self.v[x] ^= self.v[y]
+        self.v[0xF] = 0
+
+    def _8XY6_VY(self, x, y) -> None:
+        # Stores VY shifted right by 1 in VX and the bit shifted out in VF.
+        dropped_bit = self.v[y] & 0x1
+        self.v[x] = self.v[y] >> 1
+        self.v[0xF] = dropped_bit
+
+    def _8XYE_VY(self, x, y) -> None:
+        # Stores VY shifted left by 1 in VX and the bit shifted out in VF.
+        dropped_bit = (self.v[y] & 0x80) >> 7
+        self.v[x] = (self.v[y] << 1) & 0xFF
+        self.v[0xF] = dropped_bit
+
+    def _BXNN(self, nnn) -> None:
+        # Jumps to the address XNN plus VX.
+        self.pc = self.v[nnn >> 8] + nnn
+
+    def _FX55_I(self, x) -> None:
+        # FX55, then I points past VX.
+        self.memory.write(self.i, self.v[:x+1])
+        self.i += x + 1
+
+    def _FX65_I(self, x) -> None:
+        # FX65, then I points past VX.
+        self.v[:x+1] = self.memory[self.i : self.i + x + 1]
+        self.i += x + 1
+
+    def _FX55_IX(self, x) -> None:
+        # FX55, then I is advanced by X.
+        self.memory.write(self.i, self.v[:x+1])
+        self.i += x
+
+    def _FX65_IX(self, x) -> None:
+        # FX65, then I is advanced by X.
+        self.v[:x+1] = self.memory[self.i : self.i + x + 1]
+        self.i += x
+
+    # SUPER-CHIP
+
+    def _00CN(self, n) -> None:
+        # Scrolls the display down by N lines.
+        self.screen.scroll_down(n)
+
+    def _00FB(self) -> None:
+        # Scrolls the display right by 4 pixels.
+        self.screen.scroll_right(4)
+
+    def _00FC(self) -> None:
+        # Scrolls the display left by 4 pixels.
+        self.screen.scroll_left(4)
+
+    def _00FD(self) -> None:
+        # Exits the interpreter, the machine stays on this instruction.
+        self.pc -= 2
+
+    def _00FE(self) -> None:
+        # Switches to low resolution (64x32) and clears the screen.
+        self.screen.set_resolution(False)
+
+    def _00FF(self) -> None:
+        # Switches to high resolution (128x64) and clears the screen.
+        self.screen.set_resolution(True)
+
+    def _DXYN_SCHIP(self, x, y, n) -> None:
+        # DXYN at the current resolution. DXY0 draws a 16x16 sprite, two bytes per row starting at I.
+        x_origin = self.v[x] % self.screen.width
+        y_origin = self.v[y] % self.screen.height
+        if n == 0:
+            data = self.memory[self.i : self.i + 32]
+            sprite = [data[row] << 8 | data[row + 1] for row in range(0, len(data) - 1, 2)]
+            self.v[0xF] = self.screen.draw_sprite(x_origin, y_origin, sprite, 16)
+        else:
+            self.v[0xF] = self.screen.draw_sprite(x_origin, y_origin, self.memory[self.i : self.i + n])
+
+    def _FX30(self, x) -> None:
+        # Sets I to the location of the 8x10 big font character for the digit in VX.
+        self.i = BIG_FONT_ADDRESS + 10 * (self.v[x] & 0xF)
+
+    def _FX75(self, x) -> None:
+        # Stores V0 to VX (including VX) in the RPL user flags.
+        self.rpl[:x+1] = self.v[:x+1]
+
+    def _FX85(self, x) -> None:
+        # Fills V0 to VX (including VX) from the RPL user flags.
+        self.v[:x+1] = self.rpl[:x+1]
+
+    # XO-CHIP
+
+    def skip_instruction(self) -> None:
+        # Skips the next instruction, which is 4 bytes long for F000 NNNN.
+        if self.memory[self.pc] == 0xF0 and self.memory[self.pc + 1] == 0x00:
+            self.pc += 4
+        else:
+            self.pc += 2
+
+    def _00DN(self, n) -> None:
+        # Scrolls the display up by N lines.
+        self.screen.scroll_up(n)
+
+    def _3XNN_XO(self, x, nn) -> None:
+        # Skips the next instruction if VX equals NN.
+        if self.v[x] == nn:
+            self.skip_instruction()
+
+    def _4XNN_XO(self, x, nn) -> None:
+        # Skips the next instruction if VX does not equal NN.
+        if self.v[x] != nn:
+            self.skip_instruction()
+
+    def _5XY0_XO(self, x, y) -> None:
+        # Skips the next instruction if VX equals VY.
+        if self.v[x] == self.v[y]:
+            self.skip_instruction()
+
+    def _5XY2(self, x, y) -> None:
+        # Stores VX to VY (in that order, either direction) in memory starting at address I. I is left unmodified.
+        step = 1 if x <= y else -1
+        self.memory.write(self.i, [self.v[reg] for reg in range(x, y + step, step)])
+
+    def _5XY3(self, x, y) -> None:
+        # Fills VX to VY (in that order, either direction) from memory starting at address I. I is left unmodified.
+        step = 1 if x <= y else -1
+        registers = range(x, y + step, step)
+        for reg, value in zip(registers, self.memory[self.i : self.i + len(registers)]):
+            self.v[reg] = value
+
+    def _9XY0_XO(self, x, y) -> None:
+        # Skips the next instruction if VX does not equal VY.
+        if self.v[x] != self.v[y]:
+            self.skip_instruction()
+
+    def _DXYN_XO(self, x, y, n) -> None:
+        # Draws on every selected plane, each taking the next N rows (32 bytes for DXY0) from I,
+        # wrapping around the edges of the screen.
+        screen = self.screen
+        x_origin = self.v[x] % screen.width
+        y_origin = self.v[y] % screen.height
+        planes = len(screen.selected_planes())
+        if n == 0:
+            data = self.memory[self.i : self.i + 32 * planes]
+            sprite = [data[row] << 8 | data[row + 1] for row in range(0, len(data) - 1, 2)]
+            self.v[0xF] = screen.draw_sprite_planes(x_origin, y_origin, sprite, 16)
+        else:
+            self.v[0xF] = screen.draw_sprite_planes(x_origin, y_origin, list(self.memory[self.i : self.i + n * planes]))
+
+    def _EX9E_XO(self, x) -> None:
+        # Skips the next instruction if the key stored in VX is pressed.
+        if (self.keypad.state >> (self.v[x] & 0xF)) & 1:
+            self.skip_instruction()
+
+    def _EXA1_XO(self, x) -> None:
+        # Skips the next instruction if the key stored in VX is not pressed.
+        if not (self.keypad.state >> (self.v[x] & 0xF)) & 1:
+            self.skip_instruction()
+
+    def _F000(self) -> None:
+        # Sets I to the 16 bit address NNNN held by the next two bytes.
+        self.i = self.memory[self.pc] << 8 | self.memory[self.pc + 1]
+        self.pc += 2
+
+    def _FN01(self, x) -> None:
+        # Selects the bitplanes drawing, clearing and scrolling apply to, as the bitmask N.
+        self.screen.selected = x
@@ -0,0 +1,209 @@
+import ast
+from .cpu import Chip8CPU, Chip8Break
+
+# Memory the instructions that access data read or write: handler name -> (access, function of the cpu
+# and the operands returning the [start, end) range). Fetching instructions is not a data access.
+MEMORY_ACCESSES = {
+    '_2NNN': ('w', lambda cpu, nnn: (cpu.sp, cpu.sp + 2)),
+    '_00EE': ('r', lambda cpu: (cpu.sp - 2, cpu.sp)),
+    '_FX33': ('w', lambda cpu, x: (cpu.i, cpu.i + 3)),
+    '_FX55': ('w', lambda cpu, x: (cpu.i, cpu.i + x + 1)),
+    '_FX55_I': ('w', lambda cpu, x: (cpu.i, cpu.i + x + 1)),
+    '_FX55_IX': ('w', lambda cpu, x: (cpu.i, cpu.i + x + 1)),
+    '_FX65': ('r', lambda cpu, x: (cpu.i, cpu.i + x + 1)),
+    '_FX65_I': ('r', lambda cpu, x: (cpu.i, cpu.i + x + 1)),
+    '_FX65_IX': ('r', lambda cpu, x: (cpu.i, cpu.i + x + 1)),
+    '_DXYN': ('r', lambda cpu, x, y, n: (cpu.i, cpu.i + n)),
+    '_DXYN_SCHIP': ('r', lambda cpu, x, y, n: (cpu.i, cpu.i + (n or 32))),
+    '_DXYN_XO': ('r', lambda cpu, x, y, n: (cpu.i, cpu.i + (n or 32) * len(cpu.screen.selected_planes()))),
+    '_5XY2': ('w', lambda cpu, x, y: (cpu.i, cpu.i + abs(x - y) + 1)),
+    '_5XY3': ('r', lambda cpu, x, y: (cpu.i, cpu.i + abs(x - y) + 1)),
+}
+# Watchpoint modes, by the accesses they break on
+WATCH_MODES = {'r': 'read', 'w': 'write', 'rw': 'access'}
+# Names a breakpoint condition can use
+CONDITION_NAMES = {f'v{reg:x}' for reg in range(16)} | {'i', 'pc', 'sp', 'dt', 'st'}
+# Syntax a breakpoint condition can use: names, numbers, comparisons, and/or/not and arithmetic
+CONDITION_NODES = (ast.Expression, ast.Name, ast.Load, ast.Constant, ast.Compare, ast.cmpop, ast.BoolOp, ast.boolop,
+                   ast.BinOp, ast.UnaryOp, ast.operator, ast.unaryop)
+
+
+def opcode_class(handler_name:str) -> str:
+    # '_DXYN_SCHIP' -> 'DXYN', quirk and extension variants belong to the class of the instruction
+    return handler_name[1:].split('_')[0]
+
+
+def compile_condition(condition:str):
+    # Compiles a breakpoint condition, a Python expression of CONDITION_NAMES like 'v3 == 5 and i > 0x300'.
+    try:
+        tree = ast.parse(condition.lower(), '<condition>', 'eval')
+    except SyntaxError as error:
+        raise ValueError(f'invalid condition {condition!r}: {error.msg}') from None
+    for node in ast.walk(tree):
+        if not isinstance(node, CONDITION_NODES) or isinstance(node, ast.Constant) and type(node.value) not in (int, bool):
+            raise ValueError(f'invalid condition {condition!r}: {type(node).__name__} is not allowed')
+        if isinstance(node, ast.Name) and node.id not in CONDITION_NAMES:
+            raise ValueError(f'invalid condition {condition!r}: unknown name {node.id}')
+    return compile(tree, '<condition>', 'eval')
+
+
+class Chip8Debugger:
+    # PC breakpoints (optionally conditional on the registers), opcode class breaks and memory
+    # watchpoints. Nothing is checked per instruction: a PC breakpoint replaces the predecoded
+    # instruction at its address with a trap, opcode breaks and watchpoints replace the handlers
+    # of the matching instructions in the dispatch table, so unwatched code runs at full speed.
+    # A trap that fires raises Chip8Break before its instruction runs. Like the profiler only the
+    # interpreter is trapped, and attach()/detach() swap the dispatch table.
+    def __init__(self, cpu:Chip8CPU) -> None:
+        self.cpu = cpu
+        self.attached = False
+        self.original_lookup = None
+        # Table bound by the cpu at attach(), a rebind since then makes original_lookup stale
+        self.bound_lookup = None
+        # Address -> (condition source, compiled condition), both None for an unconditional breakpoint
+        self.breakpoints = {}
+        # Opcode classes, like 'DXYN', that break whenever one of their instructions runs
+        self.opcode_breaks = set()
+        # Address -> watch mode, a key of WATCH_MODES
+        self.watchpoints = {}
+        # Instruction execution resumes from, its traps let it run once. Set by resume().
+        self.resume_address = None
+        # Instruction the last break stopped at, until the next resume()
+        self.break_address = None
+
+    def add_breakpoint(self, address:int, condition:str = None) -> None:
+        # Breaks at address, only when the condition holds if one is given (see compile_condition)
+        if not 0 <= address < len(self.cpu.memory) - 1:
+            raise ValueError(f'breakpoint address {address:03X} is outside memory')
+        code = compile_condition(condition) if condition else None
+        self.breakpoints[address] = (condition or None, code)
+
+    def add_opcode_break(self, opcode:str) -> None:
+        self.opcode_breaks.add(opcode.upper())
+
+    def add_watchpoint(self, address:int, mode:str = 'w') -> None:
+        if mode not in WATCH_MODES:
+            raise ValueError(f'unknown watch mode {mode!r}, expected one of {", ".join(WATCH_MODES)}')
+        if not 0 <= address < len(self.cpu.memory):
+            raise ValueError(f'watchpoint address {address:03X} is outside memory')
+        self.watchpoints[address] = mode
+
+    def remove_breakpoint(self, address:int) -> None:
+        self.breakpoints.pop(address, None)
+
+    def remove_opcode_break(self, opcode:str) -> None:
+        self.opcode_breaks.discard(opcode.upper())
+
+    def remove_watchpoint(self, address:int) -> None:
+        self.watchpoints.pop(address, None)
+
+    def resume(self) -> None:
+        # Call before running a paused machine again, so it does not break right away on the
+        # instruction it stopped at. Only a break leaves pc on a trap: resuming from anywhere
+        # else would leave an address that skips a breakpoint added there later.
+        pc = self.cpu.pc
+        self.resume_address = pc if pc == self.break_address else None
+        self.break_address = None
+
+    def clear(self) -> None:
+        self.breakpoints.clear()
+        self.opcode_breaks.clear()
+        self.watchpoints.clear()
+
+    def attach(self) -> None:
+        # Traps what is watched at the time of the call. Breaks changed while attached take
+        # effect after a detach() and attach().
+        if self.attached:
+            return
+        cpu = self.cpu
+        self.original_lookup = cpu.operation_lookup
+        self.bound_lookup = cpu.bound_lookup
+        self.attached = True
+        if not self.breakpoints and not self.opcode_breaks and not self.watchpoints:
+            return
+        trapped = {}
+        for operation, (handler, operand_format) in self.original_lookup.items():
+            name = handler.__name__
+            if opcode_class(name) in self.opcode_breaks:
+                handler = self.trap(handler, lambda *operands, name=name: f'{opcode_class(name)} executed')
+            if self.watchpoints and name in MEMORY_ACCESSES:
+                handler = self.trap(handler, self.watch_check(*MEMORY_ACCESSES[name]))
+            trapped[operation] = (handler, operand_format)
+        cpu.operation_lookup = trapped
+        # Breakpoints are patched in again whenever their instructions are decoded anew
+        cpu.invalidate_listeners.append(self.invalidate)
+        cpu.invalidate(0, len(cpu.memory))
+
+    def detach(self) -> None:
+        if not self.attached:
+            return
+        cpu = self.cpu
+        if self.invalidate in cpu.invalidate_listeners:
+            cpu.invalidate_listeners.remove(self.invalidate)
+        # set_debug() or a quirk profile rebound the handlers while attached: the wrapped table is gone
+        lookup = self.original_lookup if cpu.bound_lookup is self.bound_lookup else cpu.bound_lookup
+        if cpu.operation_lookup is not lookup:
+            cpu.operation_lookup = lookup
+            cpu.invalidate(0, len(cpu.memory))
+        self.original_lookup = self.bound_lookup = None
+        self.attached = False
+
+    def invalidate(self, start:int, end:int) -> None:
+        # Invalidation listener of the cpu: replaces the predecoded instructions at the breakpoints
+        # in memory[start:end] with traps.
+        cpu = self.cpu
+        for address, (_, code) in self.breakpoints.items():
+            if start <= address < end:
+                opcode, handler, operands = cpu.fetch(address)
+                check = (lambda *operands: 'breakpoint') if code is None else self.condition_check(code)
+                cpu.decoded[address] = (opcode, self.trap(handler, check), operands)
+
+    def trap(self, handler, check):
+        # Wraps a handler to raise Chip8Break before it runs when check(*operands) returns a reason.
+        cpu = self.cpu
+
+        def trapped(*operands):
+            # The cpu already moved pc past the instruction
+            address = cpu.pc - 2
+            if address == self.resume_address:
+                # Resuming from this instruction: it runs once, along with the traps it is wrapped in
+                handler(*operands)
+                self.resume_address = None
+                return
+            reason = check(*operands)
+            if reason:
+                cpu.pc = address
+                self.break_address = address
+                raise Chip8Break(address, reason)
+            handler(*operands)
+
+        trapped.__name__ = handler.__name__
+        return trapped
+
+    def condition_check(self, code):
+        cpu = self.cpu
+
+        def check(*operands):
+            names = {f'v{reg:x}': value for reg, value in enumerate(cpu.v)}
+            names.update(i=cpu.i, pc=cpu.pc - 2, sp=cpu.sp, dt=cpu.dt, st=cpu.st)
+            try:
+                return 'breakpoint' if eval(code, {'__builtins__': {}}, names) else None
+            except Exception as error:
+                # Like a division by zero, breaks rather than let the error stop the emulation
+                return f'breakpoint condition failed ({error})'
+
+        return check
+
+    def watch_check(self, access:str, accessed):
+        cpu = self.cpu
+        watchpoints = self.watchpoints
+
+        def check(*operands):
+            start, end = accessed(cpu, *operands)
+            for address in range(start, end):
+                mode = watchpoints.get(address)
+                if mode is not None and access in mode:
+                    return f'{"write" if access == "w" else "read"} of {address:03X}'
+            return None
+
+        return check
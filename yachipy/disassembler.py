@@ -0,0 +1,301 @@
+import os
+import json
+import hashlib
+from .config import PROG_COUNTER, CACHE_FOLDER
+from .cpu import Chip8CPU
+from .debugger import opcode_class
+from .intervals import IntervalSet
+
+# Bumped whenever the cached analysis changes meaning
+CACHE_VERSION = 1
+
+# Assembly of each opcode class, formatted with the fields of the opcode (and nnnn, the word after F000)
+MNEMONICS = {
+    '00E0': 'CLS',
+    '00EE': 'RET',
+    '1NNN': 'JP {nnn:03X}',
+    '2NNN': 'CALL {nnn:03X}',
+    '3XNN': 'SE V{x:X}, {nn:02X}',
+    '4XNN': 'SNE V{x:X}, {nn:02X}',
+    '5XY0': 'SE V{x:X}, V{y:X}',
+    '6XNN': 'LD V{x:X}, {nn:02X}',
+    '7XNN': 'ADD V{x:X}, {nn:02X}',
+    '8XY0': 'LD V{x:X}, V{y:X}',
+    '8XY1': 'OR V{x:X}, V{y:X}',
+    '8XY2': 'AND V{x:X}, V{y:X}',
+    '8XY3': 'XOR V{x:X}, V{y:X}',
+    '8XY4': 'ADD V{x:X}, V{y:X}',
+    '8XY5': 'SUB V{x:X}, V{y:X}',
+    '8XY6': 'SHR V{x:X}, V{y:X}',
+    '8XY7': 'SUBN V{x:X}, V{y:X}',
+    '8XYE': 'SHL V{x:X}, V{y:X}',
+    '9XY0': 'SNE V{x:X}, V{y:X}',
+    'ANNN': 'LD I, {nnn:03X}',
+    'BNNN': 'JP V0, {nnn:03X}',
+    'BXNN': 'JP V{x:X}, {nnn:03X}',
+    'CXNN': 'RND V{x:X}, {nn:02X}',
+    'DXYN': 'DRW V{x:X}, V{y:X}, {n:X}',
+    'EX9E': 'SKP V{x:X}',
+    'EXA1': 'SKNP V{x:X}',
+    'FX07': 'LD V{x:X}, DT',
+    'FX0A': 'LD V{x:X}, K',
+    'FX15': 'LD DT, V{x:X}',
+    'FX18': 'LD ST, V{x:X}',
+    'FX1E': 'ADD I, V{x:X}',
+    'FX29': 'LD F, V{x:X}',
+    'FX33': 'LD B, V{x:X}',
+    'FX55': 'LD [I], V{x:X}',
+    'FX65': 'LD V{x:X}, [I]',
+    # SUPER-CHIP
+    '00CN': 'SCD {n:X}',
+    '00FB': 'SCR',
+    '00FC': 'SCL',
+    '00FD': 'EXIT',
+    '00FE': 'LOW',
+    '00FF': 'HIGH',
+    'FX30': 'LD HF, V{x:X}',
+    'FX75': 'LD R, V{x:X}',
+    'FX85': 'LD V{x:X}, R',
+    # XO-CHIP
+    '00DN': 'SCU {n:X}',
+    '5XY2': 'SAVE V{x:X}-V{y:X}',
+    '5XY3': 'LOAD V{x:X}-V{y:X}',
+    'F000': 'LD I, {nnnn:04X}',
+    'FN01': 'PLANE {x:X}',
+}
+
+# Opcode classes by how they pass control on
+JUMPS = {'1NNN'}
+CALLS = {'2NNN'}
+SKIPS = {'3XNN', '4XNN', '5XY0', '9XY0', 'EX9E', 'EXA1'}
+# Return, exit or a jump to a computed address, no successor known statically
+ENDS = {'00EE', '00FD', 'BNNN', 'BXNN'}
+# Instructions that set I to an address the analysis cannot follow
+I_CHANGERS = {'FX1E', 'FX29', 'FX30', 'FX55', 'FX65'}
+
+
+def fields(opcode:int) -> dict:
+    return {
+        'x': (opcode >> 8) & 0xF,
+        'y': (opcode >> 4) & 0xF,
+        'n': opcode & 0xF,
+        'nn': opcode & 0xFF,
+        'nnn': opcode & 0xFFF,
+    }
+
+
+class Chip8Disassembler:
+    # Static analysis of the loaded ROM: walks the code from its entry point along the jumps,
+    # calls and skips, which separates the code from the data (the sprites ANNN points DXYN at),
+    # and builds the basic blocks of the control-flow graph and a symbol per branch target.
+    # The analysis is cached on disk by ROM hash and quirk profile, and feeds the predecoded
+    # instructions of the cpu and the JIT blocks with warm().
+    def __init__(self, cpu:Chip8CPU, cache_folder:str = CACHE_FOLDER) -> None:
+        self.cpu = cpu
+        # None to not cache analyses
+        self.cache_folder = cache_folder and os.path.expanduser(cache_folder)
+        # Address -> size in bytes of the instructions reached, 4 for F000 NNNN
+        self.code = {}
+        # Start address -> (end address, successor block starts) of the basic blocks
+        self.blocks = {}
+        # Address -> name: start, sub_XXX for calls, label_XXX for jumps and skips, sprite_XXX and data_XXX for I
+        self.symbols = {}
+        # Byte ranges drawn as sprites
+        self.data = IntervalSet()
+        # [start, end) of the ROM analyzed, its bytes that were not reached are shown as data
+        self.rom = (0, 0)
+
+    def load(self, rom:str|list, origin:int = PROG_COUNTER) -> None:
+        # Call once the ROM is in memory at origin. Reads the cached analysis, or analyzes and caches it.
+        if isinstance(rom, str):
+            try:
+                with open(rom, 'rb') as file:
+                    rom = file.read()
+            except FileNotFoundError:
+                return
+        rom = bytes(rom)
+        key = hashlib.sha1(rom).hexdigest()
+        path = self.cache_folder and os.path.join(self.cache_folder, f'{key}-{self.cpu.quirks}-{origin:03X}.json')
+        if path and os.path.exists(path):
+            try:
+                with open(path) as file:
+                    self.from_dict(json.load(file))
+                return
+            except (OSError, ValueError, KeyError):
+                # Unreadable or from another version, analyzed again and replaced
+                pass
+        self.analyze(origin, origin + len(rom))
+        if path:
+            self.save(path)
+
+    def save(self, path:str) -> None:
+        # Written to a temporary file first, so parallel runs never read half a file
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f'{path}.{os.getpid()}', 'w') as output:
+                json.dump(self.to_dict(), output)
+            os.replace(f'{path}.{os.getpid()}', path)
+        except OSError as error:
+            print(f'[Exception]: {error}')
+
+    def to_dict(self) -> dict:
+        return {
+            'version': CACHE_VERSION,
+            'code': [[address, size] for address, size in sorted(self.code.items())],
+            'blocks': [[start, end, successors] for start, (end, successors) in sorted(self.blocks.items())],
+            # Addresses as hex strings, like the profiler heat map
+            'symbols': {f'{address:03X}': name for address, name in sorted(self.symbols.items())},
+            'data': self.data.ranges(),
+            'rom': list(self.rom),
+        }
+
+    def from_dict(self, analysis:dict) -> None:
+        if analysis['version'] != CACHE_VERSION:
+            raise ValueError('disassembly cached by an incompatible version')
+        # Each attribute is replaced whole, the GUI reads them from its own thread
+        self.code = {address: size for address, size in analysis['code']}
+        self.blocks = {start: (end, successors) for start, end, successors in analysis['blocks']}
+        self.symbols = {int(address, 16): name for address, name in analysis['symbols'].items()}
+        self.data = IntervalSet(analysis['data'])
+        self.rom = tuple(analysis['rom'])
+
+    def analyze(self, start:int, end:int) -> None:
+        # Recursive descent over memory[start:end]. Targets outside of it get a symbol but are not followed.
+        cpu = self.cpu
+        memory = cpu.memory
+        code = {}
+        # Address -> addresses control may pass to after the instruction
+        successors = {}
+        symbols = {start: 'start'}
+        sprites = IntervalSet()
+        pending = [start]
+        while pending:
+            address = pending.pop()
+            # Address I was last set to by ANNN or F000 NNNN on this path, None once unknown
+            i_value = None
+            while start <= address < end - 1 and address not in code:
+                # F000 NNNN at the very end of memory has no room for NNNN
+                if address + 3 >= len(memory) and memory[address] == 0xF0 and memory[address + 1] == 0x00:
+                    break
+                opcode = memory[address] << 8 | memory[address + 1]
+                handler, _ = cpu.decode(opcode)
+                operation = opcode_class(handler.__name__)
+                size = 4 if operation == 'F000' else 2
+                code[address] = size
+                following = address + size
+                nnn = opcode & 0xFFF
+                if operation in JUMPS:
+                    symbols.setdefault(nnn, f'label_{nnn:03X}')
+                    successors[address] = [nnn]
+                    pending.append(nnn)
+                    break
+                if operation in ENDS:
+                    successors[address] = []
+                    break
+                if operation in CALLS:
+                    symbols[nnn] = f'sub_{nnn:03X}'
+                    successors[address] = [nnn, following]
+                    pending.append(nnn)
+                elif operation in SKIPS:
+                    # The skipped instruction is 4 bytes long for F000 NNNN on XO-CHIP
+                    skipped = following + 2
+                    if handler.__name__.endswith('_XO') and following < end - 1 and memory[following] == 0xF0 and memory[following + 1] == 0x00:
+                        skipped += 2
+                    symbols.setdefault(skipped, f'label_{skipped:03X}')
+                    successors[address] = [following, skipped]
+                    pending.append(skipped)
+                elif operation == 'ANNN' or operation == 'F000':
+                    i_value = nnn if operation == 'ANNN' else memory[address + 2] << 8 | memory[address + 3]
+                    symbols.setdefault(i_value, f'data_{i_value:03X}')
+                elif operation == 'DXYN' and i_value is not None:
+                    rows = opcode & 0xF
+                    sprites.add(i_value, i_value + (rows or (32 if cpu.quirks in ('schip', 'xochip') else 0)))
+                    if symbols[i_value].startswith('data_'):
+                        symbols[i_value] = f'sprite_{i_value:03X}'
+                elif operation in I_CHANGERS:
+                    i_value = None
+                address = following
+
+        # Code wins over data, a sprite may be read from the bytes of an instruction
+        self.data = IntervalSet()
+        for low, high in sprites.ranges():
+            for address in range(low, high):
+                if address not in code and address - 1 not in code:
+                    self.data.add(address, address + 1)
+        for address, name in list(symbols.items()):
+            if name.startswith('data_') and address in code:
+                # Self-modifying code or a table read with FX65 from the program
+                symbols[address] = f'label_{address:03X}'
+
+        # A block starts at the entry, at every branch target and after every branch
+        leaders = {start}
+        for address, targets in successors.items():
+            leaders.update(targets)
+            leaders.add(address + code[address])
+        blocks = {}
+        for leader in sorted(leaders):
+            if leader not in code:
+                continue
+            address = leader
+            while address not in successors:
+                following = address + code[address]
+                if following not in code or following in leaders:
+                    break
+                address = following
+            following = address + code[address]
+            blocks[leader] = (following, successors.get(address, [following] if following in code else []))
+
+        self.code = code
+        self.blocks = blocks
+        self.symbols = symbols
+        self.rom = (start, end)
+
+    def warm(self, jit=None) -> None:
+        # Predecodes every instruction reached by the analysis, and compiles the blocks the JIT
+        # would start at if one is given, so the first frames do not pay for it.
+        fetch = self.cpu.fetch
+        for address in self.code:
+            fetch(address)
+        if jit is None:
+            return
+        # JIT blocks also end at draws and memory writes, the code after them starts a block too
+        pending = sorted(self.blocks, reverse=True)
+        while pending:
+            start = pending.pop()
+            if start in jit.blocks:
+                continue
+            jit.compile_block(start)
+            end = jit.block_ends[start]
+            if end in self.code and end not in jit.blocks:
+                pending.append(end)
+
+    def instruction(self, memory, address:int, decode:bool = False) -> tuple:
+        # Disassembles the instruction at address of memory, a bytes like copy or the live memory.
+        # Returns (opcode, size, text). Sprites and the bytes of the ROM the analysis did not reach
+        # are shown as data, unless decode is set.
+        opcode = memory[address] << 8 | memory[address + 1]
+        if not decode and address not in self.code and (self.rom[0] <= address < self.rom[1] or self.data.overlapping(address, address + 1)):
+            return opcode, 2, f'DB {opcode >> 8:02X} {opcode & 0xFF:02X}'
+        handler, _ = self.cpu.decode(opcode)
+        operation = opcode_class(handler.__name__)
+        if operation == 'NOP':
+            # 0NNN (machine code routine) or an opcode the quirk profile does not have
+            return opcode, 2, f'SYS {opcode & 0xFFF:03X}' if opcode >> 12 == 0 else f'DW {opcode:04X}'
+        if operation == 'F000':
+            nnnn = memory[address + 2] << 8 | memory[address + 3] if address + 3 < len(memory) else 0
+            return opcode, 4, MNEMONICS[operation].format(nnnn=nnnn)
+        return opcode, 2, MNEMONICS[operation].format(**fields(opcode))
+
+    def listing(self, memory, center:int, lines:int) -> list:
+        # Lines of disassembly around center (pc), as (address, label or None, opcode, text).
+        # Instructions before center are assumed 2 bytes apart, the analysis cannot tell otherwise.
+        address = max(0, center - 2 * (lines // 2))
+        if center - address & 1:
+            address += 1
+        listing = []
+        while len(listing) < lines and address < len(memory) - 1:
+            # Whatever pc is at runs, reached by the analysis or not (a computed jump)
+            opcode, size, text = self.instruction(memory, address, address == center)
+            listing.append((address, self.symbols.get(address), opcode, text))
+            address += size
+        return listing
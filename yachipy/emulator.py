@@ -1,273 +1,745 @@
-import dearpygui.dearpygui as dpg
-from .cpu import Chip8CPU
-from .screen import Chip8Screen
-from.config import MEM_SIZE, ROM_FOLDER, SCALE, KEY_MAP_R, ACCENT_COLOR, NEUTRAL_COLOR, DULL_COLOR
-import time
-
-class Chip8:
-    def __init__(self) -> None:
-        self._paused= True
-        self.cpu_clockspeed = 500
-        self.current_time, self.accumulator = 0, 0
-        self.rom_selected = False
-
-        dpg.create_context()
-        dpg.setup_dearpygui()
-        with dpg.handler_registry():
-            dpg.add_key_down_handler(callback=self.key_down_handler)
-            dpg.add_key_release_handler(callback=self.key_release_handler)
-        with dpg.window(label='emulator') as emulator:
-            self.screen = Chip8Screen()
-            self.cpu = Chip8CPU(screen=self.screen)
-            
-            self.emulator_display = self.screen.show_emulator_display()
-            self.show_general_settings()
-            self.show_register_display()
-            self.show_memory_display()
-            self.show_keypad_display()
-            self.show_info_display()
-            dpg.set_primary_window(emulator, True)
-
-        dpg.create_viewport(title='YaChiPy')
-
-
-    def key_down_handler(self, sender, data):
-        if data[0] in KEY_MAP_R.keys():
-            btn_tag = str(KEY_MAP_R[data[0]])
-            with dpg.theme() as highlight:
-                with dpg.theme_component(dpg.mvAll):
-                    dpg.add_theme_color(dpg.mvThemeCol_Button, ACCENT_COLOR)
-            dpg.bind_item_theme(btn_tag, highlight)
-    
-    def key_release_handler(self, sender, data):
-        if data in KEY_MAP_R.keys():
-            btn_tag = str(KEY_MAP_R[data])
-            with dpg.theme() as dehighlight:
-                with dpg.theme_component(dpg.mvAll):
-                    dpg.add_theme_color(dpg.mvThemeCol_Button, NEUTRAL_COLOR)
-            dpg.bind_item_theme(btn_tag, dehighlight)
-
-    
-    def load_rom(self, sender, data):
-        self.cpu.reset()
-        rom_info = list(data['selections'].items())[0]
-        self.cpu.load_into_memory(rom_info[1])
-        dpg.configure_item('rom_selector', label=rom_info[0])
-        dpg.configure_item('pause_button', label='Start')
-        self.screen.clear_screen()
-        if not self.rom_selected:
-            self.rom_selected = True
-
-    def open_file_dialog(self, sender, data):
-        if not self._paused:
-            self.toggle_pause() 
-        dpg.show_item("file_dialog")
-
-    def toggle_pause(self) -> None:
-        if not self.rom_selected:
-            with dpg.window(label='Alert', width=500, height=100, popup=True):
-                dpg.add_text(default_value='Please select a rom first.')
-            return
-        self._paused = not self._paused
-        if self._paused:
-            dpg.configure_item('pause_button', label='Resume')
-            dpg.configure_item('tick_button', enabled=True)
-        else:
-            dpg.configure_item('pause_button', label='Pause')
-            dpg.configure_item('tick_button', enabled=False)
-            self.current_time = time.perf_counter()
-    
-    def set_clockspeed(self, sender, data):
-        self.cpu_clockspeed = data
-
-    def set_pixel_off_color(self, sender, data):
-        color = [int(i*255) for i in data]
-        self.screen.set_pixel_off_color(color)
-        
-    def set_pixel_on_color(self, sender, data):
-        color = [int(i*255) for i in data]
-        self.screen.set_pixel_on_color(color)
-    
-    def render_chip8_display(self) -> None:
-        if self._paused:
-            return
-        new_time = time.perf_counter()
-        frame_time = new_time - self.current_time
-        self.current_time = new_time
-        self.accumulator += frame_time
-        cpu_delta_time = 1/self.cpu_clockspeed
-        while self.accumulator >= cpu_delta_time:
-            self.cpu.tick()
-            self.accumulator -= cpu_delta_time
-
-    def show_general_settings(self):
-        with dpg.child_window(tag='utility_window', width=200, height=32*SCALE, pos=[0,0]):
-            dpg.add_text(default_value='GENERAL SETTINGS')
-
-            with dpg.file_dialog(tag='file_dialog', default_path=ROM_FOLDER, callback=self.load_rom, width=700, height=400, modal=True, show=False):
-                dpg.add_file_extension('.*')
-
-            with dpg.child_window():
-                dpg.add_button(label='Select Rom', tag='rom_selector', callback=self.open_file_dialog , width=-1)
-                dpg.add_spacer()
-
-
-                with dpg.group(horizontal=True):
-                    dpg.add_button(label= 'Start', tag='pause_button', width=80, callback=self.toggle_pause)
-                    dpg.add_button(label= 'Tick', tag='tick_button', width=80, callback=lambda: self.cpu.tick(), enabled=False)
-                dpg.add_spacer()
-                
-                dpg.add_separator()
-                dpg.add_text(default_value='CPU Clockspeed (Hz)')
-                dpg.add_slider_int(tag='cpu_clockspeed', width=-1, min_value=10, default_value=500, max_value=1000, callback=self.set_clockspeed)
-                dpg.add_spacer()
-                
-                dpg.add_separator()
-                dpg.add_text(default_value='Pixel Colors')
-                with dpg.group(horizontal=True):
-                    dpg.add_color_edit(default_value=self.screen.color_pixel_off, callback=self.set_pixel_off_color)
-                    dpg.add_text(default_value='OFF', color=ACCENT_COLOR)
-                with dpg.group(horizontal=True):
-                    dpg.add_color_edit(default_value=self.screen.color_pixel_on, callback=self.set_pixel_on_color)
-                    dpg.add_text(default_value='ON', color=ACCENT_COLOR)
-
-    
-    def show_register_display(self):
-        self.v =[None]*len(self.cpu.v)
-        with dpg.child_window(tag='register_window', width=200, height=32*SCALE, pos=[64*SCALE+200, 0]):
-            dpg.add_text(default_value='REGISTERS')
-            with dpg.child_window():
-                for i in range(8):
-                    with dpg.group(horizontal=True):
-                        dpg.add_text(default_value='V'+hex(i).upper()[-1]+':', color=ACCENT_COLOR)
-                        self.v[i] = dpg.add_text(default_value=hex(self.cpu.v[i])[2:].zfill(2).upper())
-                        dpg.add_spacer()
-                        dpg.add_text(default_value='V'+hex(i+8).upper()[-1]+':', color=ACCENT_COLOR)
-                        self.v[i+8] = dpg.add_text(default_value=hex(self.cpu.v[i+8])[2:].zfill(2).upper())
-
-                dpg.add_separator()
-
-                with dpg.group(horizontal=True):
-                    dpg.add_text(default_value='PC:', color=ACCENT_COLOR)
-                    self.pc = dpg.add_text(default_value=hex(self.cpu.pc)[2:].zfill(3).upper())
-
-                with dpg.group(horizontal=True):
-                    dpg.add_text(default_value='SP:', color=ACCENT_COLOR)
-                    self.sp = dpg.add_text(default_value=hex(self.cpu.sp)[2:].zfill(3).upper())
-
-                with dpg.group(horizontal=True):
-                    dpg.add_text(default_value='I :', color=ACCENT_COLOR)
-                    self.i = dpg.add_text(default_value=hex(self.cpu.i)[2:].zfill(3).upper())
-                
-                with dpg.group(horizontal=True):
-                    dpg.add_text(default_value='ST:', color=ACCENT_COLOR)
-                    self.st = dpg.add_text(default_value=hex(self.cpu.st)[2:].zfill(3).upper())
-                
-                with dpg.group(horizontal=True):
-                    dpg.add_text(default_value='DT:', color=ACCENT_COLOR)
-                    self.dt = dpg.add_text(default_value=hex(self.cpu.dt)[2:].zfill(3).upper())
-
-                
-    def show_memory_display(self):
-        self.memory = [None] * MEM_SIZE
-        with dpg.child_window(tag='memory_display', width=64*SCALE, height=-1, pos=[0,32*SCALE]):
-            dpg.add_text(default_value='MEMORY')
-            with dpg.child_window():
-                for i in range(0, MEM_SIZE, 16):
-                    with dpg.group(horizontal=True):
-                        dpg.add_text(default_value=hex(i)[2:-1].zfill(2).upper()+'X:', color=ACCENT_COLOR)
-                        dpg.add_spacer()
-                        for j in range(16):
-                            if j == 8:
-                                dpg.add_spacer()
-                            
-                            color = None
-                            byte = self.cpu.memory[i+j]
-                            if byte == 00:
-                                color = [150,150,150]
-                                color = DULL_COLOR
-                            self.memory[i+j] = dpg.add_text(default_value=hex(self.cpu.memory[i+j])[2:].zfill(2).upper(), color=color)
-    
-    def show_keypad_display(self):
-        with dpg.child_window(tag='keypad_display', width=400, height=-1, pos=[64*SCALE, 32*SCALE]):
-            dpg.add_text(default_value='KEYPAD')
-            # dpg.add_separator()
-            with dpg.child_window(tag='keypad'):
-                with dpg.group(horizontal=True):
-                    dpg.add_button(width=86, height=100, label='1', tag='1')
-                    dpg.add_button(width=86, height=100, label='2', tag='2')
-                    dpg.add_button(width=86, height=100, label='3', tag='3')
-                    dpg.add_button(width=86, height=100, label='C', tag='12')
-            
-                with dpg.group(horizontal=True):
-                    dpg.add_button(width=86, height=100, label='4', tag='4')
-                    dpg.add_button(width=86, height=100, label='5', tag='5')
-                    dpg.add_button(width=86, height=100, label='6', tag='6')
-                    dpg.add_button(width=86, height=100, label='D', tag='13')
-
-
-                with dpg.group(horizontal=True):
-                    dpg.add_button(width=86, height=100, label='7', tag='7')
-                    dpg.add_button(width=86, height=100, label='8', tag='8')
-                    dpg.add_button(width=86, height=100, label='9', tag='9')
-                    dpg.add_button(width=86, height=100, label='E', tag='14')
-
-                with dpg.group(horizontal=True):
-                    dpg.add_button(width=86, height=100, label='A', tag='10')
-                    dpg.add_button(width=86, height=100, label='0', tag='0')
-                    dpg.add_button(width=86, height=100, label='B', tag='11')
-                    dpg.add_button(width=86, height=100, label='F', tag='15')
-        
-        with dpg.theme() as keypad_themes:
-            with dpg.theme_component(dpg.mvAll):
-                dpg.add_theme_style(dpg.mvStyleVar_ItemSpacing, x=8, y=8)
-        dpg.bind_item_theme('keypad', keypad_themes)
-
-    def show_info_display(self):
-        with dpg.child_window(width=-1, height=-1, pos=[64*SCALE+400,0]):
-            dpg.add_text(default_value='INFORMATION')
-            with dpg.child_window() as info_window:
-                with open('yachipy/app_info.txt', 'r') as file:
-                    dpg.add_text(default_value=file.read(), wrap=dpg.get_item_height(info_window))
-
-
-
-
-    def update_register_display(self):
-        for i in self.cpu.update_indices['registers']:
-            dpg.set_value(self.v[i], hex(self.cpu.v[i])[2:].zfill(2).upper())
-        self.cpu.update_indices['registers']=set([])
-        
-        dpg.set_value(self.pc, hex(self.cpu.pc)[2:].zfill(3).upper())
-        dpg.set_value(self.sp, hex(self.cpu.sp)[2:].zfill(3).upper())
-        dpg.set_value(self.i, hex(self.cpu.i)[2:].zfill(3).upper())
-        dpg.set_value(self.st, hex(self.cpu.st)[2:].zfill(3).upper())
-        dpg.set_value(self.dt, hex(self.cpu.dt)[2:].zfill(3).upper())
-    
-    def update_memory_display(self):
-        for i in self.cpu.update_indices['memory']:
-            color = None
-            if self.cpu.memory[i] == 0:
-                color = DULL_COLOR
-            dpg.configure_item(self.memory[i], default_value=hex(self.cpu.memory[i])[2:].zfill(2).upper(), color=color)
-        self.cpu.update_indices['memory']=set([])
-
-
-    def run(self) -> None:
-        # Do bunch of other setups if required
-        dpg.show_viewport()
-        # dpg.show_metrics()
-        # dpg.show_style_editor()
-        dpg.maximize_viewport()
-        dpg.set_viewport_vsync(False)
-
-        self.current_time = time.perf_counter()
-        while dpg.is_dearpygui_running():
-            self.render_chip8_display()
-            self.cpu.tick_timers()
-            self.update_register_display()
-            self.update_memory_display()
-            dpg.render_dearpygui_frame()
-
-        dpg.destroy_context()
+import os
+import math
+import random
+import dearpygui.dearpygui as dpg
+from .cpu import Chip8CPU, QUIRK_PROFILES
+from .screen import Chip8Screen
+from .framebuffer import Chip8Framebuffer
+from .keypad import Chip8Keypad
+from .scheduler import Chip8Scheduler
+from .rewind import Chip8Rewind
+from .worker import Chip8Worker
+from .intervals import IntervalSet
+from .savestate import save_state, load_state
+from .movie import Chip8Movie, rom_hash, state_hash, screen_hash
+from .profiler import Chip8Profiler
+from .debugger import Chip8Debugger, WATCH_MODES, opcode_class, compile_condition
+from .disassembler import Chip8Disassembler
+from .audio import Chip8Audio, Chip8DeviceSink, Chip8NullSink
+from .config import MEM_SIZE, ROM_FOLDER, SCALE, ACCENT_COLOR, NEUTRAL_COLOR, DULL_COLOR
+from .keymap import KEY_MAP_R
+
+# Rows of 16 bytes the memory viewer has widgets for. Scrolling rebinds them to other addresses.
+MEMORY_VIEW_ROWS = 16
+# Rows scrolled per mouse wheel notch
+MEMORY_WHEEL_ROWS = 2
+# Rendered frames between two refreshes of the profiler panel
+PROFILER_REFRESH_FRAMES = 30
+# Handlers listed by the profiler panel, the slowest in total first
+PROFILER_TOP_HANDLERS = 8
+# Instructions the disassembly pane shows around pc
+DISASSEMBLY_LINES = 24
+
+class Chip8:
+    def __init__(self) -> None:
+        self._paused= True
+        self.cpu_clockspeed = 500
+        # Quirk profile bound at the next reset
+        self.quirks = 'modern'
+        self.rom_selected = False
+        # Quick save slot, written and read on the worker thread
+        self.saved_state = None
+        self.rom_path = None
+        # Movie being recorded and the frame it started at, owned by the worker thread
+        self.movie = None
+        self.movie_start = 0
+        self.movie_path = None
+
+        dpg.create_context()
+        dpg.setup_dearpygui()
+        with dpg.handler_registry():
+            dpg.add_key_down_handler(callback=self.key_down_handler)
+            dpg.add_key_release_handler(callback=self.key_release_handler)
+            dpg.add_mouse_wheel_handler(callback=self.memory_wheel_handler)
+        with dpg.window(label='emulator') as emulator:
+            self.framebuffer = Chip8Framebuffer()
+            self.keypad = Chip8Keypad()
+            self.screen = Chip8Screen(self.framebuffer)
+            self.cpu = Chip8CPU(framebuffer=self.framebuffer, keypad=self.keypad)
+            self.scheduler = Chip8Scheduler(self.cpu, self.cpu_clockspeed)
+            # Lets a paused machine step back by instruction or frame
+            self.rewind = Chip8Rewind(self.cpu)
+            self.scheduler.rewind = self.rewind
+            # Attached from the profiler panel, detached it costs nothing
+            self.profiler = Chip8Profiler(self.cpu)
+            # Always attached, with no breaks set it traps nothing
+            self.debugger = Chip8Debugger(self.cpu)
+            self.debugger.attach()
+            # Analysis of the loaded ROM for the disassembly pane, also predecodes it
+            self.disassembler = Chip8Disassembler(self.cpu)
+            self.rendered_frames = 0
+            # Planes and width of the last snapshot shown, redrawn when the palette changes while paused
+            self.shown_planes = None
+            self.shown_width = None
+            # Buzzer of the sound timer, silent without an audio device
+            try:
+                sink = Chip8DeviceSink()
+            except (ImportError, OSError) as error:
+                print(f'[Audio]: no sound ({error})')
+                sink = Chip8NullSink()
+            self.audio = Chip8Audio(sink)
+            self.sound_available = isinstance(sink, Chip8DeviceSink)
+            self.cpu.buzzer = self.audio.frame if self.sound_available else None
+            # Owns the cpu from here on, everything touching the machine goes through worker.submit.
+            # Key events are the exception, they go through the keypad input queue.
+            self.worker = Chip8Worker(self.scheduler)
+            
+            self.emulator_display = self.screen.show_emulator_display()
+            self.show_general_settings()
+            self.show_register_display()
+            self.show_profiler_display()
+            self.show_memory_display()
+            self.show_keypad_display()
+            self.show_debugger_display()
+            self.show_info_display()
+            dpg.set_primary_window(emulator, True)
+
+        dpg.create_viewport(title='YaChiPy')
+
+
+    def key_down_handler(self, sender, data):
+        if data[0] in KEY_MAP_R.keys():
+            key = KEY_MAP_R[data[0]]
+            # The handler repeats while the key is held, only the first call is an event
+            if self.keys_down & (1 << key):
+                return
+            self.keys_down |= 1 << key
+            self.keypad.push_event(key, True)
+            dpg.bind_item_theme(str(key), self.key_highlight_theme)
+    
+    def key_release_handler(self, sender, data):
+        if data in KEY_MAP_R.keys():
+            key = KEY_MAP_R[data]
+            self.keys_down &= ~(1 << key)
+            self.keypad.push_event(key, False)
+            dpg.bind_item_theme(str(key), self.key_default_theme)
+
+    
+    def load_rom(self, sender, data):
+        rom_info = list(data['selections'].items())[0]
+        if dpg.get_value('record_movie'):
+            dpg.set_value('record_movie', False)
+            self.worker.submit(self.stop_movie)
+        self.rom_path = rom_info[1]
+        quirks = self.quirks
+        self.worker.submit(lambda: self.reset_machine(rom_info[1], quirks))
+        dpg.configure_item('rom_selector', label=rom_info[0])
+        dpg.configure_item('pause_button', label='Start')
+        if not self.rom_selected:
+            self.rom_selected = True
+
+    def reset_machine(self, rom, quirks:str = None) -> None:
+        # Runs on the worker thread. Binding a quirk profile replaces the dispatch table, an
+        # attached profiler is moved over to the new one.
+        profiling = self.profiler.attached and quirks not in (None, self.cpu.quirks)
+        self.debugger.detach()
+        if profiling:
+            self.profiler.detach()
+        self.cpu.reset(quirks)
+        if profiling:
+            self.profiler.attach()
+        self.debugger.attach()
+        self.debugger.resume_address = self.debugger.break_address = None
+        self.scheduler.pending_cycles = 0
+        self.cpu.load_into_memory(rom)
+        self.disassembler.load(rom)
+        self.disassembler.warm()
+        self.framebuffer.clear_screen()
+        self.rewind.clear()
+
+    def rebind(self, action) -> None:
+        # Runs on the worker thread. The debugger traps sit on top of the dispatch table and
+        # the predecoded instructions, so they are taken off while action changes those or
+        # replays instructions, and set again from the current breaks after.
+        self.debugger.detach()
+        action()
+        self.debugger.attach()
+
+    def step_instruction(self) -> None:
+        # Runs on the worker thread. Applies the pending key events first, like a frame would.
+        self.debugger.resume()
+        if self.keypad.input_queue:
+            self.keypad.process_events(self.scheduler.frames)
+            # Instructions replayed after stepping back must see the new keys
+            self.rewind.capture(self.scheduler.frames)
+        self.rewind.tick()
+
+    def quick_save(self) -> None:
+        # Runs on the worker thread
+        self.saved_state = save_state(self.cpu)
+
+    def quick_load(self) -> None:
+        # Runs on the worker thread
+        if self.saved_state is not None:
+            try:
+                load_state(self.cpu, self.saved_state)
+            except ValueError as error:
+                # Saved before the quirk profile changed
+                print(f'[Exception]: {error}')
+                return
+            self.rewind.clear()
+            self.scheduler.pending_cycles = 0
+
+    def set_movie_recording(self, sender, data):
+        if not self.rom_selected:
+            dpg.set_value('record_movie', False)
+            return
+        if data:
+            rom = self.rom_path
+            self.worker.submit(lambda: self.start_movie(rom))
+        else:
+            self.worker.submit(self.stop_movie)
+
+    def start_movie(self, rom) -> None:
+        # Runs on the worker thread. A movie starts from power on with a known seed.
+        self.cpu.seed = random.getrandbits(32)
+        self.reset_machine(rom)
+        self.keypad.reset()
+        self.keypad.per_frame = True
+        self.keypad.start_recording()
+        self.scheduler.cycle_debt = 0.0
+        self.movie = Chip8Movie(rom_hash(rom), self.cpu.seed, self.scheduler.cpu_clockspeed, quirks=self.cpu.quirks)
+        self.movie_start = self.scheduler.frames
+        self.movie_path = os.path.basename(rom) + '.c8m'
+
+    def stop_movie(self) -> None:
+        # Runs on the worker thread, between two frames
+        if self.movie is None:
+            return
+        self.keypad.per_frame = False
+        self.movie.add_events(self.keypad.stop_recording(), self.movie_start, self.scheduler.frames)
+        self.movie.state_hash = state_hash(self.cpu)
+        self.movie.screen_hash = screen_hash(self.cpu)
+        self.movie.save(self.movie_path)
+        print(f'[Movie]: {self.movie.frames} frames saved to {self.movie_path}')
+        self.movie = None
+
+    def open_file_dialog(self, sender, data):
+        if not self._paused:
+            self.toggle_pause() 
+        dpg.show_item("file_dialog")
+
+    def toggle_pause(self) -> None:
+        if not self.rom_selected:
+            with dpg.window(label='Alert', width=500, height=100, popup=True):
+                dpg.add_text(default_value='Please select a rom first.')
+            return
+        self.show_paused(not self._paused)
+        paused = self._paused
+        self.worker.submit(lambda: self.resume_machine(not paused))
+
+    def show_paused(self, paused:bool) -> None:
+        self._paused = paused
+        if paused:
+            dpg.configure_item('pause_button', label='Resume')
+            for button in ('tick_button', 'frame_button', 'tick_back_button', 'frame_back_button'):
+                dpg.configure_item(button, enabled=True)
+        else:
+            dpg.configure_item('pause_button', label='Pause')
+            for button in ('tick_button', 'frame_button', 'tick_back_button', 'frame_back_button'):
+                dpg.configure_item(button, enabled=False)
+            dpg.set_value(self.break_status, '')
+            self.show_break_address(None)
+
+    def resume_machine(self, running:bool) -> None:
+        # Runs on the worker thread. Resuming runs the instruction a break stopped at instead of breaking again.
+        if running:
+            self.debugger.resume()
+        self.worker.set_paused(not running)
+
+    def step_frame(self) -> None:
+        # Runs on the worker thread
+        self.debugger.resume()
+        self.scheduler.step_frame()
+    
+    def set_clockspeed(self, sender, data):
+        self.cpu_clockspeed = data
+        self.scheduler.cpu_clockspeed = data
+
+    def set_quirks(self, sender, data):
+        # Quirks are bound at reset, so the rom restarts with the new profile
+        self.quirks = data
+        if not self.rom_selected:
+            return
+        if dpg.get_value('record_movie'):
+            dpg.set_value('record_movie', False)
+            self.worker.submit(self.stop_movie)
+        rom = self.rom_path
+        self.worker.submit(lambda: self.reset_machine(rom, data))
+
+    def set_debug(self, sender, data):
+        self.worker.submit(lambda: self.debug_machine(data))
+
+    def debug_machine(self, enabled:bool) -> None:
+        # Runs on the worker thread. Like a quirk change this replaces the dispatch table, an
+        # attached profiler is moved over to the new one.
+        profiling = self.profiler.attached
+        self.debugger.detach()
+        if profiling:
+            self.profiler.detach()
+        self.cpu.set_debug(enabled)
+        if profiling:
+            self.profiler.attach()
+        self.debugger.attach()
+
+    def set_sound(self, sender, data):
+        self.cpu.buzzer = self.audio.frame if data else None
+
+    def set_turbo(self, sender, data):
+        self.scheduler.turbo = data
+
+    def set_pixel_off_color(self, sender, data):
+        color = [int(i*255) for i in data]
+        self.screen.set_pixel_off_color(color)
+        
+    def set_pixel_on_color(self, sender, data):
+        color = [int(i*255) for i in data]
+        self.screen.set_pixel_on_color(color)
+
+    def set_pixel_plane2_color(self, sender, data):
+        color = [int(i*255) for i in data]
+        self.screen.set_pixel_plane2_color(color)
+
+    def set_pixel_both_color(self, sender, data):
+        color = [int(i*255) for i in data]
+        self.screen.set_pixel_both_color(color)
+    
+    def render_chip8_display(self) -> None:
+        # Shows the newest state published by the worker, if there is one we have not shown yet.
+        snapshot = self.worker.consume()
+        if snapshot is not None:
+            self.shown_planes = snapshot.planes
+            self.shown_width = snapshot.width
+            self.update_register_display(snapshot)
+            self.update_disassembly_display(snapshot)
+            if snapshot.hit is not None:
+                # The worker paused itself on a break
+                self.show_paused(True)
+                dpg.set_value(self.break_status, f'Stopped: {snapshot.hit}')
+                self.show_break_address(snapshot.hit.address)
+        # Every frame, rows already shown are skipped, so a color change shows even while paused
+        if self.shown_planes is not None:
+            self.screen.update_display(self.shown_planes, self.shown_width)
+        # Also follows scrolling while no new snapshot arrives
+        self.update_memory_display(snapshot)
+        self.rendered_frames += 1
+        if self.profiler.attached and self.rendered_frames % PROFILER_REFRESH_FRAMES == 0:
+            self.update_profiler_display()
+
+    def show_general_settings(self):
+        with dpg.child_window(tag='utility_window', width=200, height=32*SCALE, pos=[0,0]):
+            dpg.add_text(default_value='GENERAL SETTINGS')
+
+            with dpg.file_dialog(tag='file_dialog', default_path=ROM_FOLDER, callback=self.load_rom, width=700, height=400, modal=True, show=False):
+                dpg.add_file_extension('.*')
+
+            with dpg.child_window():
+                dpg.add_button(label='Select Rom', tag='rom_selector', callback=self.open_file_dialog , width=-1)
+                dpg.add_spacer()
+
+
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label= 'Start', tag='pause_button', width=80, callback=self.toggle_pause)
+                    dpg.add_button(label= 'Tick', tag='tick_button', width=80, callback=lambda: self.worker.submit(self.step_instruction), enabled=False)
+                dpg.add_button(label= 'Frame', tag='frame_button', width=-1, callback=lambda: self.worker.submit(self.step_frame), enabled=False)
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label= 'Back', tag='tick_back_button', width=80, callback=lambda: self.worker.submit(lambda: self.rebind(self.scheduler.step_back_instruction)), enabled=False)
+                    dpg.add_button(label= 'Back Frame', tag='frame_back_button', width=80, callback=lambda: self.worker.submit(lambda: self.rebind(self.scheduler.step_back_frame)), enabled=False)
+                with dpg.group(horizontal=True):
+                    dpg.add_button(label= 'Save State', width=80, callback=lambda: self.worker.submit(self.quick_save))
+                    dpg.add_button(label= 'Load State', width=80, callback=lambda: self.worker.submit(self.quick_load))
+                dpg.add_spacer()
+                
+                dpg.add_separator()
+                dpg.add_text(default_value='CPU Clockspeed (Hz)')
+                dpg.add_slider_int(tag='cpu_clockspeed', width=-1, min_value=10, default_value=500, max_value=1000, callback=self.set_clockspeed)
+                dpg.add_checkbox(label='Turbo', tag='turbo', callback=self.set_turbo)
+                dpg.add_checkbox(label='Sound', tag='sound', default_value=self.sound_available, enabled=self.sound_available, callback=self.set_sound)
+                dpg.add_checkbox(label='Debug (highlight changed registers)', tag='debug', callback=self.set_debug)
+                dpg.add_text(default_value='Quirks')
+                dpg.add_combo(items=list(QUIRK_PROFILES), tag='quirks', default_value=self.quirks, width=-1, callback=self.set_quirks)
+                dpg.add_checkbox(label='Record Movie', tag='record_movie', callback=self.set_movie_recording)
+                dpg.add_spacer()
+                
+                dpg.add_separator()
+                dpg.add_text(default_value='Pixel Colors')
+                with dpg.group(horizontal=True):
+                    dpg.add_color_edit(default_value=self.screen.color_pixel_off, callback=self.set_pixel_off_color)
+                    dpg.add_text(default_value='OFF', color=ACCENT_COLOR)
+                with dpg.group(horizontal=True):
+                    dpg.add_color_edit(default_value=self.screen.color_pixel_on, callback=self.set_pixel_on_color)
+                    dpg.add_text(default_value='ON', color=ACCENT_COLOR)
+                with dpg.group(horizontal=True):
+                    dpg.add_color_edit(default_value=self.screen.color_pixel_plane2, callback=self.set_pixel_plane2_color)
+                    dpg.add_text(default_value='PLANE 2', color=ACCENT_COLOR)
+                with dpg.group(horizontal=True):
+                    dpg.add_color_edit(default_value=self.screen.color_pixel_both, callback=self.set_pixel_both_color)
+                    dpg.add_text(default_value='BOTH', color=ACCENT_COLOR)
+
+    
+    def show_register_display(self):
+        self.v =[None]*len(self.cpu.v)
+        # Text shown by each register widget, to only update the ones that changed
+        self.rendered_registers = {}
+        self.highlighted_registers = frozenset()
+        with dpg.child_window(tag='register_window', width=200, height=32*SCALE, pos=[64*SCALE+200, 0]):
+            dpg.add_text(default_value='REGISTERS')
+            with dpg.child_window():
+                for i in range(8):
+                    with dpg.group(horizontal=True):
+                        dpg.add_text(default_value='V'+hex(i).upper()[-1]+':', color=ACCENT_COLOR)
+                        self.v[i] = dpg.add_text(default_value=hex(self.cpu.v[i])[2:].zfill(2).upper())
+                        dpg.add_spacer()
+                        dpg.add_text(default_value='V'+hex(i+8).upper()[-1]+':', color=ACCENT_COLOR)
+                        self.v[i+8] = dpg.add_text(default_value=hex(self.cpu.v[i+8])[2:].zfill(2).upper())
+
+                dpg.add_separator()
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value='PC:', color=ACCENT_COLOR)
+                    self.pc = dpg.add_text(default_value=hex(self.cpu.pc)[2:].zfill(3).upper())
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value='SP:', color=ACCENT_COLOR)
+                    self.sp = dpg.add_text(default_value=hex(self.cpu.sp)[2:].zfill(3).upper())
+
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value='I :', color=ACCENT_COLOR)
+                    self.i = dpg.add_text(default_value=hex(self.cpu.i)[2:].zfill(3).upper())
+                
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value='ST:', color=ACCENT_COLOR)
+                    self.st = dpg.add_text(default_value=hex(self.cpu.st)[2:].zfill(3).upper())
+                
+                with dpg.group(horizontal=True):
+                    dpg.add_text(default_value='DT:', color=ACCENT_COLOR)
+                    self.dt = dpg.add_text(default_value=hex(self.cpu.dt)[2:].zfill(3).upper())
+
+                
+    def show_memory_display(self):
+        # VIRTUALIZED: only MEMORY_VIEW_ROWS rows of widgets exist, showing the rows from memory_top on
+        self.memory_top = 0
+        self.memory_scrolled = True
+        self.memory_bytes = bytes(self.cpu.memory)
+        self.memory_labels = [None] * MEMORY_VIEW_ROWS
+        self.memory = [None] * (MEMORY_VIEW_ROWS * 16)
+        # Byte shown by each widget, -1 when it has to be redrawn
+        self.rendered_memory = [-1] * (MEMORY_VIEW_ROWS * 16)
+        # Address of the instruction the last break stopped at, shown in ACCENT_COLOR
+        self.break_address = None
+        with dpg.child_window(tag='memory_display', width=64*SCALE, height=-1, pos=[0,32*SCALE]):
+            dpg.add_text(default_value='MEMORY')
+            with dpg.group(horizontal=True):
+                with dpg.child_window(width=-40):
+                    for row in range(MEMORY_VIEW_ROWS):
+                        with dpg.group(horizontal=True):
+                            self.memory_labels[row] = dpg.add_text(default_value='', color=ACCENT_COLOR)
+                            dpg.add_spacer()
+                            for j in range(16):
+                                if j == 8:
+                                    dpg.add_spacer()
+                                self.memory[row*16 + j] = dpg.add_text(default_value='')
+                # Last row the view can start at, it grows with the XO-CHIP address space
+                self.memory_max_top = len(self.memory_bytes) // 16 - MEMORY_VIEW_ROWS
+                # Vertical sliders grow upwards, so the value counts rows from the bottom
+                dpg.add_slider_int(tag='memory_scroll', vertical=True, width=30, height=-1, min_value=0, max_value=self.memory_max_top,
+                                   default_value=self.memory_max_top, format='', callback=lambda sender, data: self.scroll_memory_display(self.memory_max_top - data))
+
+    def scroll_memory_display(self, top:int) -> None:
+        top = min(max(top, 0), self.memory_max_top)
+        if top != self.memory_top:
+            self.memory_top = top
+            self.memory_scrolled = True
+            dpg.set_value('memory_scroll', self.memory_max_top - top)
+
+    def resize_memory_display(self, size:int) -> None:
+        self.memory_max_top = size // 16 - MEMORY_VIEW_ROWS
+        dpg.configure_item('memory_scroll', max_value=self.memory_max_top)
+        self.memory_top = min(self.memory_top, self.memory_max_top)
+        dpg.set_value('memory_scroll', self.memory_max_top - self.memory_top)
+        self.memory_scrolled = True
+
+    def memory_wheel_handler(self, sender, data):
+        if dpg.is_item_hovered('memory_display'):
+            self.scroll_memory_display(self.memory_top - data * MEMORY_WHEEL_ROWS)
+    
+    def show_keypad_display(self):
+        # Keys held according to the GUI, as a bitmask like Chip8Keypad.state
+        self.keys_down = 0
+        # Built once and rebound on every key event
+        with dpg.theme() as self.key_highlight_theme:
+            with dpg.theme_component(dpg.mvAll):
+                dpg.add_theme_color(dpg.mvThemeCol_Button, ACCENT_COLOR)
+        with dpg.theme() as self.key_default_theme:
+            with dpg.theme_component(dpg.mvAll):
+                dpg.add_theme_color(dpg.mvThemeCol_Button, NEUTRAL_COLOR)
+        with dpg.child_window(tag='keypad_display', width=400, height=-1, pos=[64*SCALE, 32*SCALE]):
+            dpg.add_text(default_value='KEYPAD')
+            # dpg.add_separator()
+            with dpg.child_window(tag='keypad'):
+                with dpg.group(horizontal=True):
+                    dpg.add_button(width=86, height=100, label='1', tag='1')
+                    dpg.add_button(width=86, height=100, label='2', tag='2')
+                    dpg.add_button(width=86, height=100, label='3', tag='3')
+                    dpg.add_button(width=86, height=100, label='C', tag='12')
+            
+                with dpg.group(horizontal=True):
+                    dpg.add_button(width=86, height=100, label='4', tag='4')
+                    dpg.add_button(width=86, height=100, label='5', tag='5')
+                    dpg.add_button(width=86, height=100, label='6', tag='6')
+                    dpg.add_button(width=86, height=100, label='D', tag='13')
+
+
+                with dpg.group(horizontal=True):
+                    dpg.add_button(width=86, height=100, label='7', tag='7')
+                    dpg.add_button(width=86, height=100, label='8', tag='8')
+                    dpg.add_button(width=86, height=100, label='9', tag='9')
+                    dpg.add_button(width=86, height=100, label='E', tag='14')
+
+                with dpg.group(horizontal=True):
+                    dpg.add_button(width=86, height=100, label='A', tag='10')
+                    dpg.add_button(width=86, height=100, label='0', tag='0')
+                    dpg.add_button(width=86, height=100, label='B', tag='11')
+                    dpg.add_button(width=86, height=100, label='F', tag='15')
+        
+        with dpg.theme() as keypad_themes:
+            with dpg.theme_component(dpg.mvAll):
+                dpg.add_theme_style(dpg.mvStyleVar_ItemSpacing, x=8, y=8)
+        dpg.bind_item_theme('keypad', keypad_themes)
+
+    def show_profiler_display(self):
+        # Heat map of executed addresses, one pixel per address
+        self.heat_size = int(math.sqrt(MEM_SIZE))
+        self.heat_data = [0.0] * (MEM_SIZE * 4)
+        with dpg.texture_registry():
+            self.heat_texture = dpg.add_dynamic_texture(width=self.heat_size, height=self.heat_size, default_value=self.heat_data)
+        with dpg.child_window(tag='profiler_window', width=-1, height=32*SCALE, pos=[64*SCALE+400, 0]):
+            dpg.add_text(default_value='PROFILER')
+            with dpg.child_window():
+                with dpg.group(horizontal=True):
+                    dpg.add_checkbox(label='Profile', tag='profile', callback=self.set_profiling)
+                    dpg.add_button(label='Reset', width=60, callback=lambda: self.worker.submit(self.profiler.reset))
+                    dpg.add_button(label='Export', width=60, callback=lambda: self.worker.submit(self.export_profile))
+                dpg.add_separator()
+                self.profile_summary = dpg.add_text(default_value='Detached')
+                with dpg.group(horizontal=True):
+                    dpg.add_image(self.heat_texture, width=self.heat_size*3, height=self.heat_size*3)
+                    self.profile_handlers = dpg.add_text(default_value='')
+
+    def set_profiling(self, sender, data):
+        self.worker.submit(lambda: self.rebind(self.profiler.attach if data else self.profiler.detach))
+        if not data:
+            dpg.set_value(self.profile_summary, 'Detached')
+
+    def export_profile(self) -> None:
+        # Runs on the worker thread
+        self.profiler.export('profile.json')
+        print('[Profiler]: saved to profile.json')
+
+    def update_profiler_display(self):
+        # Reads the counters while the worker updates them, a slightly torn view is fine here
+        stats = self.profiler.stats
+        draws, clears = self.profiler.draws, stats['_00E0'][0]
+        dpg.set_value(self.profile_summary, f'{self.profiler.instructions} instructions, {draws} draws, {clears} clears')
+        lines = []
+        for name, (count, time_ns) in sorted(stats.items(), key=lambda item: -item[1][1])[:PROFILER_TOP_HANDLERS]:
+            if count:
+                lines.append(f'{name[1:]:<5} {count:>9} {time_ns / 1e6:>8.1f}ms')
+        dpg.set_value(self.profile_handlers, '\n'.join(lines))
+
+        heat = self.profiler.heat
+        if len(heat) > MEM_SIZE:
+            # One pixel per address does not fit the 64K of XO-CHIP, each pixel shows its hottest address
+            bucket = len(heat) // MEM_SIZE
+            heat = [max(heat[pixel * bucket : (pixel + 1) * bucket]) for pixel in range(MEM_SIZE)]
+        scale = math.log1p(max(heat)) or 1
+        accent = [channel / 255 for channel in ACCENT_COLOR]
+        for address, count in enumerate(heat):
+            level = math.log1p(count) / scale
+            self.heat_data[address*4 : address*4 + 4] = accent[0] * level, accent[1] * level, accent[2] * level, 1.0
+        dpg.set_value(self.heat_texture, self.heat_data)
+
+    def show_debugger_display(self):
+        # Label shown in the list -> worker command removing the break
+        self.break_removers = {}
+        opcodes = sorted({opcode_class(handler.__name__) for handler, _ in self.cpu.operation_lookup.values()})
+        with dpg.child_window(tag='debugger_window', width=-1, height=32*SCALE, pos=[64*SCALE+400, 32*SCALE]):
+            dpg.add_text(default_value='DEBUGGER')
+            with dpg.group(horizontal=True):
+                with dpg.child_window(width=300):
+                    with dpg.group(horizontal=True):
+                        dpg.add_input_text(tag='break_address', hint='Address', width=60, hexadecimal=True)
+                        dpg.add_input_text(tag='break_condition', hint='v3 == 5', width=-60)
+                        dpg.add_button(label='Break', width=-1, callback=self.add_breakpoint)
+                    with dpg.group(horizontal=True):
+                        dpg.add_combo(opcodes, tag='break_opcode', width=-60)
+                        dpg.add_button(label='Break', width=-1, callback=self.add_opcode_break)
+                    with dpg.group(horizontal=True):
+                        dpg.add_input_text(tag='watch_address', hint='Address', width=60, hexadecimal=True)
+                        dpg.add_combo(list(WATCH_MODES), tag='watch_mode', default_value='w', width=-60)
+                        dpg.add_button(label='Watch', width=-1, callback=self.add_watchpoint)
+                    dpg.add_listbox([], tag='break_list', width=-1, num_items=8)
+                    with dpg.group(horizontal=True):
+                        dpg.add_button(label='Remove', width=80, callback=self.remove_break)
+                        dpg.add_button(label='Clear', width=80, callback=self.clear_breaks)
+                    self.break_status = dpg.add_text(default_value='', wrap=0)
+                # Live disassembly around pc, with the symbols of the static analysis
+                with dpg.child_window(tag='disassembly_window'):
+                    self.disassembly = dpg.add_text(default_value='')
+        self.rendered_disassembly = ''
+
+    def add_break(self, label:str, add, remove) -> None:
+        # add and remove change the debugger and run on the worker thread, where the traps are rebuilt
+        self.worker.submit(lambda: self.rebind(add))
+        self.break_removers[label] = remove
+        dpg.configure_item('break_list', items=list(self.break_removers))
+        dpg.set_value(self.break_status, '')
+
+    def add_breakpoint(self, sender, data):
+        try:
+            address = int(dpg.get_value('break_address'), 16)
+            condition = dpg.get_value('break_condition').strip() or None
+            if condition:
+                compile_condition(condition)
+        except ValueError as error:
+            dpg.set_value(self.break_status, str(error) if dpg.get_value('break_address') else 'Enter an address')
+            return
+        label = f'PC {address:03X}' + (f' if {condition}' if condition else '')
+        for other in [other for other in self.break_removers if other.split(' if ')[0] == f'PC {address:03X}']:
+            # One breakpoint per address, the new condition replaces the old one
+            del self.break_removers[other]
+        self.add_break(label, lambda: self.debugger.add_breakpoint(address, condition), lambda: self.debugger.remove_breakpoint(address))
+
+    def add_opcode_break(self, sender, data):
+        opcode = dpg.get_value('break_opcode')
+        if opcode:
+            self.add_break(f'OP {opcode}', lambda: self.debugger.add_opcode_break(opcode), lambda: self.debugger.remove_opcode_break(opcode))
+
+    def add_watchpoint(self, sender, data):
+        try:
+            address = int(dpg.get_value('watch_address'), 16)
+        except ValueError:
+            dpg.set_value(self.break_status, 'Enter an address')
+            return
+        mode = dpg.get_value('watch_mode')
+        for other in [other for other in self.break_removers if other.startswith(f'WATCH {address:03X} ')]:
+            del self.break_removers[other]
+        self.add_break(f'WATCH {address:03X} {WATCH_MODES[mode]}', lambda: self.debugger.add_watchpoint(address, mode), lambda: self.debugger.remove_watchpoint(address))
+
+    def remove_break(self, sender, data):
+        remove = self.break_removers.pop(dpg.get_value('break_list'), None)
+        if remove is not None:
+            self.worker.submit(lambda: self.rebind(remove))
+            dpg.configure_item('break_list', items=list(self.break_removers))
+
+    def clear_breaks(self, sender, data):
+        self.worker.submit(lambda: self.rebind(self.debugger.clear))
+        self.break_removers.clear()
+        dpg.configure_item('break_list', items=[])
+
+    def update_disassembly_display(self, snapshot):
+        # Decoded from the snapshot memory, so code written at runtime shows as it is now
+        lines = []
+        for address, label, opcode, text in self.disassembler.listing(snapshot.memory, snapshot.pc, DISASSEMBLY_LINES):
+            if label:
+                lines.append(f'{label}:')
+            lines.append(f'{">" if address == snapshot.pc else " "} {address:03X}  {opcode:04X}  {text}')
+        text = '\n'.join(lines)
+        if text != self.rendered_disassembly:
+            dpg.set_value(self.disassembly, text)
+            self.rendered_disassembly = text
+
+    def show_break_address(self, address:int|None) -> None:
+        # Highlights the instruction a break stopped at in the memory view, scrolled into view
+        self.break_address = address
+        if address is not None:
+            self.scroll_memory_display(address // 16 - MEMORY_VIEW_ROWS // 2)
+        self.memory_scrolled = True
+
+    def show_info_display(self):
+        with dpg.child_window(width=-1, height=-1, pos=[64*SCALE+400, 64*SCALE]):
+            dpg.add_text(default_value='INFORMATION')
+            with dpg.child_window() as info_window:
+                with open('yachipy/app_info.txt', 'r') as file:
+                    dpg.add_text(default_value=file.read(), wrap=dpg.get_item_height(info_window))
+
+
+
+
+    def update_register_display(self, snapshot):
+        values = [(self.v[i], f'{snapshot.v[i]:02X}') for i in range(16)]
+        values += [
+            (self.pc, f'{snapshot.pc:03X}'),
+            (self.sp, f'{snapshot.sp:03X}'),
+            (self.i, f'{snapshot.i:03X}'),
+            (self.st, f'{snapshot.st:03X}'),
+            (self.dt, f'{snapshot.dt:03X}'),
+        ]
+        for item, text in values:
+            if self.rendered_registers.get(item) != text:
+                dpg.set_value(item, text)
+                self.rendered_registers[item] = text
+        # Registers changed since the last snapshot, only known while debugging
+        for reg in snapshot.written ^ self.highlighted_registers:
+            dpg.configure_item(self.v[reg], color=ACCENT_COLOR if reg in snapshot.written else None)
+        self.highlighted_registers = snapshot.written
+    
+    def update_memory_display(self, snapshot):
+        # Called once per frame. Redraws the visible bytes written since the last snapshot,
+        # or all visible bytes after a scroll. Bytes outside the view are read when scrolled to.
+        if snapshot is not None:
+            if len(snapshot.memory) != len(self.memory_bytes):
+                self.resize_memory_display(len(snapshot.memory))
+            self.memory_bytes = snapshot.memory
+        first = self.memory_top * 16
+        last = first + MEMORY_VIEW_ROWS * 16
+        if self.memory_scrolled:
+            self.memory_scrolled = False
+            for row in range(MEMORY_VIEW_ROWS):
+                dpg.set_value(self.memory_labels[row], f'{self.memory_top + row:02X}X:')
+            ranges = [(first, last)]
+        elif snapshot is not None and snapshot.dirty_memory:
+            ranges = IntervalSet(snapshot.dirty_memory).overlapping(first, last)
+        else:
+            return
+
+        memory = self.memory_bytes
+        # Both bytes of the instruction, rendered with 0x100 added so the cell is redrawn when it changes
+        highlighted = () if self.break_address is None else (self.break_address, self.break_address + 1)
+        for start, end in ranges:
+            for address in range(start, end):
+                byte = memory[address]
+                cell = address - first
+                rendered = byte | 0x100 if address in highlighted else byte
+                if self.rendered_memory[cell] == rendered:
+                    continue
+                self.rendered_memory[cell] = rendered
+                color = None
+                if rendered > 0xFF:
+                    color = ACCENT_COLOR
+                elif byte == 0:
+                    color = DULL_COLOR
+                dpg.configure_item(self.memory[cell], default_value=f'{byte:02X}', color=color)
+
+
+    def run(self) -> None:
+        # Do bunch of other setups if required
+        dpg.show_viewport()
+        # dpg.show_metrics()
+        # dpg.show_style_editor()
+        dpg.maximize_viewport()
+        # Render at the display refresh rate. Emulation speed is kept by the scheduler.
+        dpg.set_viewport_vsync(True)
+
+        self.worker.start()
+        self.audio.start()
+        while dpg.is_dearpygui_running():
+            self.render_chip8_display()
+            dpg.render_dearpygui_frame()
+
+        self.worker.stop()
+        self.worker.join()
+        self.audio.stop()
+        self.audio.join()
+        dpg.destroy_context()
         
\ No newline at end of file
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from .cpu import QUIRK_PROFILES
+from .headless import Chip8Headless
+
+
+def load_input_script(path:str) -> list:
+    # An input script has one event per line: '<cycle> <key in hex> <down|up>'. '#' starts a comment.
+    events = []
+    with open(path, 'r') as script:
+        for line in script:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            cycle, key, action = line.split()
+            if action not in ('down', 'up'):
+                raise ValueError(f'{path}: invalid key action {action!r}')
+            events.append((int(cycle), int(key, 16), action == 'down'))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def run_job(job:dict) -> dict:
+    # Runs one rom headless and returns a JSON friendly summary. Only depends on the job,
+    # so the same job gives the same result in any worker.
+    chip8 = Chip8Headless(cpu_clockspeed=job['clockspeed'], jit=job['jit'], seed=job['seed'], quirks=job['quirks'])
+    if not chip8.load_rom(job['rom']):
+        return {**job, 'error': 'rom not found'}
+    events = load_input_script(job['script']) if job['script'] else []
+
+    elapsed = 0.0
+    for cycle, key, pressed in events:
+        if cycle >= job['cycles']:
+            break
+        if cycle > chip8.cycles:
+            elapsed += chip8.run(cycle - chip8.cycles)
+        if pressed:
+            chip8.cpu.keypad.press(key)
+        else:
+            chip8.cpu.keypad.release(key)
+    if job['cycles'] > chip8.cycles:
+        elapsed += chip8.run(job['cycles'] - chip8.cycles)
+
+    return {
+        **job,
+        'executed_cycles': chip8.cycles,
+        'framebuffer_hash': chip8.framebuffer_hash(),
+        'wall_time': elapsed,
+    }
+
+
+def run_farm(rom_dir:str, scripts:list, cycle_budgets:list, workers:int = None, seed:int = 0, clockspeed:int = 500, jit:bool = False, quirks:str = 'modern') -> list:
+    # Fans every (rom, script, cycles) combination out over a process pool. Results keep the job order.
+    roms = sorted(
+        os.path.join(rom_dir, name) for name in os.listdir(rom_dir)
+        if os.path.isfile(os.path.join(rom_dir, name)) and not name.endswith('.txt')
+    )
+    jobs = [
+        {'rom': rom, 'script': script, 'cycles': cycles, 'seed': seed, 'clockspeed': clockspeed, 'jit': jit, 'quirks': quirks}
+        for rom, script, cycles in product(roms, scripts or [None], cycle_budgets)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_job, jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='yachipy.farm', description='Run a directory of roms headless across a process pool')
+    parser.add_argument('rom_dir', help='directory of roms, e.g. yachipy/roms/game_roms')
+    parser.add_argument('--cycles', type=int, nargs='+', default=[100000], help='cycle budgets to run every rom for')
+    parser.add_argument('--script', action='append', default=[], help='input script to replay (repeatable)')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: cpu count)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the CXNN random number generator')
+    parser.add_argument('--clockspeed', type=int, default=500, help='emulated cpu clockspeed (Hz) used for timers')
+    parser.add_argument('--jit', action='store_true', help='use the basic-block JIT')
+    parser.add_argument('--quirks', choices=QUIRK_PROFILES, default='modern', help='interpreter behaviour to emulate')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_farm(args.rom_dir, args.script, args.cycles, args.workers, args.seed, args.clockspeed, args.jit, args.quirks)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if 'error' in result:
+            print(f"{os.path.basename(result['rom']):<24} {result['error']}")
+            continue
+        print(f"{os.path.basename(result['rom']):<24} {result['executed_cycles']:>10} {result['framebuffer_hash'][:12]} {result['wall_time']:.3f}s")
+    print(f'{len(results)} jobs in {elapsed:.3f}s')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+
+if __name__ == '__main__':
+    main()
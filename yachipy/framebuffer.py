@@ -0,0 +1,125 @@
+from .config import SCREEN_WIDTH, SCREEN_HEIGHT, HIRES_WIDTH, HIRES_HEIGHT
+
+
+class Chip8Framebuffer:
+    def __init__(self) -> None:
+        # Current resolution, HIRES_WIDTH x HIRES_HEIGHT in SUPER-CHIP high resolution mode
+        self.width = SCREEN_WIDTH
+        self.height = SCREEN_HEIGHT
+        # One list of int row bitmaps per bitplane. The most significant bit is the leftmost pixel (x = 0).
+        # Only XO-CHIP has a second plane. The lists are modified in place, rows is always planes[0].
+        self.planes = [[0] * SCREEN_HEIGHT]
+        self.rows = self.planes[0]
+        # Bitmask of the planes drawing, clearing and scrolling apply to (XO-CHIP FN01)
+        self.selected = 1
+        # Set whenever a draw or clear changed pixels, reset by the renderer
+        self.dirty = True
+
+    def reset(self, planes:int = 1) -> None:
+        # Back to a blank low resolution screen with the given number of planes, the first one selected.
+        del self.planes[planes:]
+        while len(self.planes) < planes:
+            self.planes.append([])
+        self.selected = 1
+        self.set_resolution(False)
+
+    def set_resolution(self, hires:bool) -> None:
+        # Switching resolution clears every plane
+        self.width, self.height = (HIRES_WIDTH, HIRES_HEIGHT) if hires else (SCREEN_WIDTH, SCREEN_HEIGHT)
+        for plane in self.planes:
+            plane[:] = [0] * self.height
+        self.dirty = True
+
+    def selected_planes(self) -> list:
+        return [plane for index, plane in enumerate(self.planes) if (self.selected >> index) & 1]
+
+    def clear_screen(self) -> None:
+        for plane in self.selected_planes():
+            if any(plane):
+                self.dirty = True
+            plane[:] = [0] * self.height
+
+    def scroll_down(self, lines:int) -> None:
+        lines = min(lines, self.height)
+        for plane in self.selected_planes():
+            plane[:] = [0] * lines + plane[:self.height - lines]
+        self.dirty = True
+
+    def scroll_up(self, lines:int) -> None:
+        lines = min(lines, self.height)
+        for plane in self.selected_planes():
+            plane[:] = plane[lines:] + [0] * lines
+        self.dirty = True
+
+    def scroll_right(self, pixels:int) -> None:
+        for plane in self.selected_planes():
+            plane[:] = [row >> pixels for row in plane]
+        self.dirty = True
+
+    def scroll_left(self, pixels:int) -> None:
+        mask = (1 << self.width) - 1
+        for plane in self.selected_planes():
+            plane[:] = [(row << pixels) & mask for row in plane]
+        self.dirty = True
+
+    def draw_sprite(self, x_origin:int, y_origin:int, sprite, sprite_width:int = 8) -> int:
+        # XORs a sprite onto the first plane, clipping at the right and bottom edges. sprite holds
+        # one sprite_width bits wide int per row, a bytes object for the 8 pixel wide sprites.
+        # Returns 1 if any pixel was flipped from set to unset, otherwise 0.
+        rows = self.rows
+        shift = self.width - sprite_width
+        collision = 0
+        changed = 0
+        for y_coord, sprite_row in zip(range(y_origin, self.height), sprite):
+            bits = (sprite_row << shift) >> x_origin
+            collision |= rows[y_coord] & bits
+            rows[y_coord] ^= bits
+            changed |= bits
+        if changed:
+            self.dirty = True
+        return 1 if collision else 0
+
+    def draw_sprite_planes(self, x_origin:int, y_origin:int, sprite:list, sprite_width:int = 8) -> int:
+        # XO-CHIP drawing: every selected plane takes the next len(sprite) // planes rows of the
+        # sprite, and sprites wrap around the edges instead of being clipped.
+        planes = self.selected_planes()
+        if not planes:
+            return 0
+        width = self.width
+        height = self.height
+        mask = (1 << width) - 1
+        shift = width - sprite_width
+        sprite_height = len(sprite) // len(planes)
+        collision = 0
+        changed = 0
+        for index, rows in enumerate(planes):
+            for row, sprite_row in enumerate(sprite[index * sprite_height : (index + 1) * sprite_height]):
+                y_coord = (y_origin + row) % height
+                full = sprite_row << shift
+                bits = (full >> x_origin) | ((full << (width - x_origin)) & mask)
+                collision |= rows[y_coord] & bits
+                rows[y_coord] ^= bits
+                changed |= bits
+        if changed:
+            self.dirty = True
+        return 1 if collision else 0
+
+    def is_pixel_on(self, idx) -> bool:
+        y_coord, x_coord = divmod(idx, self.width)
+        return (self.rows[y_coord] >> (self.width - 1 - x_coord)) & 1 == 1
+
+    def to_bytes(self) -> bytes:
+        # Packed representation, width // 8 big endian bytes per row, plane after plane.
+        row_size = self.width // 8
+        return b''.join(row.to_bytes(row_size, 'big') for plane in self.planes for row in plane)
+
+    def load_bytes(self, data, width:int, height:int, planes:int) -> None:
+        # Restores the screen from the output of to_bytes() and the geometry it was taken with.
+        row_size = width // 8
+        self.reset(planes)
+        self.width = width
+        self.height = height
+        for index, plane in enumerate(self.planes):
+            start = index * height
+            plane[:] = [int.from_bytes(data[(start + row) * row_size : (start + row + 1) * row_size], 'big') for row in range(height)]
+        self.dirty = True
@@ -0,0 +1,99 @@
+import time
+import hashlib
+from .cpu import Chip8CPU
+from .jit import Chip8JIT
+from .disassembler import Chip8Disassembler
+from .config import TIMER_FREQUENCY
+
+
+class Chip8Headless:
+    def __init__(self, cpu_clockspeed:int = 500, jit:bool = False, seed:int = None, quirks:str = 'modern') -> None:
+        self.cpu = Chip8CPU(seed=seed, quirks=quirks)
+        self.jit = Chip8JIT(self.cpu) if jit else None
+        # Predecodes, or compiles with the JIT, the code of a ROM when it is loaded
+        self.disassembler = Chip8Disassembler(self.cpu)
+        self.cpu_clockspeed = cpu_clockspeed
+        self.cycles = 0
+        # Cycles spent halted in FX0A, counted in cycles without executing anything
+        self.halted_cycles = 0
+
+    def load_rom(self, rom:str) -> bool:
+        self.cpu.reset()
+        self.cpu.screen.clear_screen()
+        self.cpu.keypad.reset()
+        self.cycles = self.halted_cycles = 0
+        if not self.cpu.load_into_memory(rom):
+            return False
+        self.disassembler.load(rom)
+        self.disassembler.warm(self.jit)
+        return True
+
+    def run(self, cycles:int) -> float:
+        # Runs the given number of cycles as fast as the host allows.
+        # Timers are still ticked at 60Hz of emulated time, i.e. every cpu_clockspeed/60 cycles.
+        cycles_per_timer = max(1, self.cpu_clockspeed // TIMER_FREQUENCY)
+        cpu = self.cpu
+        tick_timers = cpu.tick_timers
+        keypad = cpu.keypad
+        start = time.perf_counter()
+        end = self.cycles + cycles
+        while self.cycles < end:
+            # Queued and replayed key events are applied once per 60Hz frame, like the scheduler does
+            keypad.process_events(self.cycles // cycles_per_timer)
+            next_timer = (self.cycles // cycles_per_timer + 1) * cycles_per_timer
+            if cpu.halted:
+                cpu.process_key_events()
+                if cpu.halted and not keypad.playback:
+                    # Waiting in FX0A and no key can be pressed during this call, so the rest of it is idle
+                    for _ in range(end // cycles_per_timer - self.cycles // cycles_per_timer):
+                        tick_timers()
+                    self.halted_cycles += end - self.cycles
+                    self.cycles = end
+                    break
+                if cpu.halted:
+                    # Idle until the frame of the next replayed key event
+                    self.halted_cycles += min(next_timer, end) - self.cycles
+                    self.cycles = min(next_timer, end)
+                    if self.cycles == next_timer:
+                        tick_timers()
+                    continue
+            stop = min(next_timer, end)
+            # With no key event due during this call, an idle loop that no longer waits for DT idles until its end
+            idle_end = end if not keypad.playback and not keypad.input_queue else stop
+            if self.jit is not None:
+                # Blocks that would run past the timer tick are left to the interpreter, so the
+                # timers tick on the same cycle as without the JIT.
+                # A block jumping back to its own start may be an idle loop, fast-forwarded from there.
+                step = self.jit.step
+                idle_blocks = self.jit.idle_blocks
+                executed = self.cycles
+                while executed < stop and not cpu.halted:
+                    pc = cpu.pc
+                    executed += step(stop - executed)
+                    if cpu.pc == pc and pc in idle_blocks and executed < stop:
+                        executed += cpu.skip_idle_loop(stop - executed, idle_end - executed)
+            else:
+                executed = self.cycles + cpu.run(stop - self.cycles, idle_end - self.cycles)
+            # A halted cpu would only execute FX0A again until the tick
+            if executed < stop:
+                self.halted_cycles += stop - executed
+                executed = stop
+            self.cycles = executed
+            while self.cycles >= next_timer:
+                tick_timers()
+                next_timer += cycles_per_timer
+        return time.perf_counter() - start
+
+    def framebuffer_hash(self) -> str:
+        return hashlib.sha1(self.cpu.screen.to_bytes()).hexdigest()
+
+    def dump_screen(self) -> str:
+        # Pixels set on any plane are shown
+        screen = self.cpu.screen
+        rows = []
+        for y_coord in range(screen.height):
+            row = 0
+            for plane in screen.planes:
+                row |= plane[y_coord]
+            rows.append(format(row, f'0{screen.width}b').replace('0', '.').replace('1', '#'))
+        return '\n'.join(rows)
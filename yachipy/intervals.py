@@ -0,0 +1,43 @@
+from bisect import bisect_left, bisect_right
+
+
+class IntervalSet:
+    # Set of addresses stored as sorted, non overlapping [start, end) ranges.
+    # Adding a range merges it with the ranges it overlaps or touches.
+    def __init__(self, ranges=()) -> None:
+        self.starts = []
+        self.ends = []
+        for start, end in ranges:
+            self.add(start, end)
+
+    def __bool__(self) -> bool:
+        return bool(self.starts)
+
+    def add(self, start:int, end:int) -> None:
+        if start >= end:
+            return
+        # Ranges ending before start and starting after end are left alone
+        low = bisect_left(self.ends, start)
+        high = bisect_right(self.starts, end)
+        if low < high:
+            start = min(start, self.starts[low])
+            end = max(end, self.ends[high - 1])
+        self.starts[low:high] = [start]
+        self.ends[low:high] = [end]
+
+    def update(self, ranges) -> None:
+        for start, end in ranges:
+            self.add(start, end)
+
+    def clear(self) -> None:
+        self.starts = []
+        self.ends = []
+
+    def ranges(self) -> list:
+        return list(zip(self.starts, self.ends))
+
+    def overlapping(self, start:int, end:int) -> list:
+        # The stored ranges clipped to [start, end)
+        low = bisect_right(self.ends, start)
+        high = bisect_left(self.starts, end)
+        return [(max(s, start), min(e, end)) for s, e in zip(self.starts[low:high], self.ends[low:high])]
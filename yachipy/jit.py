@@ -0,0 +1,325 @@
+from .config import XO_MEM_SIZE
+from .cpu import Chip8CPU, IDLE_LOOP_HANDLERS
+
+# Longest run of instructions compiled into a single block
+MAX_BLOCK_SIZE = 64
+# Granularity of the address -> blocks index used for invalidation
+PAGE_SIZE = 256
+
+# Inline Python for instructions that only touch registers. Registers live in locals v0..vF and i.
+INLINE = {
+    '_NOP': [],
+    '_6XNN': ['v{x} = {nn}'],
+    '_7XNN': ['v{x} = (v{x} + {nn}) & 0xFF'],
+    '_8XY0': ['v{x} = v{y}'],
+    '_8XY1': ['v{x} |= v{y}'],
+    '_8XY2': ['v{x} &= v{y}'],
+    '_8XY3': ['v{x} ^= v{y}'],
+    '_8XY4': ['r = v{x} + v{y}', 'v{x} = r & 0xFF', 'vF = r >> 8'],
+    '_8XY5': ['r = v{x} - v{y}', 'v{x} = r & 0xFF', 'vF = 0 if r < 0 else 1'],
+    '_8XY6': ['r = v{x} & 0x1', 'v{x} >>= 1', 'vF = r'],
+    '_8XY7': ['r = v{y} - v{x}', 'v{x} = r & 0xFF', 'vF = 0 if r < 0 else 1'],
+    '_8XYE': ['r = v{x} >> 7', 'v{x} = (v{x} << 1) & 0xFF', 'vF = r'],
+    # Quirk variants
+    '_8XY1_VF': ['v{x} |= v{y}', 'vF = 0'],
+    '_8XY2_VF': ['v{x} &= v{y}', 'vF = 0'],
+    '_8XY3_VF': ['v{x} ^= v{y}', 'vF = 0'],
+    '_8XY6_VY': ['r = v{y} & 0x1', 'v{x} = v{y} >> 1', 'vF = r'],
+    '_8XYE_VY': ['r = v{y} >> 7', 'v{x} = (v{y} << 1) & 0xFF', 'vF = r'],
+    '_ANNN': ['i = {nnn}'],
+    '_FX07': ['v{x} = cpu.dt'],
+    '_FX15': ['cpu.dt = v{x}'],
+    '_FX18': ['cpu.st = v{x}'],
+    '_FX1E': ['i += v{x}'],
+    '_FX29': ['i = 5 * v{x}'],
+}
+
+# Target address of the jumps, inlined as the last instruction of a block
+JUMPS = {
+    '_1NNN': '{nnn}',
+    '_BNNN': 'v0 + {nnn}',
+    '_BXNN': 'v{x} + {nnn}',
+}
+
+# Conditions under which the skips jump over the next instruction. A skip over an inlinable
+# instruction or a jump stays inside the block as an if statement, any other skip ends it.
+SKIPS = {
+    '_3XNN': 'v{x} == {nn}',
+    '_4XNN': 'v{x} != {nn}',
+    '_5XY0': 'v{x} == v{y}',
+    '_9XY0': 'v{x} != v{y}',
+    '_EX9E': '(keypad.state >> (v{x} & 0xF)) & 1',
+    '_EXA1': 'not (keypad.state >> (v{x} & 0xF)) & 1',
+}
+
+# Instructions executed through their interpreter handler that also end a block,
+# because they change control flow, halt, draw or write memory.
+TERMINATORS = {
+    '_00EE', '_2NNN', '_DXYN', '_FX0A', '_FX33', '_FX55', '_FX55_I', '_FX55_IX',
+    # SUPER-CHIP and XO-CHIP, the XO-CHIP skips included since they may skip 4 bytes
+    '_00CN', '_00DN', '_00FB', '_00FC', '_00FD', '_00FE', '_00FF', '_DXYN_SCHIP', '_DXYN_XO', '_5XY2', '_F000',
+    '_3XNN_XO', '_4XNN_XO', '_5XY0_XO', '_9XY0_XO', '_EX9E_XO', '_EXA1_XO',
+}
+
+# Instructions that also set VF
+VF_WRITERS = {'_8XY1_VF', '_8XY2_VF', '_8XY3_VF', '_8XY4', '_8XY5', '_8XY6', '_8XY6_VY', '_8XY7', '_8XYE', '_8XYE_VY'}
+
+# Local variable holding each register
+REGISTER_NAMES = ['v%X' % reg for reg in range(16)]
+
+
+class Chip8JIT:
+    def __init__(self, cpu:Chip8CPU) -> None:
+        self.cpu = cpu
+        # Start address -> compiled block
+        self.blocks = {}
+        # Start address -> end address (exclusive) of the bytes the block was compiled from
+        self.block_ends = {}
+        # Start address -> most instructions the block runs, one per instruction compiled into it
+        self.block_lengths = {}
+        # Page -> start addresses of the blocks overlapping it, for the largest address space
+        self.pages = [set() for _ in range(XO_MEM_SIZE // PAGE_SIZE)]
+        # (start address, block bytes) -> compiled block. Survives invalidation,
+        # so code that is rewritten with the same bytes is not compiled again.
+        self.compiled = {}
+        # Dispatch table the blocks were compiled against. Blocks call its handlers directly,
+        # so none of them can be reused once the cpu binds another one.
+        self.lookup = cpu.operation_lookup
+        # Start addresses of the blocks made only of IDLE_LOOP_HANDLERS, which may be idle loops
+        self.idle_blocks = set()
+        cpu.invalidate_listeners.append(self.invalidate)
+
+    def invalidate(self, start:int, end:int) -> None:
+        for page in range(start // PAGE_SIZE, (end - 1) // PAGE_SIZE + 1):
+            for block_start in list(self.pages[page]):
+                if block_start < end and self.block_ends[block_start] > start:
+                    self.drop_block(block_start)
+
+    def drop_block(self, start:int) -> None:
+        end = self.block_ends.pop(start)
+        del self.blocks[start]
+        del self.block_lengths[start]
+        self.idle_blocks.discard(start)
+        for page in range(start // PAGE_SIZE, (end - 1) // PAGE_SIZE + 1):
+            self.pages[page].discard(start)
+
+    def step(self, limit:int = MAX_BLOCK_SIZE) -> int:
+        # Executes the block at pc and returns the number of instructions it ran. A block that
+        # may run more than limit instructions is not entered, the interpreter executes the next
+        # instruction instead, so a caller can stop on the exact cycle the interpreter would.
+        pc = self.cpu.pc
+        block = self.blocks.get(pc)
+        if block is None:
+            block = self.compile_block(pc)
+        if self.block_lengths[pc] > limit:
+            self.cpu.tick()
+            return 1
+        return block(self.cpu)
+
+    def run(self, cycles:int) -> int:
+        # Executes exactly the given number of instructions, the tail that no block fits in is interpreted.
+        executed = 0
+        step = self.step
+        while executed < cycles:
+            executed += step(cycles - executed)
+        return executed
+
+    def discover_block(self, start:int) -> list:
+        # Decodes instructions from start up to and including the first one that ends the block.
+        cpu = self.cpu
+        instructions = []
+        address = start
+        memory_size = len(cpu.memory)
+        while address < memory_size and len(instructions) < MAX_BLOCK_SIZE:
+            opcode = cpu.memory[address] << 8 | cpu.memory[address + 1]
+            handler, operands = cpu.decode(opcode)
+            instructions.append((address, opcode, handler, operands))
+            address += 2
+            name = handler.__name__
+            if name in SKIPS:
+                if address >= memory_size:
+                    break
+                opcode = cpu.memory[address] << 8 | cpu.memory[address + 1]
+                handler, operands = cpu.decode(opcode)
+                if handler.__name__ not in INLINE and handler.__name__ not in JUMPS:
+                    break
+                instructions.append((address, opcode, handler, operands))
+                address += 2
+            elif name in JUMPS or name in TERMINATORS:
+                break
+        return instructions
+
+    def rebind(self) -> None:
+        # Drops every block compiled against a previous dispatch table: a quirk profile, the
+        # debug handlers, the profiler or the debugger replaced the handlers.
+        for start in list(self.blocks):
+            self.drop_block(start)
+        self.compiled.clear()
+        self.lookup = self.cpu.operation_lookup
+
+    def compile_block(self, start:int):
+        if self.cpu.operation_lookup is not self.lookup:
+            self.rebind()
+        instructions = self.discover_block(start)
+        end = instructions[-1][0] + 2
+        key = (start, bytes(self.cpu.memory[start:end]))
+        block = self.compiled.get(key)
+        if block is None:
+            block = self.compiled[key] = self.generate(start, instructions)
+
+        self.blocks[start] = block
+        self.block_ends[start] = end
+        self.block_lengths[start] = len(instructions)
+        if all(handler.__name__ in IDLE_LOOP_HANDLERS for _, _, handler, _ in instructions):
+            self.idle_blocks.add(start)
+        for page in range(start // PAGE_SIZE, (end - 1) // PAGE_SIZE + 1):
+            self.pages[page].add(start)
+        return block
+
+    def generate(self, start:int, instructions:list):
+        # Builds the Python source of a block and compiles it. Registers used by inlined
+        # instructions are loaded into locals once and only written back when modified.
+        namespace = {'keypad': self.cpu.keypad}
+        used = set()
+        for address, opcode, handler, _ in instructions:
+            used.update(self.local_registers(handler.__name__, opcode))
+        registers = sorted(reg for reg in used if reg != 'i')
+
+        body = []
+        dirty = set()
+        # Instructions executed on every path through the block, the conditional ones are counted in n
+        executed = 0
+        conditional = False
+
+        def flush(indent=''):
+            for reg in sorted(dirty, key=str):
+                body.append(indent + ('cpu.i = i' if reg == 'i' else f'v[{reg}] = {REGISTER_NAMES[reg]}'))
+
+        def reload():
+            body.extend(f'{REGISTER_NAMES[reg]} = v[{reg}]' for reg in registers)
+            if 'i' in used:
+                body.append('i = cpu.i')
+
+        def leave(opcode, indent=''):
+            body.append(indent + f'cpu.opcode = {opcode}')
+            body.append(indent + (f'return {executed} + n' if conditional else f'return {executed}'))
+
+        def inline(name, opcode, fields, indent=''):
+            body.extend(indent + line.format(**fields) for line in INLINE[name])
+            modified = self.written_registers(name, opcode)
+            dirty.update(modified)
+
+        position = 0
+        ended = False
+        while position < len(instructions):
+            address, opcode, handler, operands = instructions[position]
+            position += 1
+            executed += 1
+            name = handler.__name__
+            fields = self.operand_fields(opcode, address)
+            if name in INLINE:
+                inline(name, opcode, fields)
+            elif name in JUMPS:
+                flush()
+                body.append(f'cpu.pc = {JUMPS[name].format(**fields)}')
+                leave(opcode)
+                ended = True
+            elif name in SKIPS and position < len(instructions):
+                # The next instruction runs only when the skip is not taken
+                condition = SKIPS[name].format(**fields)
+                address, opcode, handler, operands = instructions[position]
+                position += 1
+                skipped = handler.__name__
+                fields = self.operand_fields(opcode, address)
+                body.append(f'if not ({condition}):')
+                if skipped in INLINE:
+                    inline(skipped, opcode, fields, '    ')
+                    body.append('    n += 1')
+                    conditional = True
+                else:
+                    flush('    ')
+                    body.append(f'    cpu.pc = {JUMPS[skipped].format(**fields)}')
+                    executed += 1
+                    leave(opcode, '    ')
+                    executed -= 1
+            elif name in SKIPS:
+                flush()
+                body.append(f'cpu.pc = {address + 4} if {SKIPS[name].format(**fields)} else {address + 2}')
+                leave(opcode)
+                ended = True
+            else:
+                # Fall back to the interpreter handler with the registers written back to the cpu
+                handler_name = f'h_{address:03X}'
+                namespace[handler_name] = handler
+                flush()
+                dirty.clear()
+                body.append(f'cpu.pc = {address + 2}')
+                body.append(f'cpu.opcode = {opcode}')
+                body.append(f'{handler_name}(*{operands!r})')
+                if name in TERMINATORS:
+                    leave(opcode)
+                    ended = True
+                else:
+                    reload()
+
+        if not ended:
+            flush()
+            body.append(f'cpu.pc = {instructions[-1][0] + 2}')
+            leave(instructions[-1][1])
+
+        source = [f'def block_{start:03X}(cpu):', '    v = cpu.v']
+        source += [f'    {REGISTER_NAMES[reg]} = v[{reg}]' for reg in registers]
+        if 'i' in used:
+            source.append('    i = cpu.i')
+        if conditional:
+            source.append('    n = 0')
+        source += [f'    {line}' for line in body]
+        code = compile('\n'.join(source), f'<chip8 block 0x{start:03X}>', 'exec')
+        exec(code, namespace)
+        return namespace[f'block_{start:03X}']
+
+    @staticmethod
+    def operand_fields(opcode:int, address:int) -> dict:
+        return {
+            'x': '%X' % ((opcode & 0x0F00) >> 8),
+            'y': '%X' % ((opcode & 0x00F0) >> 4),
+            'nn': opcode & 0x00FF,
+            'nnn': opcode & 0x0FFF,
+            'next': address + 2,
+            'skip': address + 4,
+        }
+
+    @staticmethod
+    def local_registers(name:str, opcode:int) -> set:
+        # Registers (and 'i') an inlined instruction reads or writes.
+        x = (opcode & 0x0F00) >> 8
+        y = (opcode & 0x00F0) >> 4
+        if name in ('_NOP', '_1NNN') or name in TERMINATORS:
+            return set()
+        if name == '_BNNN':
+            return {0}
+        if name == '_BXNN':
+            return {x}
+        if name == '_ANNN':
+            return {'i'}
+        if name in ('_FX1E', '_FX29'):
+            return {x, 'i'}
+        if name in VF_WRITERS:
+            return {x, y, 0xF}
+        if name.startswith('_8') or name in ('_5XY0', '_9XY0'):
+            return {x, y}
+        if name in INLINE or name in SKIPS:
+            return {x}
+        return set()
+
+    @staticmethod
+    def written_registers(name:str, opcode:int) -> list:
+        # Registers (and 'i') an inlined instruction modifies.
+        x = (opcode & 0x0F00) >> 8
+        if name in ('_NOP', '_FX15', '_FX18'):
+            return []
+        if name in ('_ANNN', '_FX1E', '_FX29'):
+            return ['i']
+        if name in VF_WRITERS:
+            return [x, 0xF]
+        return [x]
@@ -0,0 +1,39 @@
+import dearpygui.dearpygui as dpg
+
+KEY_MAP = {
+    0x0: dpg.mvKey_X,
+    0x1: dpg.mvKey_1,
+    0x2: dpg.mvKey_2,
+    0x3: dpg.mvKey_3,
+    0x4: dpg.mvKey_Q,
+    0x5: dpg.mvKey_W,
+    0x6: dpg.mvKey_E,
+    0x7: dpg.mvKey_A,
+    0x8: dpg.mvKey_S,
+    0x9: dpg.mvKey_D,
+    0xA: dpg.mvKey_Z,
+    0xB: dpg.mvKey_C,
+    0xC: dpg.mvKey_4,
+    0xD: dpg.mvKey_R,
+    0xE: dpg.mvKey_F,
+    0xF: dpg.mvKey_V,
+}
+
+KEY_MAP_R = {
+    dpg.mvKey_X: 0x0, 
+    dpg.mvKey_1: 0x1, 
+    dpg.mvKey_2: 0x2, 
+    dpg.mvKey_3: 0x3, 
+    dpg.mvKey_Q: 0x4, 
+    dpg.mvKey_W: 0x5, 
+    dpg.mvKey_E: 0x6, 
+    dpg.mvKey_A: 0x7, 
+    dpg.mvKey_S: 0x8, 
+    dpg.mvKey_D: 0x9, 
+    dpg.mvKey_Z: 0xA, 
+    dpg.mvKey_C: 0xB, 
+    dpg.mvKey_4: 0xC, 
+    dpg.mvKey_R: 0xD, 
+    dpg.mvKey_F: 0xE, 
+    dpg.mvKey_V: 0xF, 
+}
\ No newline at end of file
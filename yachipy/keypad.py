@@ -0,0 +1,110 @@
+import time
+from collections import deque
+
+# Key events kept for a cpu waiting in FX0A. Older ones are dropped when nothing consumes them.
+MAX_KEY_EVENTS = 64
+
+
+class Chip8Keypad:
+    def __init__(self) -> None:
+        # Pressed state of the 16 hex keys (0x0 - 0xF) as a bitmask, bit k is set while key k is down
+        self.state = 0
+        # Timestamped (time, key, pressed) events pushed by a frontend from any thread,
+        # applied to the state by the emulation side in process_events()
+        self.input_queue = deque()
+        # Applied (key, pressed) events, consumed by the cpu while it is halted in FX0A
+        self.events = deque(maxlen=MAX_KEY_EVENTS)
+        # Applied (frame, key, pressed) events, recorded while not None
+        self.recording = None
+        # Recorded (frame, key, pressed) events waiting to be replayed
+        self.playback = deque()
+        # Apply the queued events as one bitmask per frame, so a frame is fully described by
+        # the keypad state it starts with (movie recording). See process_events().
+        self.per_frame = False
+
+    def reset(self) -> None:
+        self.state = 0
+        self.input_queue.clear()
+        self.events.clear()
+        self.playback.clear()
+
+    def push_event(self, key, pressed:bool, timestamp:float = None) -> None:
+        # Queues a key event, it takes effect at the next process_events().
+        if timestamp is None:
+            timestamp = time.perf_counter()
+        self.input_queue.append((timestamp, key, pressed))
+
+    def process_events(self, frame:int = 0) -> None:
+        # Applies the replayed events due by this frame, then the queued ones. Called once per frame.
+        playback = self.playback
+        while playback and playback[0][0] <= frame:
+            _, key, pressed = playback.popleft()
+            self.apply(key, pressed, frame)
+        input_queue = self.input_queue
+        if self.per_frame:
+            # Each key changes at most once per frame, a key changing again waits for the next frame.
+            # The changes are applied in key order, like set_state() does on replay.
+            state = self.state
+            changed = 0
+            deferred = []
+            while input_queue:
+                event = input_queue.popleft()
+                _, key, pressed = event
+                bit = 1 << key
+                if changed & bit:
+                    deferred.append(event)
+                elif bool(state & bit) != pressed:
+                    state ^= bit
+                    changed |= bit
+            input_queue.extendleft(reversed(deferred))
+            self.set_state(state, frame)
+            return
+        while input_queue:
+            _, key, pressed = input_queue.popleft()
+            self.apply(key, pressed, frame)
+
+    def apply(self, key, pressed:bool, frame:int = 0) -> None:
+        bit = 1 << key
+        if bool(self.state & bit) == pressed:
+            return
+        self.state ^= bit
+        self.events.append((key, pressed))
+        if self.recording is not None:
+            self.recording.append((frame, key, pressed))
+
+    def set_state(self, state:int, frame:int = 0) -> None:
+        # Moves to the given bitmask, applying the keys that change in ascending order.
+        changed = self.state ^ state
+        key = 0
+        while changed:
+            if changed & 1:
+                self.apply(key, (state >> key) & 1 == 1, frame)
+            changed >>= 1
+            key += 1
+
+    def press(self, key) -> None:
+        self.apply(key, True)
+
+    def release(self, key) -> None:
+        self.apply(key, False)
+
+    def start_recording(self) -> None:
+        self.recording = []
+
+    def stop_recording(self) -> list:
+        recording = self.recording
+        self.recording = None
+        return recording
+
+    def replay(self, recording:list) -> None:
+        # Feeds recorded (frame, key, pressed) events back in at the frames they were applied on.
+        self.playback = deque(sorted(recording, key=lambda event: event[0]))
+
+    def is_key_down(self, key) -> bool:
+        return (self.state >> key) & 1 == 1
+
+    def get_key_down(self) -> int|None:
+        # Lowest key currently held down, if any.
+        if not self.state:
+            return None
+        return (self.state & -self.state).bit_length() - 1
@@ -0,0 +1,40 @@
+from .config import MEM_SIZE
+
+# Granularity of the dirty bitmap, in bytes
+PAGE_SIZE = 256
+
+
+class Chip8Memory(bytearray):
+    # The address space, 4K or the 64K of XO-CHIP. Reads are plain bytearray indexing, writes by the cpu go through
+    # write(), the write barrier: it marks the written pages in a dirty bitmap and notifies
+    # the observers. With no observer attached a write costs a slice assignment and an OR.
+    def __init__(self, size:int = MEM_SIZE) -> None:
+        super().__init__(size)
+        # Bit p is set when page p (PAGE_SIZE bytes) was written since the last take_dirty_pages()
+        self.dirty_pages = 0
+        # Called with (start, end) after memory[start:end] was written
+        self.observers = []
+
+    def write(self, address:int, data) -> None:
+        # Writes past the end of memory are dropped
+        end = min(address + len(data), len(self))
+        if address >= end:
+            return
+        self[address:end] = data[:end - address]
+        self.dirty_pages |= (2 << ((end - 1) // PAGE_SIZE)) - (1 << (address // PAGE_SIZE))
+        for observer in self.observers:
+            observer(address, end)
+
+    def resize(self, size:int) -> None:
+        # Grows or shrinks memory in place, so references to it stay valid. Contents are cleared.
+        if size < len(self):
+            del self[size:]
+        else:
+            self.extend(bytes(size - len(self)))
+        self.write(0, bytes(size))
+
+    def take_dirty_pages(self) -> int:
+        # Returns the dirty bitmap and starts a new one.
+        dirty_pages = self.dirty_pages
+        self.dirty_pages = 0
+        return dirty_pages
@@ -0,0 +1,180 @@
+import argparse
+import hashlib
+import struct
+import time
+from .cpu import Chip8CPU, QUIRK_PROFILES
+from .scheduler import Chip8Scheduler
+from .savestate import save_state
+from .farm import load_input_script
+from .config import TIMER_FREQUENCY
+
+# Movie file layout, little endian: header, then (frames, keypad bitmask) runs covering every
+# recorded frame in order. The run starts from power on with the keypad released.
+MAGIC = b'C8MV'
+VERSION = 3
+HEADER = struct.Struct('<4sBI8s20sqII20s20s')
+RUN = struct.Struct('<IH')
+
+
+def rom_hash(rom:str) -> bytes:
+    with open(rom, 'rb') as file:
+        return hashlib.sha1(file.read()).digest()
+
+
+def state_hash(cpu:Chip8CPU) -> bytes:
+    # Hash of the whole machine state, framebuffer included
+    return hashlib.sha1(save_state(cpu)).digest()
+
+
+def screen_hash(cpu:Chip8CPU) -> bytes:
+    return hashlib.sha1(cpu.screen.to_bytes()).digest()
+
+
+class Chip8Movie:
+    def __init__(self, rom_hash:bytes, seed:int, clockspeed:int, runs:list = None, state_hash:bytes = bytes(20), screen_hash:bytes = bytes(20), quirks:str = 'modern') -> None:
+        self.rom_hash = rom_hash
+        # Quirk profile of the cpu
+        self.quirks = quirks
+        # Seed of the CXNN random number generator
+        self.seed = seed
+        self.clockspeed = clockspeed
+        # [frames, keypad bitmask] pairs, the bitmask holds at the start of each of those frames
+        self.runs = runs if runs is not None else []
+        # Expected hashes after the last frame
+        self.state_hash = state_hash
+        self.screen_hash = screen_hash
+
+    @property
+    def frames(self) -> int:
+        return sum(frames for frames, _ in self.runs)
+
+    def add_frame(self, state:int) -> None:
+        if self.runs and self.runs[-1][1] == state:
+            self.runs[-1][0] += 1
+        else:
+            self.runs.append([1, state])
+
+    def add_events(self, events:list, start_frame:int, end_frame:int) -> None:
+        # Appends the frames [start_frame, end_frame) given the (frame, key, pressed) events
+        # recorded by Chip8Keypad during them, starting from a released keypad.
+        events = sorted(events, key=lambda event: event[0])
+        position = 0
+        state = 0
+        for frame in range(start_frame, end_frame):
+            while position < len(events) and events[position][0] <= frame:
+                _, key, pressed = events[position]
+                state = state | (1 << key) if pressed else state & ~(1 << key)
+                position += 1
+            self.add_frame(state)
+
+    def save(self, path:str) -> None:
+        with open(path, 'wb') as movie:
+            movie.write(HEADER.pack(MAGIC, VERSION, self.clockspeed, self.quirks.encode(), self.rom_hash, self.seed, self.frames, len(self.runs), self.state_hash, self.screen_hash))
+            movie.write(b''.join(RUN.pack(frames, state) for frames, state in self.runs))
+
+    @classmethod
+    def load(cls, path:str) -> 'Chip8Movie':
+        with open(path, 'rb') as movie:
+            data = movie.read()
+        magic, version, clockspeed, quirks, rom, seed, frames, run_count, state, screen = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path}: not a movie, or recorded by an incompatible version')
+        quirks = quirks.rstrip(b'\0').decode()
+        if quirks not in QUIRK_PROFILES:
+            raise ValueError(f'{path}: recorded with an unknown quirk profile {quirks!r}')
+        runs = [list(run) for run in RUN.iter_unpack(data[HEADER.size : HEADER.size + run_count * RUN.size])]
+        movie = cls(rom, seed, clockspeed, runs, state, screen, quirks)
+        if movie.frames != frames:
+            raise ValueError(f'{path}: truncated movie')
+        return movie
+
+
+def new_machine(rom:str, seed:int, clockspeed:int, quirks:str = 'modern') -> Chip8Scheduler:
+    # A machine at power on, as the GUI has it right after loading a rom
+    cpu = Chip8CPU(seed=seed, quirks=quirks)
+    if not cpu.load_into_memory(rom):
+        raise FileNotFoundError(rom)
+    return Chip8Scheduler(cpu, clockspeed)
+
+
+def play_movie(movie:Chip8Movie, rom:str) -> dict:
+    # Replays the movie frame by frame as fast as the host allows and compares the final hashes.
+    if rom_hash(rom) != movie.rom_hash:
+        raise ValueError(f'{rom}: the movie was recorded with a different rom')
+    scheduler = new_machine(rom, movie.seed, movie.clockspeed, movie.quirks)
+    cpu = scheduler.cpu
+    set_state = cpu.keypad.set_state
+    run_frame = scheduler.run_frame
+    start = time.perf_counter()
+    for frames, state in movie.runs:
+        set_state(state, scheduler.frames)
+        for _ in range(frames):
+            run_frame()
+    elapsed = time.perf_counter() - start
+    state = state_hash(cpu)
+    screen = screen_hash(cpu)
+    return {
+        'frames': scheduler.frames,
+        'cycles': scheduler.cycles,
+        'wall_time': elapsed,
+        'state_hash': state.hex(),
+        'screen_hash': screen.hex(),
+        'state_ok': state == movie.state_hash,
+        'screen_ok': screen == movie.screen_hash,
+    }
+
+
+def record_movie(rom:str, events:list, frames:int, seed:int = 0, clockspeed:int = 500, quirks:str = 'modern') -> Chip8Movie:
+    # Records a movie of the rom driven by (frame, key, pressed) events, without a window.
+    scheduler = new_machine(rom, seed, clockspeed, quirks)
+    keypad = scheduler.cpu.keypad
+    keypad.per_frame = True
+    keypad.start_recording()
+    events = sorted(events, key=lambda event: event[0])
+    position = 0
+    for frame in range(frames):
+        while position < len(events) and events[position][0] <= frame:
+            _, key, pressed = events[position]
+            keypad.push_event(key, pressed)
+            position += 1
+        scheduler.run_frame()
+    movie = Chip8Movie(rom_hash(rom), seed, clockspeed, quirks=quirks)
+    movie.add_events(keypad.stop_recording(), 0, frames)
+    movie.state_hash = state_hash(scheduler.cpu)
+    movie.screen_hash = screen_hash(scheduler.cpu)
+    return movie
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='yachipy.movie', description='Replay a movie headless and verify its final state, or record one from an input script')
+    parser.add_argument('movie', help='movie file to play, or to write with --record')
+    parser.add_argument('rom', help='rom the movie was recorded with')
+    parser.add_argument('--record', metavar='SCRIPT', help='record the movie from a farm input script instead of playing it')
+    parser.add_argument('--frames', type=int, default=3600, help='number of frames to record')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the CXNN random number generator to record with')
+    parser.add_argument('--clockspeed', type=int, default=500, help='emulated cpu clockspeed (Hz) to record with')
+    parser.add_argument('--quirks', choices=QUIRK_PROFILES, default='modern', help='quirk profile to record with')
+    args = parser.parse_args()
+
+    if args.record:
+        # Script cycles are converted to the frame they fall in
+        cycles_per_frame = args.clockspeed / TIMER_FREQUENCY
+        events = [(int(cycle // cycles_per_frame), key, pressed) for cycle, key, pressed in load_input_script(args.record)]
+        movie = record_movie(args.rom, events, args.frames, args.seed, args.clockspeed, args.quirks)
+        movie.save(args.movie)
+        print(f'{movie.frames} frames in {len(movie.runs)} runs, final state {movie.state_hash.hex()[:12]}')
+        return
+
+    try:
+        result = play_movie(Chip8Movie.load(args.movie), args.rom)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"{result['frames']} frames, {result['cycles']} cycles in {result['wall_time']:.3f}s "
+          f"({result['frames']/max(result['wall_time'], 1e-9):,.0f} frames/sec)")
+    print(f"state  {result['state_hash'][:12]} {'ok' if result['state_ok'] else 'MISMATCH'}")
+    print(f"screen {result['screen_hash'][:12]} {'ok' if result['screen_ok'] else 'MISMATCH'}")
+    if not (result['state_ok'] and result['screen_ok']):
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
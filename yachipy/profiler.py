@@ -0,0 +1,90 @@
+import json
+import time
+from .cpu import Chip8CPU
+
+
+class Chip8Profiler:
+    # Per handler execution counts and time, and a heat map of executed addresses.
+    # attach() swaps the cpu dispatch table for one of instrumented wrappers and detach()
+    # swaps the original back, so a detached profiler costs nothing per instruction.
+    # Only the interpreter is instrumented, blocks compiled by the JIT run unprofiled.
+    def __init__(self, cpu:Chip8CPU) -> None:
+        self.cpu = cpu
+        self.attached = False
+        self.original_lookup = None
+        # Table bound by the cpu at attach(), a rebind since then makes original_lookup stale
+        self.bound_lookup = None
+        # Handler name -> [count, time in ns]
+        self.stats = {handler.__name__: [0, 0] for handler, _ in cpu.operation_lookup.values()}
+        # Executions of the instruction at each address
+        self.heat = [0] * len(cpu.memory)
+
+    def reset(self) -> None:
+        # Zeroed in place, the attached wrappers hold on to these lists
+        for stats in self.stats.values():
+            stats[0] = stats[1] = 0
+        self.heat[:] = [0] * len(self.heat)
+
+    def attach(self) -> None:
+        if self.attached:
+            return
+        cpu = self.cpu
+        heat = self.heat
+        perf_counter_ns = time.perf_counter_ns
+        self.original_lookup = cpu.operation_lookup
+        self.bound_lookup = cpu.bound_lookup
+        if len(heat) != len(cpu.memory):
+            # The quirk profile changed the memory size since the last attach
+            heat[:] = [0] * len(cpu.memory)
+        instrumented = {}
+        for operation, (handler, operand_format) in self.original_lookup.items():
+            # Quirk profiles may bind handlers the cpu did not have at construction
+            stats = self.stats.setdefault(handler.__name__, [0, 0])
+
+            def profiled(*operands, handler=handler, stats=stats):
+                # The cpu already moved pc past the instruction
+                heat[cpu.pc - 2] += 1
+                start = perf_counter_ns()
+                handler(*operands)
+                stats[1] += perf_counter_ns() - start
+                stats[0] += 1
+
+            profiled.__name__ = handler.__name__
+            instrumented[operation] = (profiled, operand_format)
+        cpu.operation_lookup = instrumented
+        # Predecoded instructions still point at the original handlers
+        cpu.invalidate(0, len(cpu.memory))
+        self.attached = True
+
+    def detach(self) -> None:
+        if not self.attached:
+            return
+        cpu = self.cpu
+        # set_debug() or a quirk profile rebound the handlers while attached: the wrapped table is gone
+        cpu.operation_lookup = self.original_lookup if cpu.bound_lookup is self.bound_lookup else cpu.bound_lookup
+        cpu.invalidate(0, len(cpu.memory))
+        self.original_lookup = self.bound_lookup = None
+        self.attached = False
+
+    @property
+    def instructions(self) -> int:
+        return sum(count for count, _ in self.stats.values())
+
+    @property
+    def draws(self) -> int:
+        # DXYN and the variants of the quirk profiles
+        return sum(count for name, (count, _) in self.stats.items() if name.startswith('_DXYN'))
+
+    def to_dict(self) -> dict:
+        return {
+            'instructions': self.instructions,
+            'draws': self.draws,
+            'clears': self.stats['_00E0'][0],
+            'handlers': {name: {'count': count, 'time_ns': time_ns} for name, (count, time_ns) in self.stats.items() if count},
+            # Only the executed addresses, as hex strings
+            'heat': {f'{address:03X}': count for address, count in enumerate(self.heat) if count},
+        }
+
+    def export(self, path:str) -> None:
+        with open(path, 'w') as output:
+            json.dump(self.to_dict(), output, indent=2)
@@ -0,0 +1,102 @@
+from collections import deque
+from .cpu import Chip8CPU
+from .savestate import Chip8DeltaSnapshots, KEYFRAME_INTERVAL
+
+# Default cap on the bytes held by the rewind buffer. A minute of gameplay takes about 1.5MB.
+REWIND_MEMORY_CAP = 8 * 1024 * 1024
+
+
+class Chip8RewindEntry:
+    def __init__(self, frame:int, state:bytearray, keyframe:bytearray) -> None:
+        self.frame = frame
+        self.state = state
+        # Full state the delta is relative to, the state itself for a keyframe
+        self.keyframe = keyframe
+        # Instructions executed from this state until the next entry was captured
+        self.executed = 0
+
+
+class Chip8Rewind:
+    # Ring buffer of the states at the start of each frame, oldest evicted first once the
+    # entries take more than memory_cap bytes. Positions in between are not stored: stepping
+    # back restores the nearest earlier state and re-executes the instructions up to the target.
+    def __init__(self, cpu:Chip8CPU, memory_cap:int = REWIND_MEMORY_CAP, keyframe_interval:int = KEYFRAME_INTERVAL) -> None:
+        self.cpu = cpu
+        self.memory_cap = memory_cap
+        self.snapshots = Chip8DeltaSnapshots(cpu, keyframe_interval)
+        self.entries = deque()
+        self.size = 0
+        # Position of the cpu: instructions executed since the last entry, and whether its frame was completed
+        self.executed = 0
+        self.frame_done = False
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.size = 0
+        self.executed = 0
+        self.frame_done = False
+        self.snapshots = Chip8DeltaSnapshots(self.cpu, self.snapshots.keyframe_interval)
+
+    def capture(self, frame:int) -> None:
+        # Called at the start of every frame, once the key events of the frame were applied.
+        entries = self.entries
+        if entries and self.executed == 0 and not self.frame_done:
+            # Still at the state of the last entry, e.g. right after stepping back to it
+            self.size -= len(entries.pop().state)
+        elif entries:
+            entries[-1].executed = self.executed
+        state, keyframe = self.snapshots.capture()
+        entries.append(Chip8RewindEntry(frame, state, keyframe))
+        self.size += len(state)
+        self.executed = 0
+        self.frame_done = False
+
+        while self.size > self.memory_cap and len(entries) > 1:
+            # A keyframe takes the deltas relative to it along
+            evicted = entries.popleft()
+            self.size -= len(evicted.state)
+            while entries and entries[0].keyframe is evicted.state and len(entries) > 1:
+                self.size -= len(entries.popleft().state)
+
+    def tick(self) -> None:
+        # Executes one instruction at the current position, for instruction stepping.
+        self.cpu.tick()
+        self.executed += 1
+
+    def end_frame(self, executed:int) -> None:
+        # Called by the scheduler once the instructions and the timer tick of a frame ran.
+        self.executed += executed
+        self.frame_done = True
+
+    def restore(self, entry:Chip8RewindEntry, executed:int = 0) -> None:
+        self.snapshots.restore(entry.state, entry.keyframe)
+        # Replayed within the frame like the scheduler ran it, idle loops included
+        self.cpu.run(executed)
+        self.executed = executed
+        self.frame_done = False
+
+    def step_back_frame(self) -> int|None:
+        # Goes back to the start of the current frame, or of the previous one if already there.
+        # Returns the frame number restored, None if there is nothing to go back to.
+        entries = self.entries
+        if not entries:
+            return None
+        if self.executed == 0 and not self.frame_done:
+            if len(entries) == 1:
+                return None
+            self.size -= len(entries.pop().state)
+        self.restore(entries[-1])
+        return entries[-1].frame
+
+    def step_back_instruction(self) -> int|None:
+        # Undoes the last executed instruction by replaying the frame it belongs to up to the
+        # instruction before it. Returns the frame number, None if there is nothing to undo.
+        entries = self.entries
+        executed = self.executed
+        while executed == 0:
+            if len(entries) <= 1:
+                return None
+            self.size -= len(entries.pop().state)
+            executed = entries[-1].executed
+        self.restore(entries[-1], executed - 1)
+        return entries[-1].frame
@@ -0,0 +1,191 @@
+import struct
+from .cpu import Chip8CPU
+from .memory import PAGE_SIZE
+
+# Save state layout, all little endian:
+#   header     magic, version, flags, memory size, screen rows, bytes per screen row, bitplanes, quirk profile
+#   registers  V0-VF, I, PC, SP, DT, ST, keypad bitmask, halted, FX0A key register and awaited key (-1 if none),
+#              selected bitplanes, RPL user flags
+#   rng        Mersenne Twister state of the CXNN generator, left out of deltas when it equals the keyframe's
+#   key events count, then one byte per pending FX0A key event: key | pressed << 4
+#   screen     the framebuffer rows of every plane, big endian like Chip8Framebuffer.to_bytes()
+#   pages      bitmap of the memory pages stored, then the pages in address order
+MAGIC = b'C8ST'
+VERSION = 3
+HEADER = struct.Struct('<4sBBIHHB8s')
+REGISTERS = struct.Struct('<16sIHHBBHBbbB16s')
+RNG = struct.Struct('<625IBd')
+# Header flags
+HAS_RNG = 0x1
+# Saving every page gives a full state, a keyframe
+ALL_PAGES = -1
+# Full states captured by Chip8DeltaSnapshots, one every this many captures
+KEYFRAME_INTERVAL = 60
+
+
+def page_count(memory_size:int) -> int:
+    return (memory_size + PAGE_SIZE - 1) // PAGE_SIZE
+
+
+def save_state(cpu:Chip8CPU, pages:int = ALL_PAGES, rng:bool = True) -> bytearray:
+    # Serializes the machine into one preallocated buffer. pages is a bitmap of the memory pages
+    # to store, the default stores all of them. States with fewer pages or without the rng are
+    # deltas and need their keyframe to be loaded.
+    memory = memoryview(cpu.memory)
+    count = page_count(len(memory))
+    pages &= (1 << count) - 1
+    stored = [page for page in range(count) if (pages >> page) & 1]
+    bitmap_size = (count + 7) // 8
+    screen = cpu.screen.to_bytes()
+    row_size = cpu.screen.width // 8
+    events = cpu.keypad.events
+    size = (HEADER.size + REGISTERS.size + (RNG.size if rng else 0) + 1 + len(events) + len(screen)
+            + bitmap_size + len(stored) * PAGE_SIZE)
+
+    state = bytearray(size)
+    view = memoryview(state)
+    HEADER.pack_into(state, 0, MAGIC, VERSION, HAS_RNG if rng else 0, len(memory), cpu.screen.height, row_size, len(cpu.screen.planes), cpu.quirks.encode())
+    offset = HEADER.size
+    REGISTERS.pack_into(
+        state, offset, bytes(cpu.v), cpu.i, cpu.pc, cpu.sp, cpu.dt, cpu.st, cpu.keypad.state, cpu.halted,
+        -1 if cpu.key_register is None else cpu.key_register,
+        -1 if cpu.awaited_key is None else cpu.awaited_key,
+        cpu.screen.selected, bytes(cpu.rpl),
+    )
+    offset += REGISTERS.size
+    if rng:
+        _, twister, gauss_next = cpu.rng.getstate()
+        RNG.pack_into(state, offset, *twister, gauss_next is not None, gauss_next or 0.0)
+        offset += RNG.size
+    state[offset] = len(events)
+    view[offset + 1 : offset + 1 + len(events)] = bytes(key | pressed << 4 for key, pressed in events)
+    offset += 1 + len(events)
+    view[offset : offset + len(screen)] = screen
+    offset += len(screen)
+    view[offset : offset + bitmap_size] = pages.to_bytes(bitmap_size, 'little')
+    offset += bitmap_size
+    for page in stored:
+        start = page * PAGE_SIZE
+        end = min(start + PAGE_SIZE, len(memory))
+        view[offset : offset + end - start] = memory[start:end]
+        offset += PAGE_SIZE
+    return state
+
+
+def read_state(state) -> dict:
+    # Splits a state into its sections, as memoryviews into the state buffer.
+    view = memoryview(state)
+    magic, version, flags, memory_size, screen_rows, row_size, planes, quirks = HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('not a save state, or saved by an incompatible version')
+    sections = {'memory_size': memory_size, 'screen_rows': screen_rows, 'row_size': row_size, 'planes': planes,
+                'quirks': quirks.rstrip(b'\0').decode()}
+    offset = HEADER.size
+    sections['registers'] = REGISTERS.unpack_from(view, offset)
+    offset += REGISTERS.size
+    sections['rng'] = None
+    if flags & HAS_RNG:
+        sections['rng'] = RNG.unpack_from(view, offset)
+        offset += RNG.size
+    sections['events'] = view[offset + 1 : offset + 1 + view[offset]]
+    offset += 1 + view[offset]
+    sections['screen'] = view[offset : offset + planes * screen_rows * row_size]
+    offset += planes * screen_rows * row_size
+
+    count = page_count(memory_size)
+    bitmap_size = (count + 7) // 8
+    pages = int.from_bytes(view[offset : offset + bitmap_size], 'little')
+    offset += bitmap_size
+    sections['pages'] = {}
+    for page in range(count):
+        if (pages >> page) & 1:
+            sections['pages'][page] = view[offset : offset + PAGE_SIZE]
+            offset += PAGE_SIZE
+    sections['complete'] = pages == (1 << count) - 1 and sections['rng'] is not None
+    return sections
+
+
+def load_state(cpu:Chip8CPU, state, keyframe=None) -> None:
+    # Restores a state saved by save_state. What a delta state leaves out is taken from its
+    # keyframe. Only the memory pages that differ are written, so the predecoded instructions
+    # and compiled blocks of unchanged code stay valid.
+    sections = read_state(state)
+    # The screen resolution is part of the state, the memory size and planes come with the quirk profile
+    if sections['memory_size'] != len(cpu.memory) or sections['planes'] != len(cpu.screen.planes):
+        raise ValueError('save state was made for a different machine configuration')
+    # Profiles with the same machine still run instructions differently
+    if sections['quirks'] != cpu.quirks:
+        raise ValueError(f"save state was made with the {sections['quirks']} quirk profile, the cpu runs {cpu.quirks}")
+    pages = sections['pages']
+    rng = sections['rng']
+    if not sections['complete']:
+        if keyframe is None:
+            raise ValueError('delta state loaded without its keyframe')
+        base = read_state(keyframe)
+        pages = {**base['pages'], **pages}
+        rng = rng or base['rng']
+
+    memory = memoryview(cpu.memory)
+    memory_size = sections['memory_size']
+    for page, data in pages.items():
+        start = page * PAGE_SIZE
+        end = min(start + PAGE_SIZE, memory_size)
+        if memory[start:end] != data[:end - start]:
+            cpu.memory.write(start, data[:end - start])
+
+    v, i, pc, sp, dt, st, keys, halted, key_register, awaited_key, selected, rpl = sections['registers']
+    cpu.v = bytearray(v)
+    cpu.i = i
+    cpu.pc = pc
+    cpu.sp = sp
+    cpu.dt = dt
+    cpu.st = st
+    cpu.halted = bool(halted)
+    cpu.key_register = None if key_register < 0 else key_register
+    cpu.awaited_key = None if awaited_key < 0 else awaited_key
+    cpu.rpl = list(rpl)
+    cpu.rng.setstate((3, rng[:625], rng[626] if rng[625] else None))
+    cpu.update_indices['registers'].update(range(16))
+
+    cpu.keypad.state = keys
+    cpu.keypad.events.clear()
+    cpu.keypad.events.extend((event & 0xF, bool(event >> 4)) for event in sections['events'])
+
+    cpu.screen.load_bytes(sections['screen'], sections['row_size'] * 8, sections['screen_rows'], sections['planes'])
+    cpu.screen.selected = selected
+
+
+class Chip8DeltaSnapshots:
+    # Captures a keyframe (full state) every keyframe_interval captures and delta states in
+    # between. A delta stores the registers and screen in full but only the memory pages
+    # written since its keyframe, taken from the dirty bitmap of the memory write barrier,
+    # and the rng only once CXNN moved it away from the keyframe's.
+    def __init__(self, cpu:Chip8CPU, keyframe_interval:int = KEYFRAME_INTERVAL) -> None:
+        self.cpu = cpu
+        self.keyframe_interval = keyframe_interval
+        self.keyframe = None
+        self.keyframe_rng = None
+        self.captures = 0
+        # Pages written since the keyframe
+        self.dirty_pages = 0
+
+    def capture(self) -> tuple:
+        # Returns (state, keyframe the state is relative to). For a keyframe both are the same object.
+        cpu = self.cpu
+        self.dirty_pages |= cpu.memory.take_dirty_pages()
+        if self.keyframe is None or self.captures % self.keyframe_interval == 0:
+            self.keyframe = save_state(cpu)
+            self.keyframe_rng = cpu.rng.getstate()
+            self.dirty_pages = 0
+            state = self.keyframe
+        else:
+            state = save_state(cpu, self.dirty_pages, cpu.rng.getstate() != self.keyframe_rng)
+        self.captures += 1
+        return state, self.keyframe
+
+    def restore(self, state, keyframe=None) -> None:
+        load_state(self.cpu, state, keyframe)
+        # Memory now differs from the current keyframe in unknown pages, start over with a new one
+        self.cpu.memory.take_dirty_pages()
+        self.keyframe = None
+        self.captures = 0
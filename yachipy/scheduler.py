@@ -0,0 +1,114 @@
+import time
+from .config import TIMER_FREQUENCY
+from .cpu import Chip8CPU, Chip8Break
+
+# Most 60Hz frames emulated by one update. Emulated time owed beyond that is dropped,
+# so a stalled host skips ahead instead of falling further behind (spiral of death).
+MAX_CATCH_UP_FRAMES = 6
+# Share of a 60Hz frame that turbo mode spends emulating per update, the rest is left to rendering
+TURBO_BUDGET = 0.75
+
+
+class Chip8Scheduler:
+    def __init__(self, cpu:Chip8CPU, cpu_clockspeed:int = 500) -> None:
+        self.cpu = cpu
+        self.cpu_clockspeed = cpu_clockspeed
+        # Unthrottled: run as many frames as fit in the turbo budget
+        self.turbo = False
+        self.frame_time = 1 / TIMER_FREQUENCY
+        # Emulated time owed to the cpu, in seconds
+        self.accumulator = 0.0
+        # Fractional cycles carried over to the next frame
+        self.cycle_debt = 0.0
+        self.last_time = time.perf_counter()
+        # Chip8Rewind capturing the state at the start of every frame, if any
+        self.rewind = None
+        # Cycles of the current frame and those left to run after a breakpoint interrupted it
+        self.frame_cycles = 0
+        self.pending_cycles = 0
+
+        # STATISTICS
+        self.frames = 0
+        self.cycles = 0
+        self.dropped_frames = 0
+
+    def start(self) -> None:
+        # Call when (re)starting emulation so the time spent paused is not caught up.
+        self.last_time = time.perf_counter()
+        self.accumulator = 0.0
+
+    def run_frame(self) -> None:
+        # One 60Hz frame: cpu_clockspeed/60 cycles followed by exactly one timer tick.
+        # A frame interrupted by a breakpoint (Chip8Break) is finished by the next call.
+        cpu = self.cpu
+        if self.pending_cycles:
+            cycles = self.pending_cycles
+        else:
+            self.cycle_debt += self.cpu_clockspeed / TIMER_FREQUENCY
+            cycles = self.frame_cycles = int(self.cycle_debt)
+            self.cycle_debt -= cycles
+            cpu.keypad.process_events(self.frames)
+            if cpu.halted:
+                cpu.process_key_events()
+            if self.rewind is not None:
+                self.rewind.capture(self.frames)
+        # Stops early when waiting for a key in FX0A, nothing to execute until the next key event.
+        # Idle loops are fast-forwarded to the end of the frame, where the timers and keys change.
+        try:
+            executed = cpu.run(cycles)
+        except Chip8Break as hit:
+            self.pending_cycles = cycles - hit.executed
+            if self.rewind is not None:
+                self.rewind.executed += hit.executed
+            raise
+        self.pending_cycles = 0
+        cpu.tick_timers()
+        if self.rewind is not None:
+            self.rewind.end_frame(executed)
+        self.cycles += self.frame_cycles
+        self.frames += 1
+
+    def step_frame(self) -> None:
+        # Frame-step mode: advance a paused machine by a single frame.
+        self.run_frame()
+
+    def step_back_frame(self) -> None:
+        # Reverse frame-step, needs a rewind buffer. The rest of an interrupted frame is dropped.
+        self.pending_cycles = 0
+        frame = self.rewind.step_back_frame()
+        if frame is not None:
+            self.frames = frame
+
+    def step_back_instruction(self) -> None:
+        self.pending_cycles = 0
+        frame = self.rewind.step_back_instruction()
+        if frame is not None:
+            # Back inside that frame, the next one gets a new number
+            self.frames = frame + 1
+
+    def update(self) -> int:
+        # Called once per host frame. Runs the frames owed since the last call and returns their count.
+        now = time.perf_counter()
+        elapsed = now - self.last_time
+        self.last_time = now
+
+        frames = 0
+        if self.turbo:
+            deadline = now + self.frame_time * TURBO_BUDGET
+            while time.perf_counter() < deadline:
+                self.run_frame()
+                frames += 1
+            self.accumulator = 0.0
+            return frames
+
+        self.accumulator += elapsed
+        while self.accumulator >= self.frame_time:
+            if frames == MAX_CATCH_UP_FRAMES:
+                behind = int(self.accumulator / self.frame_time)
+                self.dropped_frames += behind
+                self.accumulator -= behind * self.frame_time
+                break
+            self.run_frame()
+            self.accumulator -= self.frame_time
+            frames += 1
+        return frames
@@ -1,54 +1,115 @@
-import dearpygui.dearpygui as dpg
-from .config import DISP_BUFFER_SIZE, SCALE
-
-class Chip8Screen:
-    def __init__(self) -> None:
-        self.disp_buffer = [None] * DISP_BUFFER_SIZE
-        self.color_pixel_off = [244,180,26, 255]
-        self.color_pixel_on = [20,61,89, 255]
-
-        
-
-    def clear_screen(self):
-        for pixel in self.disp_buffer:
-            dpg.configure_item(pixel, show=False)
-    
-    def turn_pixel_on(self, idx):
-        dpg.configure_item(self.disp_buffer[idx], show=True)
-    
-    def turn_pixel_off(self, idx):
-        dpg.configure_item(self.disp_buffer[idx], show=False)
-    
-    def is_pixel_on(self, idx):
-        return dpg.is_item_shown(self.disp_buffer[idx])
-    
-    def show_emulator_display(self) -> dpg.window:
-        with dpg.child_window(tag='display', width=64*SCALE, height=32*SCALE, pos=[200,0]) as display:
-            with dpg.drawlist(width=64*SCALE, height=32*SCALE, tag='pixel_matrix') as pixel_matrix:
-                for idx in range(DISP_BUFFER_SIZE):
-                    x = (idx % 64) * SCALE
-                    y = (idx // 64) * SCALE
-                    self.disp_buffer[idx] = dpg.draw_rectangle(pmin=[x,y], pmax=[x+SCALE,y+SCALE], fill=self.color_pixel_on, color=self.color_pixel_on, show=False)
-        
-        with dpg.theme() as emulator_theme:
-            with dpg.theme_component(dpg.mvAll):
-                dpg.add_theme_style(dpg.mvStyleVar_WindowPadding, 0)
-                dpg.add_theme_color(dpg.mvThemeCol_ChildBg, self.color_pixel_off, category=dpg.mvThemeCat_Core)
-
-        dpg.bind_item_theme('display', emulator_theme)
-        self.display = display
-        return display
-    
-    def set_pixel_off_color(self, color):
-        self.color_pixel_off = color
-        with dpg.theme() as background_color:
-            with dpg.theme_component(dpg.mvAll):
-                dpg.add_theme_style(dpg.mvStyleVar_WindowPadding, 0)
-                dpg.add_theme_color(dpg.mvThemeCol_ChildBg, color, category=dpg.mvThemeCat_Core)
-
-        dpg.bind_item_theme(self.display, background_color)
-
-    def set_pixel_on_color(self, color):
-        self.color_pixel_on = color
-        for idx in range(DISP_BUFFER_SIZE):
-            dpg.configure_item(self.disp_buffer[idx], fill=color, color=color)
\ No newline at end of file
+import dearpygui.dearpygui as dpg
+from .config import SCREEN_WIDTH, SCREEN_HEIGHT, HIRES_WIDTH, HIRES_HEIGHT, SCALE
+from .framebuffer import Chip8Framebuffer
+
+class Chip8Screen:
+    def __init__(self, framebuffer:Chip8Framebuffer) -> None:
+        self.framebuffer = framebuffer
+        self.color_pixel_off = [244,180,26, 255]
+        self.color_pixel_on = [20,61,89, 255]
+        # XO-CHIP pixels set on the second plane only, and on both planes
+        self.color_pixel_plane2 = [190,72,52, 255]
+        self.color_pixel_both = [70,130,60, 255]
+
+        # Resolution of the texture shown, there is one texture per resolution
+        self.width = SCREEN_WIDTH
+        self.height = SCREEN_HEIGHT
+        # RGBA floats of the whole display, uploaded to the texture in one go
+        self.texture_data = [0.0] * (SCREEN_WIDTH * SCREEN_HEIGHT * 4)
+        # Rows currently in texture_data, one tuple of plane bitmaps per row. -1 never matches a row, forcing a redraw
+        self.shown = [-1] * SCREEN_HEIGHT
+        self.texture = None
+        self.textures = {}
+        self.build_palette()
+
+    def build_palette(self):
+        # Maps every possible byte of a single plane row (8 pixels) to its 32 RGBA floats.
+        colors = [[channel / 255 for channel in color] for color in (self.color_pixel_off, self.color_pixel_on, self.color_pixel_plane2, self.color_pixel_both)]
+        self.palette = []
+        for byte in range(256):
+            pixels = []
+            for bit in range(7, -1, -1):
+                pixels += colors[(byte >> bit) & 1]
+            self.palette.append(pixels)
+        # Maps a nibble of the first plane with the same nibble of the second one (4 pixels) to 16 RGBA floats
+        self.plane_palette = []
+        for nibbles in range(256):
+            pixels = []
+            for bit in range(3, -1, -1):
+                pixels += colors[(nibbles >> bit) & 1 | ((nibbles >> (bit + 4)) & 1) << 1]
+            self.plane_palette.append(pixels)
+        self.shown = [-1] * self.height
+
+    def resize(self, width:int, height:int) -> None:
+        self.width = width
+        self.height = height
+        self.texture_data = [0.0] * (width * height * 4)
+        self.shown = [-1] * height
+        if self.texture is not None:
+            self.texture = self.textures[(width, height)]
+            dpg.configure_item('pixel_matrix', texture_tag=self.texture)
+
+    def update_display(self, planes=None, width:int=None):
+        # Re-renders only the rows that changed and uploads the texture at most once per call.
+        # planes defaults to the live framebuffer, the GUI passes the planes of a worker snapshot.
+        if planes is None:
+            if not self.framebuffer.dirty and -1 not in self.shown:
+                return
+            self.framebuffer.dirty = False
+            planes = self.framebuffer.planes
+            width = self.framebuffer.width
+        if width != self.width or len(planes[0]) != self.height:
+            self.resize(width, len(planes[0]))
+        row_size = width * 4
+        changed = False
+        for y, row in enumerate(zip(*planes)):
+            if row == self.shown[y]:
+                continue
+            pixels = []
+            if len(row) == 1 or not row[1]:
+                for byte in row[0].to_bytes(width // 8, 'big'):
+                    pixels += self.palette[byte]
+            else:
+                first, second = row[0], row[1]
+                for shift in range(width - 4, -1, -4):
+                    pixels += self.plane_palette[(first >> shift) & 0xF | ((second >> shift) & 0xF) << 4]
+            self.texture_data[y*row_size : (y+1)*row_size] = pixels
+            self.shown[y] = row
+            changed = True
+        if changed and self.texture is not None:
+            dpg.set_value(self.texture, self.texture_data)
+
+    def show_emulator_display(self) -> dpg.window:
+        with dpg.texture_registry():
+            for width, height in ((SCREEN_WIDTH, SCREEN_HEIGHT), (HIRES_WIDTH, HIRES_HEIGHT)):
+                self.textures[(width, height)] = dpg.add_dynamic_texture(width=width, height=height, default_value=[0.0] * (width * height * 4))
+        self.texture = self.textures[(self.width, self.height)]
+
+        with dpg.child_window(tag='display', width=64*SCALE, height=32*SCALE, pos=[200,0]) as display:
+            # The image keeps its size, the high resolution texture is drawn at half the scale
+            dpg.add_image(self.texture, width=SCREEN_WIDTH*SCALE, height=SCREEN_HEIGHT*SCALE, tag='pixel_matrix')
+
+        with dpg.theme() as emulator_theme:
+            with dpg.theme_component(dpg.mvAll):
+                dpg.add_theme_style(dpg.mvStyleVar_WindowPadding, 0)
+                dpg.add_theme_color(dpg.mvThemeCol_ChildBg, self.color_pixel_off, category=dpg.mvThemeCat_Core)
+
+        dpg.bind_item_theme('display', emulator_theme)
+        self.display = display
+        return display
+
+    def set_pixel_off_color(self, color):
+        self.color_pixel_off = color
+        self.build_palette()
+
+    def set_pixel_on_color(self, color):
+        self.color_pixel_on = color
+        self.build_palette()
+
+    def set_pixel_plane2_color(self, color):
+        self.color_pixel_plane2 = color
+        self.build_palette()
+
+    def set_pixel_both_color(self, color):
+        self.color_pixel_both = color
+        self.build_palette()
@@ -0,0 +1,134 @@
+import queue
+import threading
+import time
+from .cpu import Chip8Break
+from .scheduler import Chip8Scheduler
+from .intervals import IntervalSet
+
+
+class Chip8Snapshot:
+    # Immutable copy of the machine state published by the worker for the GUI.
+    def __init__(self, sequence:int, cpu, planes:tuple, width:int, dirty_memory:list, written:frozenset, frames:int, hit:Chip8Break = None) -> None:
+        self.sequence = sequence
+        self.frames = frames
+        # Row bitmaps of every bitplane, and the screen width they were drawn at
+        self.planes = planes
+        self.width = width
+        self.v = tuple(cpu.v)
+        self.i = cpu.i
+        self.pc = cpu.pc
+        self.sp = cpu.sp
+        self.st = cpu.st
+        self.dt = cpu.dt
+        self.memory = bytes(cpu.memory)
+        # [start, end) memory ranges written since the last snapshot the GUI consumed
+        self.dirty_memory = dirty_memory
+        # Registers changed since then, only tracked by the debug handlers
+        self.written = written
+        # Debugger break that paused the worker since then, if any
+        self.hit = hit
+
+
+class Chip8Worker(threading.Thread):
+    # Runs the scheduler on its own thread. The GUI talks to it only through submit(), which
+    # queues a command to run on the worker thread, and reads the latest published snapshot.
+    def __init__(self, scheduler:Chip8Scheduler) -> None:
+        super().__init__(name='chip8-worker', daemon=True)
+        self.scheduler = scheduler
+        self.cpu = scheduler.cpu
+        self.commands = queue.Queue()
+        self.paused = True
+        self.running = True
+        # Debugger break not published yet
+        self.hit = None
+
+        # DOUBLE BUFFERED SNAPSHOTS: the worker builds the back snapshot and publishes it by
+        # swapping a single reference, which readers pick up without locking.
+        self.latest = None
+        self.sequence = 0
+        # Sequence of the last snapshot the GUI has consumed, written by the GUI thread
+        self.consumed = 0
+        # Memory ranges written since the last published snapshot, fed by the memory write barrier
+        self.dirty_memory = IntervalSet()
+        self.cpu.memory.observers.append(self.dirty_memory.add)
+
+        self.planes = tuple(tuple(plane) for plane in self.cpu.screen.planes)
+        self.width = self.cpu.screen.width
+        self.publish()
+
+    def submit(self, command) -> None:
+        self.commands.put(command)
+
+    def set_paused(self, paused:bool) -> None:
+        self.paused = paused
+        if not paused:
+            self.scheduler.start()
+
+    def stop(self) -> None:
+        self.running = False
+        self.submit(lambda: None)
+
+    def consume(self) -> Chip8Snapshot:
+        # Called by the GUI once per frame. Returns the newest snapshot, or None if it was already consumed.
+        snapshot = self.latest
+        if snapshot.sequence == self.consumed:
+            return None
+        self.consumed = snapshot.sequence
+        return snapshot
+
+    def publish(self) -> None:
+        cpu = self.cpu
+        if cpu.screen.dirty:
+            cpu.screen.dirty = False
+            self.planes = tuple(tuple(plane) for plane in cpu.screen.planes)
+            self.width = cpu.screen.width
+        dirty_memory = self.dirty_memory.ranges()
+        self.dirty_memory.clear()
+        registers = cpu.update_indices['registers']
+        written = frozenset(registers)
+        registers.clear()
+        hit = self.hit
+        self.hit = None
+
+        previous = self.latest
+        if previous is not None and previous.sequence != self.consumed:
+            # The GUI skipped the previous snapshot, carry its dirty ranges over
+            dirty_memory = IntervalSet(previous.dirty_memory + dirty_memory).ranges()
+            written |= previous.written
+            hit = hit or previous.hit
+
+        self.sequence += 1
+        self.latest = Chip8Snapshot(self.sequence, cpu, self.planes, self.width, dirty_memory, written, self.scheduler.frames, hit)
+
+    def execute(self, action) -> None:
+        # Runs a command or the scheduler. A debugger break pauses the worker until the GUI resumes it.
+        try:
+            action()
+        except Chip8Break as hit:
+            self.paused = True
+            self.hit = hit
+
+    def run(self) -> None:
+        frame_time = self.scheduler.frame_time
+        deadline = time.perf_counter()
+        while self.running:
+            changed = False
+            timeout = max(0.0, deadline - time.perf_counter())
+            try:
+                command = self.commands.get(timeout=timeout)
+                self.execute(command)
+                changed = True
+                # Drain whatever else arrived before publishing once
+                while True:
+                    self.execute(self.commands.get_nowait())
+            except queue.Empty:
+                pass
+
+            now = time.perf_counter()
+            if now >= deadline:
+                if not self.paused:
+                    self.execute(self.scheduler.update)
+                    changed = True
+                deadline = now + frame_time
+            if changed:
+                self.publish()